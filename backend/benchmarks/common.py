@@ -0,0 +1,103 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List
+
+from moviemanager import util
+
+BACKEND_PATH = Path(__file__).resolve().parent.parent
+LOG_CONFIG_PATH = BACKEND_PATH / "db" / "logging.yaml"
+
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima "
+    "mike november oscar papa quebec romeo sierra tango uniform victor whiskey"
+).split()
+
+
+@contextmanager
+def library_env() -> Iterator[Path]:
+    """Points the moviemanager config at a fresh temporary library."""
+
+    path = Path(tempfile.mkdtemp(prefix="mm-bench-"))
+    saved = {
+        key: os.environ.get(key)
+        for key in ("MM_DB_PATH", "MM_SQLITE_PATH", "MM_LOG_CONFIG_PATH")
+    }
+
+    os.environ["MM_DB_PATH"] = str(path)
+    os.environ["MM_SQLITE_PATH"] = str(path / "sqlite.db")
+    os.environ["MM_LOG_CONFIG_PATH"] = str(LOG_CONFIG_PATH)
+
+    for path_type in util.PathType:
+        (path / path_type.value).mkdir()
+
+    try:
+        yield path
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def name(rng: random.Random, words: int = 2) -> str:
+    """Returns a random title cased name."""
+
+    return " ".join(rng.choice(WORDS) for _ in range(words)).title()
+
+
+def make_library(path: Path, count: int, seed: int = 0) -> List[str]:
+    """Creates a synthetic movie library with count movies under path.
+
+    Studios, series, and actors are encoded in the filenames. Categories are
+    only present as link files, like a real library.
+
+    Returns:
+        filenames: The generated movie filenames.
+    """
+
+    rng = random.Random(seed)
+
+    studios = [f"{name(rng)} {i}" for i in range(max(1, count // 500))]
+    series = [f"{name(rng)} Saga {i}" for i in range(max(1, count // 50))]
+    actors = [f"{name(rng)} {i}" for i in range(max(4, count // 20))]
+    categories = [f"{rng.choice(WORDS)}{i}" for i in range(20)]
+
+    movies = path / util.PathType.MOVIE.value
+    links = util.get_movie_path(util.PathType.MOVIE, False)
+    filenames = []
+
+    for i in range(count):
+        filename = f"[{rng.choice(studios)}] "
+
+        if rng.random() < 0.5:
+            filename += f"{{{rng.choice(series)} {rng.randint(1, 20)}}} "
+
+        cast = sorted(rng.sample(actors, rng.randint(1, 4)))
+        filename += f"{name(rng, 3)} {i} ({', '.join(cast)}).mp4"
+
+        (movies / filename).touch()
+        filenames.append(filename)
+
+        for category in rng.sample(categories, rng.randint(0, 3)):
+            directory = path / util.PathType.CATEGORY.value / category
+            directory.mkdir(exist_ok=True)
+            os.symlink(f"{links}/{filename}", directory / filename)
+
+    return filenames
+
+
+@contextmanager
+def timer(label: str) -> Iterator[None]:
+    """Prints the wall clock time taken by the body of the with statement."""
+
+    start = time.perf_counter()
+    yield
+    print(f"{label}: {time.perf_counter() - start:.2f}s")
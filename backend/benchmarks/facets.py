@@ -0,0 +1,74 @@
+import argparse
+import logging
+import random
+import statistics
+import time
+
+from moviemanager import crud, models
+from moviemanager.database import get_db_session, init_db
+from moviemanager.rebuild import rebuild_db
+
+from .common import library_env, make_library
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark faceted movie filters")
+    parser.add_argument("--movies", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    with library_env() as path:
+        make_library(path, args.movies)
+        rebuild_db()
+        logging.getLogger("moviemanager").setLevel(logging.WARNING)
+        init_db()
+
+        db = next(get_db_session())
+
+        # a library is mostly processed, with a backlog of new movies
+        db.query(models.Movie).filter(models.Movie.id % 4 == 0).update(
+            {models.Movie.processed: False}, synchronize_session=False
+        )
+        db.commit()
+        db.execute("ANALYZE")
+
+        rng = random.Random(0)
+        ids = {
+            model: [id for id, in db.query(model.id)]
+            for model in (models.Actor, models.Category, models.Studio)
+        }
+
+        filters = {
+            "no filter": lambda: {},
+            "processed": lambda: {"processed": True},
+            "unprocessed": lambda: {"processed": False},
+            "studio": lambda: {"studio_id": rng.choice(ids[models.Studio])},
+            "actor": lambda: {"actor_ids": [rng.choice(ids[models.Actor])]},
+            "category": lambda: {"category_ids": [rng.choice(ids[models.Category])]},
+            "studio, actor, category, processed": lambda: {
+                "studio_id": rng.choice(ids[models.Studio]),
+                "actor_ids": [rng.choice(ids[models.Actor])],
+                "category_ids": [rng.choice(ids[models.Category])],
+                "processed": True,
+            },
+        }
+
+        for label, make_filter in filters.items():
+            latencies = []
+
+            for _ in range(args.runs):
+                kwargs = make_filter()
+                start = time.perf_counter()
+                crud.filter_movies(db, **kwargs)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            latencies.sort()
+            print(
+                f"{label}: p50 {statistics.median(latencies):.1f}ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95)]:.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    # invoke me with python -m benchmarks.facets
+    main()
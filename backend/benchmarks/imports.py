@@ -0,0 +1,93 @@
+import argparse
+import random
+
+from sqlalchemy import event
+
+from moviemanager import crud, models, util
+from moviemanager.database import get_db_session, init_db
+
+from .common import library_env, name, timer
+
+
+def make_imports(count, seed=0):
+    """Returns import filenames and the studios, series, and actors they use."""
+
+    rng = random.Random(seed)
+
+    studios = [f"{name(rng)} {i}" for i in range(max(1, count // 500))]
+    series = [f"{name(rng)} Saga {i}" for i in range(max(1, count // 50))]
+    actors = [f"{name(rng)} {i}" for i in range(max(4, count // 5))]
+    filenames = []
+
+    for i in range(count):
+        filename = f"[{rng.choice(studios)}] "
+
+        if rng.random() < 0.5:
+            filename += f"{{{rng.choice(series)} {rng.randint(1, 20)}}} "
+
+        cast = sorted(rng.sample(actors, 4))
+        filenames.append(f"{filename}{name(rng, 3)} {i} ({', '.join(cast)}).mp4")
+
+    return filenames, studios, series, actors
+
+
+def parse_per_file(db, filenames):
+    """Resolves names the pre-batch way, with queries for every file."""
+
+    info = []
+
+    for filename in filenames:
+        name, studio_name, series_name, number, actor_names = util.parse_filename(
+            filename
+        )
+
+        studio = crud.get_studio_by_name(db, studio_name)
+        series = series_name and crud.get_series_by_name(db, series_name)
+        actors = [
+            crud.get_actor_by_name(db, actor_name)
+            for actor_name in actor_names.split(", ")
+        ]
+
+        info.append((name, studio and studio.id, series and series.id, number, actors))
+
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import name resolution")
+    parser.add_argument("--movies", type=int, default=5000)
+    args = parser.parse_args()
+
+    filenames, studios, series, actors = make_imports(args.movies)
+
+    with library_env():
+        init_db()
+        db = next(get_db_session())
+
+        crud.bulk_add_properties(db, models.Studio, studios)
+        crud.bulk_add_properties(db, models.Series, series)
+        crud.bulk_add_properties(db, models.Actor, actors)
+
+        queries = []
+        event.listen(
+            db.get_bind(),
+            "before_cursor_execute",
+            lambda *args: queries.append(args[2]),
+        )
+
+        for label, parse in (
+            ("per-file lookups", parse_per_file),
+            ("parse_files_info", util.parse_files_info),
+        ):
+            queries.clear()
+            db.expunge_all()
+
+            with timer(f"{label} for {args.movies} files"):
+                parse(db, filenames)
+
+            print(f"{label} queries: {len(queries)}")
+
+
+if __name__ == "__main__":
+    # invoke me with python -m benchmarks.imports
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import logging
+import os
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import uvicorn
+
+from moviemanager import create_app, models
+from moviemanager.database import get_db_session
+from moviemanager.rebuild import rebuild_db
+
+from .common import library_env, make_library
+
+
+def free_port():
+    """Returns a TCP port that is free on localhost."""
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+
+        return sock.getsockname()[1]
+
+
+def slow(func, delay):
+    """Returns func delayed by delay seconds, like a slow network share."""
+
+    def wrapper(*args, **kwargs):
+        time.sleep(delay)
+
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def time_reads(url, ids, count):
+    """Returns the latencies in ms of count movie list and movie reads."""
+
+    latencies = []
+
+    with requests.Session() as session:
+        for i in range(count):
+            path = "/movies?limit=100" if i % 2 == 0 else f"/movies/{ids[i % len(ids)]}"
+            start = time.perf_counter()
+            session.get(url + path).raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+
+def rename_movies(url, ids, stop):
+    """Renames movies until stop is set, returning the number renamed.
+
+    Each client gets its own movies, as renaming one movie from two clients
+    at once races on the file.
+    """
+
+    renamed = 0
+
+    with requests.Session() as session:
+        while not stop.is_set():
+            id = ids[renamed % len(ids)]
+            session.put(f"{url}/movies/{id}", json={"name": f"Renamed {id} {renamed}"})
+            renamed += 1
+
+    return renamed
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95)]
+
+    return f"p50 {statistics.median(latencies):.1f}ms, p95 {p95:.1f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reads during renames")
+    parser.add_argument("--movies", type=int, default=2000)
+    parser.add_argument("--writers", type=int, default=64)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument(
+        "--fs-delay", type=float, default=0.05, help="Seconds added to file calls"
+    )
+    args = parser.parse_args()
+
+    with library_env() as path:
+        make_library(path, args.movies)
+        rebuild_db()
+        logging.getLogger("moviemanager").setLevel(logging.WARNING)
+
+        ids = [id for id, in next(get_db_session()).query(models.Movie.id)]
+
+        os.rename = slow(os.rename, args.fs_delay)
+        os.symlink = slow(os.symlink, args.fs_delay)
+        os.remove = slow(os.remove, args.fs_delay)
+
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = uvicorn.Server(
+            uvicorn.Config(create_app(), port=port, log_level="warning")
+        )
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+
+        while not server.started:
+            time.sleep(0.01)
+
+        print(f"idle reads: {summary(time_reads(url, ids, args.reads))}")
+
+        stop = threading.Event()
+
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(args.writers) as executor:
+            writers = [
+                executor.submit(
+                    rename_movies,
+                    url,
+                    [id for id in ids if id % args.writers == i],
+                    stop,
+                )
+                for i in range(args.writers)
+            ]
+            time.sleep(1)
+
+            latencies = time_reads(url, ids, args.reads)
+            stop.set()
+
+        renamed = sum(writer.result() for writer in writers)
+        seconds = time.perf_counter() - start
+        print(f"reads during {args.writers} renaming clients: {summary(latencies)}")
+        print(f"movies renamed: {renamed} ({renamed / seconds:.1f}/s)")
+
+        for route, stats in requests.get(f"{url}/stats").json()["latency"].items():
+            print(f"{route}: {stats}")
+
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    # invoke me with python -m benchmarks.latency
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import re
+import time
+
+from moviemanager import parsing
+
+from .common import library_env, make_library
+
+
+def parse_per_call(filenames):
+    """Parses the filenames the pre-parser way, building the regex every call."""
+
+    parsed = []
+
+    for filename in filenames:
+        name, _ = os.path.splitext(filename)
+        regex = (
+            r"^"
+            r"(?:\[([A-Za-z0-9 :.,\'-]+)\])?"
+            r" ?"
+            r"(?:{([A-Za-z0-9 :.,\'-]+?)(?: ([0-9]+))?})?"
+            r" ?"
+            r"([A-Za-z0-9 :.,\'-]+?)?"
+            r" ?"
+            r"(?:\(([A-Za-z0-9 .,\'-]+)\))?"
+            r"$"
+        )
+        matches = re.search(regex, name)
+        parsed.append(matches.groups())
+
+    return parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark filename parsing")
+    parser.add_argument("--movies", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with library_env() as path:
+        filenames = make_library(path, args.movies)
+
+    filename_parser = parsing.get_filename_parser()
+
+    for label, parse in (
+        ("per call", parse_per_call),
+        ("parse_many", filename_parser.parse_many),
+        (
+            f"parse_many {args.workers} workers",
+            lambda filenames: filename_parser.parse_many(filenames, args.workers),
+        ),
+    ):
+        seconds = []
+
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            parse(filenames)
+            seconds.append(time.perf_counter() - start)
+
+        best = min(seconds)
+
+        print(f"{label}: {best:.3f}s, {best / len(filenames) * 1e6:.2f}us per filename")
+
+
+if __name__ == "__main__":
+    # invoke me with python -m benchmarks.parsing
+    main()
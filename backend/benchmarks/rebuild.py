@@ -0,0 +1,78 @@
+import argparse
+import logging
+
+from moviemanager import crud, models, util
+from moviemanager.database import get_db_session, init_db
+from moviemanager.rebuild import rebuild_db
+
+from .common import library_env, make_library, timer
+
+
+def rebuild_per_row(filenames):
+    """Inserts the movies the pre-bulk way with one commit per row."""
+
+    init_db()
+    db = next(get_db_session())
+
+    actors = {}
+    series = {}
+    studios = {}
+
+    for filename in filenames:
+        name, studio, series_name, number, actor_names = util.parse_filename(filename)
+
+        if studio not in studios:
+            studios[studio] = crud.add_studio(db, studio)
+
+        if series_name is not None and series_name not in series:
+            series[series_name] = crud.add_series(db, series_name)
+
+        for actor in actor_names.split(", "):
+            if actor not in actors:
+                actors[actor] = crud.add_actor(db, actor)
+
+        crud.add_movie(
+            db,
+            filename,
+            name,
+            studios[studio].id,
+            series[series_name].id if series_name is not None else None,
+            number,
+            [actors[actor] for actor in actor_names.split(", ")],
+            None,
+            True,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rebuild_db")
+    parser.add_argument("--movies", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument(
+        "--per-row", type=int, default=2000, help="Movies for the per-row baseline"
+    )
+    args = parser.parse_args()
+
+    with library_env() as path:
+        with timer(f"create {args.movies} movie library"):
+            make_library(path, args.movies)
+
+        with timer("bulk rebuild_db"):
+            rebuild_db(args.batch_size)
+
+        logging.getLogger("moviemanager").setLevel(logging.WARNING)
+        init_db()
+        count = next(get_db_session()).query(models.Movie).count()
+        print(f"movies in database: {count}")
+
+    if args.per_row > 0:
+        with library_env() as path:
+            filenames = make_library(path, args.per_row)
+
+            with timer(f"per-row inserts for {args.per_row} movies"):
+                rebuild_per_row(filenames)
+
+
+if __name__ == "__main__":
+    # invoke me with python -m benchmarks.rebuild
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import logging
+import time
+
+from sqlalchemy import event
+
+from moviemanager import crud, models, renames, util
+from moviemanager.database import get_db_session, init_db
+from moviemanager.rebuild import rebuild_db
+from moviemanager.relink import relink_property_files
+
+from .common import library_env, make_library
+
+
+def rename_studio_per_movie(db, id, name):
+    """Renames a studio the pre-batch way, with a commit for every movie."""
+
+    current = crud.get_studio(db, id).name
+    crud.update_studio(db, id, name)
+
+    for movie in crud.get_studio_movies(db, id):
+        util.rename_movie_file(movie, studio_current=current)
+        db.commit()
+
+
+def rename_category_per_link(db, id, name):
+    """Renames a category the pre-batch way, moving its links one at a time."""
+
+    current = crud.get_category(db, id).name
+    category = crud.update_category(db, id, name)
+
+    for movie in category.movies:
+        util.update_category_link(movie.filename, current, False)
+        util.update_category_link(movie.filename, name, True)
+
+
+def rename_studio(db, id, name):
+    renames.rename_property(db, models.Studio, id, name)
+
+
+def rename_category(db, id, name):
+    renames.rename_property(db, models.Category, id, name)
+
+
+def largest(properties, count=2):
+    """Returns the properties with the most movies."""
+
+    return sorted(properties, key=lambda prop: prop.movie_count)[-count:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark property renames")
+    parser.add_argument("--movies", type=int, default=20000)
+    args = parser.parse_args()
+
+    with library_env() as path:
+        make_library(path, args.movies)
+        rebuild_db()
+        relink_property_files()
+        logging.getLogger("moviemanager").setLevel(logging.WARNING)
+        init_db()
+
+        db = next(get_db_session())
+        studios = largest(crud.get_all_studios(db))
+        categories = largest(crud.get_all_categories(db))
+
+        commits = []
+        event.listen(db.get_bind(), "commit", lambda conn: commits.append(conn))
+
+        for label, rename, prop in (
+            ("studio per movie", rename_studio_per_movie, studios[0]),
+            ("studio batch", rename_studio, studios[1]),
+            ("category per link", rename_category_per_link, categories[0]),
+            ("category batch", rename_category, categories[1]),
+        ):
+            commits.clear()
+            db.expunge_all()
+
+            start = time.perf_counter()
+            rename(db, prop.id, f"{prop.name} Renamed")
+            seconds = time.perf_counter() - start
+
+            print(
+                f"{label}: {prop.movie_count} movies in {seconds:.3f}s, "
+                f"{prop.movie_count / seconds:.0f} movies/s, "
+                f"{len(commits)} commits"
+            )
+
+
+if __name__ == "__main__":
+    # invoke me with python -m benchmarks.renames
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import logging
+import random
+import statistics
+import time
+
+from moviemanager import crud, models
+from moviemanager.database import get_db_session, init_db
+from moviemanager.rebuild import rebuild_db
+
+from .common import WORDS, library_env, make_library
+
+
+def make_queries(count, seed=0):
+    """Returns searches of one or two words or word prefixes."""
+
+    rng = random.Random(seed)
+    queries = []
+
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(1, 2))]
+        queries.append(" ".join(word[: rng.randint(2, len(word))] for word in words))
+
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full text search")
+    parser.add_argument("--movies", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with library_env() as path:
+        make_library(path, args.movies)
+        rebuild_db()
+        logging.getLogger("moviemanager").setLevel(logging.WARNING)
+        init_db()
+
+        db = next(get_db_session())
+        rng = random.Random(0)
+        titles = [name for name, in db.query(models.Movie.name)]
+
+        for label, queries in (
+            ("word prefix", make_queries(args.queries)),
+            ("title", rng.sample(titles, args.queries)),
+        ):
+            latencies = []
+
+            for query in queries:
+                start = time.perf_counter()
+                crud.search(db, query, limit=args.limit)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            latencies.sort()
+            print(
+                f"{args.queries} {label} searches over {args.movies} movies: "
+                f"p50 {statistics.median(latencies):.2f}ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95)]:.2f}ms, "
+                f"max {latencies[-1]:.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    # invoke me with python -m benchmarks.search
+    main()
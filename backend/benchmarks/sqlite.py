@@ -0,0 +1,107 @@
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from moviemanager import crud, models
+from moviemanager.config import SQLITE_PROFILES
+from moviemanager.database import get_db_session, init_db
+from moviemanager.rebuild import rebuild_db
+
+from .common import library_env, make_library
+
+
+def write_commits(count):
+    """Adds count actors with a commit each, like edits from the UI."""
+
+    db = next(get_db_session())
+    start = time.perf_counter()
+
+    for i in range(count):
+        crud.add_actor(db, f"Benchmark Actor {i}")
+
+    return count / (time.perf_counter() - start)
+
+
+def read_movies(ids, stop, seed):
+    """Reads random movies with their properties until stop is set."""
+
+    rng = random.Random(seed)
+    db = next(get_db_session())
+    reads = 0
+
+    while not stop.is_set():
+        crud.get_movie(db, rng.choice(ids), with_properties=True)
+        db.expire_all()
+        reads += 1
+
+    db.close()
+
+    return reads
+
+
+def mixed(ids, readers, seconds):
+    """Returns the reads and commits per second of readers and one writer."""
+
+    stop = threading.Event()
+
+    def write():
+        db = next(get_db_session())
+        commits = 0
+
+        while not stop.is_set():
+            crud.add_category(db, f"Benchmark Category {commits}")
+            commits += 1
+
+        db.close()
+
+        return commits
+
+    with ThreadPoolExecutor(readers + 1) as executor:
+        reads = [executor.submit(read_movies, ids, stop, i) for i in range(readers)]
+        commits = executor.submit(write)
+
+        time.sleep(seconds)
+        stop.set()
+
+    return (
+        sum(future.result() for future in reads) / seconds,
+        commits.result() / seconds,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sqlite profiles")
+    parser.add_argument("--movies", type=int, default=10000)
+    parser.add_argument("--commits", type=int, default=500)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    for profile in SQLITE_PROFILES:
+        os.environ["MM_SQLITE_PROFILE"] = profile
+
+        with library_env() as path:
+            make_library(path, args.movies)
+            rebuild_db()
+            logging.getLogger("moviemanager").setLevel(logging.WARNING)
+            init_db()
+
+            ids = [id for id, in next(get_db_session()).query(models.Movie.id)]
+
+            commits = write_commits(args.commits)
+            reads, mixed_commits = mixed(ids, args.readers, args.seconds)
+
+            print(f"{profile}: {commits:.0f} commits/s alone")
+            print(
+                f"{profile}: {reads:.0f} reads/s from {args.readers} readers with "
+                f"{mixed_commits:.0f} commits/s from one writer"
+            )
+
+
+if __name__ == "__main__":
+    # invoke me with python -m benchmarks.sqlite
+    main()
@@ -4,7 +4,8 @@ __version__ = "2.2.2"
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from . import routes
+from . import pagination, routes
+from .metrics import LatencyMiddleware
 
 
 def create_app() -> FastAPI:
@@ -26,12 +27,16 @@ def create_app() -> FastAPI:
         },
     )
 
+    # record the latency of every route
+    app.add_middleware(LatencyMiddleware)
+
     # add CORS middleware
     app.add_middleware(
         CORSMiddleware,
         allow_origin_regex=r"https?://(?:127\.0\.0\.1|localhost)(?::300[0-9])?",
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", pagination.NEXT_CURSOR_HEADER],
     )
 
     ################################################################################
@@ -40,10 +45,13 @@ def create_app() -> FastAPI:
     app.include_router(routes.root.router)
     app.include_router(routes.actors.router)
     app.include_router(routes.categories.router)
+    app.include_router(routes.jobs.router)
     app.include_router(routes.movie_actor.router)
     app.include_router(routes.movie_category.router)
     app.include_router(routes.movies.router)
+    app.include_router(routes.search.router)
     app.include_router(routes.series.router)
+    app.include_router(routes.stats.router)
     app.include_router(routes.studios.router)
 
     return app
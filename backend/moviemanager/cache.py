@@ -0,0 +1,73 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Sequence, Tuple, TypeVar
+
+from . import versions
+
+T = TypeVar("T")
+
+
+class VersionedCache:
+    """Values read from the database, kept until one of their tables changes.
+
+    Each value is stored with the change counters of the tables it was read
+    from. The triggers of models.VERSION_TRIGGERS increment the counter of a
+    table on every write, whichever process makes it, so the next read of a
+    value built from that table misses and reloads it.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__entries: Dict[Hashable, Tuple[Tuple[Any, ...], Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, tables: Sequence[str], load: Callable[[], T]) -> T:
+        """Returns a cached value, loading it if missing or out of date.
+
+        The counters are read before loading, so a change committed while the
+        value loads leaves it stored under the old counters to be reloaded on
+        the next read. Concurrent misses may each load the value; the lock is
+        not held while the database is queried.
+
+        Args:
+            key: Identifies the value.
+            tables: Names of the tables the value is read from.
+            load: Reads the value from the database.
+
+        Returns:
+            value: The cached or freshly loaded value.
+        """
+
+        version = versions.get(*tables)
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+
+        value = load()
+
+        with self.__lock:
+            self.__entries[key] = (version, value)
+
+        return value
+
+    def clear(self) -> None:
+        """Removes every cached value."""
+
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of cached values, hits, and misses."""
+
+        with self.__lock:
+            return {
+                "entries": len(self.__entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
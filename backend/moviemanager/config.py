@@ -2,21 +2,81 @@ import os
 import sys
 from logging import Logger, getLogger
 from logging.config import dictConfig
+from typing import Dict
 
 import yaml
 
 DEFAULT_DB_PATH = "./db"
+DEFAULT_FS_WORKERS = 8
+DEFAULT_JOB_WORKERS = 1
+DEFAULT_PARSE_WORKERS = 0
+DEFAULT_SCAN_WORKERS = 8
+DEFAULT_SQLITE_OPTIMIZE_INTERVAL = 3600
+DEFAULT_SQLITE_PROFILE = "safe"
+
+# sqlite pragmas that can be tuned, in the order they are set
+SQLITE_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+)
+
+# sqlite pragmas set on every connection for each profile
+# safe keeps the sqlite defaults: a rollback journal synced on every commit
+# performance does not sync the WAL on commit, so a power loss can undo the
+# last transactions, such as the journal of a rename whose files have moved
+SQLITE_PROFILES: Dict[str, Dict[str, str]] = {
+    "safe": {},
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": "-65536",
+        "mmap_size": "268435456",
+        "temp_store": "MEMORY",
+    },
+}
+
+# allowed values of the pragmas that take a keyword
+SQLITE_PRAGMA_VALUES = {
+    "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+    "temp_store": {"DEFAULT", "FILE", "MEMORY"},
+}
 
 ################################################################################
 # config functions
 
 
+def get_auto_migrate() -> bool:
+    """Returns True if the database is migrated when the application starts."""
+
+    return os.getenv("MM_AUTO_MIGRATE", "1").lower() not in ("0", "false", "no")
+
+
 def get_db_path() -> str:
     """Returns the movie DB path."""
 
     return os.getenv("MM_DB_PATH", DEFAULT_DB_PATH)
 
 
+def get_fs_workers() -> int:
+    """Returns the number of threads that run file system heavy requests.
+
+    The default keeps reads fast while movies are renamed, at the cost of
+    rename throughput; see the README for the trade-off.
+    """
+
+    return int(os.getenv("MM_FS_WORKERS", DEFAULT_FS_WORKERS))
+
+
+def get_job_workers() -> int:
+    """Returns the number of background jobs run at the same time."""
+
+    return int(os.getenv("MM_JOB_WORKERS", DEFAULT_JOB_WORKERS))
+
+
 def get_log_config() -> str:
     """Returns the logging config path."""
 
@@ -36,6 +96,67 @@ def get_logger() -> Logger:
     return getLogger("moviemanager")
 
 
+def get_manifest_path() -> str:
+    """Returns path to the file system manifest file."""
+
+    return os.getenv("MM_MANIFEST_PATH", f"{get_db_path()}/manifest.json")
+
+
+def get_parse_workers() -> int:
+    """Returns the number of processes that parse filenames, 0 for none."""
+
+    return int(os.getenv("MM_PARSE_WORKERS", DEFAULT_PARSE_WORKERS))
+
+
+def get_scan_workers() -> int:
+    """Returns the number of threads used to scan link directories."""
+
+    return int(os.getenv("MM_SCAN_WORKERS", DEFAULT_SCAN_WORKERS))
+
+
+def get_sqlite_optimize_interval() -> int:
+    """Returns the seconds between runs of PRAGMA optimize, 0 to disable."""
+
+    return int(
+        os.getenv("MM_SQLITE_OPTIMIZE_INTERVAL", DEFAULT_SQLITE_OPTIMIZE_INTERVAL)
+    )
+
+
+def get_sqlite_pragmas() -> Dict[str, str]:
+    """Returns the sqlite pragmas to set on each connection.
+
+    The pragmas of the MM_SQLITE_PROFILE profile can be overridden one by one
+    with MM_SQLITE_<PRAGMA>, such as MM_SQLITE_CACHE_SIZE.
+
+    Raises:
+        ValueError: The profile or a pragma value is not valid.
+    """
+
+    profile = os.getenv("MM_SQLITE_PROFILE", DEFAULT_SQLITE_PROFILE)
+
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown sqlite profile {profile}")
+
+    pragmas = dict(SQLITE_PROFILES[profile])
+
+    for pragma in SQLITE_PRAGMAS:
+        value = os.getenv(f"MM_SQLITE_{pragma.upper()}")
+
+        if value is not None:
+            pragmas[pragma] = value
+
+    for pragma, value in pragmas.items():
+        if pragma in SQLITE_PRAGMA_VALUES:
+            pragmas[pragma] = value.upper()
+
+            if pragmas[pragma] not in SQLITE_PRAGMA_VALUES[pragma]:
+                raise ValueError(f"Invalid sqlite {pragma} {value}")
+        else:
+            pragmas[pragma] = str(int(value))
+
+    return {pragma: pragmas[pragma] for pragma in SQLITE_PRAGMAS if pragma in pragmas}
+
+
 def get_sqlite_path() -> str:
     """Returns path to the sqlite DB file."""
 
@@ -1,15 +1,311 @@
-from typing import List, Optional, Tuple
+import re
+from collections import defaultdict
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+)
 
+from sqlalchemy import (
+    Integer,
+    Table,
+    bindparam,
+    delete,
+    func,
+    insert,
+    select,
+    text,
+    tuple_,
+)
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
 
 from . import models, util
+from .cache import VersionedCache
 from .exceptions import (
     DuplicateEntryException,
     IntegrityConstraintException,
     InvalidIDException,
 )
-from .schemas import MovieUpdateSchema
+from .schemas import (
+    ActorSchema,
+    BasePropertySchema,
+    CategorySchema,
+    MovieUpdateSchema,
+    SeriesSchema,
+    StudioSchema,
+)
+
+# number of bound parameters to put in a single IN (...) clause
+# older sqlite versions limit a statement to 999 variables
+IN_CLAUSE_SIZE = 500
+
+# sorted property lists, name to ID maps and movie facets, reloaded when one
+# of their tables changes
+_cache = VersionedCache()
+
+# the tables the filter_movies facets are counted from
+FACET_TABLES = (
+    "actors",
+    "categories",
+    "movie_actors",
+    "movie_categories",
+    "movies",
+    "series",
+    "studios",
+)
+
+
+def _chunks(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    """Yields successive slices of at most size items."""
+
+    for start in range(0, len(items), size):
+        end = start + size
+        yield items[start:end]
+
+
+def _facet(
+    db: Session,
+    column: Any,
+    model: Type[models.TableBase],
+    conditions: List[Any],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """Returns the property IDs and names with the most movies and their counts.
+
+    The counts are grouped before the names are joined in, so only the
+    returned properties are looked up. An association table is read in
+    property order and joined to the movies only when they are filtered.
+
+    Args:
+        db: The database session.
+        column: The property ID column of movies or an association table.
+        model: The property model.
+        conditions: The conditions selecting the movies to count.
+        limit: The maximum number of properties to return.
+    """
+
+    count = func.count().label("count")
+    counts = select(column.label("id"), count)
+
+    if conditions and column.table is not models.Movie.__table__:
+        counts = counts.join_from(
+            column.table, models.Movie, models.Movie.id == column.table.c.movie_id
+        )
+
+    counts = (
+        counts.where(column.isnot(None), *conditions)
+        .group_by(column)
+        .order_by(count.desc(), column)
+        .limit(limit)
+        .subquery()
+    )
+
+    return [
+        {"id": id, "name": name, "count": count}
+        for id, name, count in db.query(counts.c.id, model.name, counts.c.count)
+        .join(model, model.id == counts.c.id)
+        .order_by(counts.c.count.desc(), counts.c.id)
+    ]
+
+
+def _movie_facets(
+    db: Session, conditions: List[Any], limit: int
+) -> Tuple[int, Dict[str, Any]]:
+    """Returns the number of movies matching conditions and their facets.
+
+    Args:
+        db: The database session.
+        conditions: The conditions selecting the movies to count.
+        limit: The maximum number of values of each property facet.
+
+    Returns:
+        total: The number of matching movies.
+        facets: The facets, matching MovieFacetsSchema.
+    """
+
+    total, processed_count = (
+        db.query(
+            func.count(),
+            func.coalesce(func.sum(models.Movie.processed, type_=Integer), 0),
+        )
+        .filter(*conditions)
+        .one()
+    )
+
+    facets = {
+        "actors": _facet(
+            db, models.movie_actors.c.actor_id, models.Actor, conditions, limit
+        ),
+        "categories": _facet(
+            db,
+            models.movie_categories.c.category_id,
+            models.Category,
+            conditions,
+            limit,
+        ),
+        "series": _facet(db, models.Movie.series_id, models.Series, conditions, limit),
+        "studios": _facet(db, models.Movie.studio_id, models.Studio, conditions, limit),
+        "processed": processed_count,
+        "unprocessed": total - processed_count,
+    }
+
+    return (total, facets)
+
+
+def _movie_sort_key() -> List[Any]:
+    """Returns the columns of the get_all_movies ordering.
+
+    The stored list key holds the processed flag and the studio, series and
+    movie sort names, with the movie ID breaking ties, so the ordering is an
+    index scan and the key can be compared as a row value for keyset
+    pagination.
+    """
+
+    return [models.Movie.list_key, models.Movie.id]
+
+
+def _order_movies(query: Query) -> Query:
+    """Applies the get_all_movies ordering to a movies query."""
+
+    return query.order_by(*_movie_sort_key())
+
+
+def _page(
+    query: Query, key: List[Any], limit: int, after: Optional[Sequence[Any]]
+) -> Tuple[List[Tuple[Any, ...]], Optional[List[Any]]]:
+    """Returns one page of a keyset paginated query.
+
+    Args:
+        query: The query selecting the row columns, already ordered by key.
+        key: The columns of the query ordering, ending with a unique column.
+        limit: The maximum number of rows to return.
+        after: The sort key of the last row of the previous page, if any.
+
+    Returns:
+        rows: The page rows without the sort key columns.
+        next_key: The sort key of the last row, or None if it is the last page.
+    """
+
+    if after is not None:
+        query = query.filter(tuple_(*key) > tuple_(*after))
+
+    width = len(query.column_descriptions)
+    rows = query.add_columns(*key).limit(limit + 1).all()
+    next_key = list(rows[limit - 1][width:]) if len(rows) > limit else None
+
+    return [tuple(row[:width]) for row in rows[:limit]], next_key
+
+
+def _property_ids(db: Session, model: Type[models.TableBase]) -> Dict[str, int]:
+    """Returns the cached name to ID map of a property table.
+
+    The map is shared between callers and must not be modified.
+    """
+
+    table = model.__tablename__
+
+    return _cache.get(
+        ("ids", table), (table,), lambda: dict(db.query(model.name, model.id))
+    )
+
+
+def _movie_count_column(model: Type[models.TableBase]) -> Any:
+    """Returns the column holding the property IDs of movies."""
+
+    return {
+        models.Actor: models.movie_actors.c.actor_id,
+        models.Category: models.movie_categories.c.category_id,
+        models.Series: models.Movie.series_id,
+        models.Studio: models.Movie.studio_id,
+    }[model]
+
+
+def _movie_count_tables(model: Type[models.TableBase]) -> Tuple[str, ...]:
+    """Returns the tables the movie counts of a property table are read from.
+
+    Actors and categories are counted from their association table alone, so
+    edits to other movie columns keep their lists cached.
+    """
+
+    return (model.__tablename__, _movie_count_column(model).table.name)
+
+
+def _movie_counts(
+    db: Session, model: Type[models.TableBase], ids: Optional[Sequence[int]] = None
+) -> Dict[int, int]:
+    """Returns the number of movies of each property that has any.
+
+    The movies are counted with one grouped query over the indexed property
+    IDs, so no relationships are loaded.
+
+    Args:
+        db: The database session.
+        model: The Actor, Category, Series, or Studio model.
+        ids: The properties to count, or None for all of them.
+    """
+
+    column = _movie_count_column(model)
+    query = db.query(column, func.count()).filter(column.isnot(None))
+
+    if ids is not None:
+        query = query.filter(column.in_(ids))
+
+    return dict(query.group_by(column))
+
+
+def _property_list(
+    db: Session,
+    model: Type[models.TableBase],
+    schema: Type[BasePropertySchema],
+) -> List[BasePropertySchema]:
+    """Returns the cached rows of a property table in alphabetical order."""
+
+    table = model.__tablename__
+
+    def load() -> List[BasePropertySchema]:
+        counts = _movie_counts(db, model)
+        query = db.query(model.id, model.name).order_by(*_property_sort_key(model))
+
+        return [
+            schema(id=id, name=name, movie_count=counts.get(id, 0))
+            for id, name in query
+        ]
+
+    return list(_cache.get(("list", table), _movie_count_tables(model), load))
+
+
+def _property_sort_key(model: Type[models.TableBase]) -> List[Any]:
+    """Returns the columns of the get_all_<property> ordering.
+
+    Names are in natural order by their stored sort key, with the ID breaking
+    ties, so the ordering is a scan of the sort key index.
+    """
+
+    return [model.sort_key, model.id]
+
+
+def _with_properties(query: Query) -> Query:
+    """Eager loads the actors, categories, series, and studio of movies.
+
+    The collections are loaded with one extra SELECT each for all movies in
+    the result instead of one SELECT per movie. Series and studios are joined
+    in.
+    """
+
+    return query.options(
+        selectinload(models.Movie.actors),
+        selectinload(models.Movie.categories),
+        joinedload(models.Movie.series),
+        joinedload(models.Movie.studio),
+    )
 
 
 def add_actor(
@@ -29,7 +325,7 @@ def add_actor(
         DuplicateEntryException: Actor already exists with that name.
     """
 
-    actor = models.Actor(name=name)
+    actor = models.Actor(name=name, sort_key=util.generate_sort_key(name))
 
     try:
         db.add(actor)
@@ -59,7 +355,7 @@ def add_category(
         DuplicateEntryException: Category already exists with that name.
     """
 
-    category = models.Category(name=name)
+    category = models.Category(name=name, sort_key=util.generate_sort_key(name))
 
     try:
         db.add(category)
@@ -72,6 +368,26 @@ def add_category(
     return category
 
 
+def add_job(db: Session, kind: str, params: Dict[str, Any]) -> models.Job:
+    """Adds a queued background job to the database.
+
+    Args:
+        db: The database session.
+        kind: The kind of job.
+        params: The job parameters, stored as JSON.
+
+    Returns:
+        job: The new Job object.
+    """
+
+    job = models.Job(kind=kind, status="queued", params=params)
+
+    db.add(job)
+    db.commit()
+
+    return job
+
+
 def add_movie(
     db: Session,
     filename: str,
@@ -107,6 +423,7 @@ def add_movie(
         filename=filename,
         name=name,
         sort_name=util.generate_sort_name(name),
+        sort_key=util.generate_sort_key(name),
         studio_id=studio_id,
         series_id=series_id,
         series_number=series_number,
@@ -149,7 +466,7 @@ def add_movie_actor(
         DuplicateEntryException: Actor is already on this movie.
     """
 
-    movie = get_movie(db, movie_id)
+    movie = get_movie(db, movie_id, with_properties=True)
 
     if movie is None:
         raise InvalidIDException(f"Movie ID {movie_id} does not exist")
@@ -195,7 +512,7 @@ def add_movie_category(
         DuplicateEntryException: Category is already on this movie.
     """
 
-    movie = get_movie(db, movie_id)
+    movie = get_movie(db, movie_id, with_properties=True)
 
     if movie is None:
         raise InvalidIDException(f"Movie ID {movie_id} does not exist")
@@ -242,6 +559,7 @@ def add_series(
     series = models.Series(
         name=name,
         sort_name=util.generate_sort_name(name),
+        sort_key=util.generate_sort_key(name),
     )
 
     try:
@@ -275,6 +593,7 @@ def add_studio(
     studio = models.Studio(
         name=name,
         sort_name=util.generate_sort_name(name),
+        sort_key=util.generate_sort_key(name),
     )
 
     try:
@@ -288,6 +607,249 @@ def add_studio(
     return studio
 
 
+def bulk_add_movies(
+    db: Session,
+    movies: List[Dict[str, Any]],
+    batch_size: int = 5000,
+) -> int:
+    """Adds many movies and their property associations in one transaction.
+
+    Each movie is a dict with the keys filename, name, studio_id, series_id,
+    series_number, processed, actor_ids, and category_ids. The rows are
+    inserted with batched executemany statements instead of one ORM flush
+    and commit per movie.
+
+    Args:
+        db: The database session.
+        movies: The movies to add.
+        batch_size: Number of rows per insert statement.
+
+    Returns:
+        rows: The number of movie and association rows inserted.
+
+    Raises:
+        DuplicateEntryException: A movie conflicts with an existing one.
+    """
+
+    movie_rows = [
+        {
+            "filename": movie["filename"],
+            "name": movie["name"],
+            "sort_name": util.generate_sort_name(movie["name"]),
+            "sort_key": util.generate_sort_key(movie["name"]),
+            "studio_id": movie["studio_id"],
+            "series_id": movie["series_id"],
+            "series_number": movie["series_number"],
+            "processed": movie["processed"],
+        }
+        for movie in movies
+    ]
+
+    try:
+        for chunk in _chunks(movie_rows, batch_size):
+            db.execute(insert(models.Movie.__table__), chunk)
+
+        # map the new movies back to their IDs for the association rows
+        movie_ids = {}
+
+        for chunk in _chunks([movie["filename"] for movie in movies], IN_CLAUSE_SIZE):
+            movie_ids.update(
+                db.query(models.Movie.filename, models.Movie.id).filter(
+                    models.Movie.filename.in_(chunk)
+                )
+            )
+
+        actor_rows = [
+            {"movie_id": movie_ids[movie["filename"]], "actor_id": actor_id}
+            for movie in movies
+            for actor_id in movie["actor_ids"]
+        ]
+
+        category_rows = [
+            {"movie_id": movie_ids[movie["filename"]], "category_id": category_id}
+            for movie in movies
+            for category_id in movie["category_ids"]
+        ]
+
+        for table, rows in (
+            (models.movie_actors, actor_rows),
+            (models.movie_categories, category_rows),
+        ):
+            for chunk in _chunks(rows, batch_size):
+                db.execute(insert(table), chunk)
+
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+        raise DuplicateEntryException("Movie conflicts with existing")
+
+    return len(movie_rows) + len(actor_rows) + len(category_rows)
+
+
+def bulk_add_properties(
+    db: Session,
+    model: Type[models.TableBase],
+    names: Iterable[str],
+    batch_size: int = 5000,
+) -> Dict[str, int]:
+    """Adds many actors, categories, series, or studios in one transaction.
+
+    Args:
+        db: The database session.
+        model: The property model class (Actor, Category, Series, or Studio).
+        names: Names of the properties to add.
+        batch_size: Number of rows per insert statement.
+
+    Returns:
+        ids: Mapping of each property name to its new ID.
+
+    Raises:
+        DuplicateEntryException: A property already exists with that name.
+    """
+
+    names = list(names)
+    sorted_model = hasattr(model, "sort_name")
+
+    rows = [
+        {
+            "name": name,
+            "sort_name": util.generate_sort_name(name),
+            "sort_key": util.generate_sort_key(name),
+        }
+        if sorted_model
+        else {"name": name, "sort_key": util.generate_sort_key(name)}
+        for name in names
+    ]
+
+    try:
+        for chunk in _chunks(rows, batch_size):
+            db.execute(insert(model.__table__), chunk)
+
+        ids = {}
+
+        for chunk in _chunks(names, IN_CLAUSE_SIZE):
+            ids.update(db.query(model.name, model.id).filter(model.name.in_(chunk)))
+
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+        raise DuplicateEntryException(
+            f"{model.__name__} conflicts with existing entries"
+        )
+
+    return ids
+
+
+def bulk_delete_movies(
+    db: Session,
+    ids: List[int],
+) -> int:
+    """Deletes many movies and their property associations in one transaction.
+
+    Only the database rows are removed; the movie files are left alone.
+
+    Args:
+        db: The database session.
+        ids: IDs of the movies to delete.
+
+    Returns:
+        rows: The number of movies deleted.
+    """
+
+    for chunk in _chunks(ids, IN_CLAUSE_SIZE):
+        for table in (models.movie_actors, models.movie_categories):
+            db.execute(delete(table).where(table.c.movie_id.in_(chunk)))
+
+        db.execute(delete(models.Movie.__table__).where(models.Movie.id.in_(chunk)))
+
+    db.commit()
+
+    return len(ids)
+
+
+def bulk_update_movie_associations(
+    db: Session,
+    table: Table,
+    added: List[Tuple[int, int]],
+    removed: List[Tuple[int, int]],
+    batch_size: int = 5000,
+) -> int:
+    """Adds and removes many movie actor or movie category rows at once.
+
+    Args:
+        db: The database session.
+        table: The association table (movie_actors or movie_categories).
+        added: The (movie_id, property_id) rows to add.
+        removed: The (movie_id, property_id) rows to remove.
+        batch_size: Number of rows per statement.
+
+    Returns:
+        rows: The number of rows added and removed.
+
+    Raises:
+        DuplicateEntryException: An added row already exists.
+    """
+
+    movie_column, property_column = table.c
+
+    removed_rows = [
+        {"m": movie_id, "p": property_id} for movie_id, property_id in removed
+    ]
+    added_rows = [
+        {movie_column.name: movie_id, property_column.name: property_id}
+        for movie_id, property_id in added
+    ]
+
+    statement = delete(table).where(
+        movie_column == bindparam("m"), property_column == bindparam("p")
+    )
+
+    try:
+        for chunk in _chunks(removed_rows, batch_size):
+            db.execute(statement, chunk)
+
+        for chunk in _chunks(added_rows, batch_size):
+            db.execute(insert(table), chunk)
+
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+        raise DuplicateEntryException(f"Association conflicts with {table.name}")
+
+    return len(added_rows) + len(removed_rows)
+
+
+def bulk_update_movies(
+    db: Session,
+    movies: List[Dict[str, Any]],
+) -> int:
+    """Updates columns on many movies in one transaction.
+
+    Args:
+        db: The database session.
+        movies: Dicts with the movie id and the column values to update.
+
+    Returns:
+        rows: The number of movies updated.
+    """
+
+    db.bulk_update_mappings(
+        models.Movie,
+        [
+            {**movie, "sort_key": util.generate_sort_key(movie["name"])}
+            if "name" in movie
+            else movie
+            for movie in movies
+        ],
+    )
+    db.commit()
+
+    return len(movies)
+
+
 def delete_actor(
     db: Session,
     id: int,
@@ -379,7 +941,7 @@ def delete_movie(
         InvalidIDException: Movie does not exist.
     """
 
-    movie = get_movie(db, id)
+    movie = get_movie(db, id, with_properties=True)
 
     if movie is None:
         raise InvalidIDException(f"Movie ID {id} does not exist")
@@ -411,7 +973,7 @@ def delete_movie_actor(
             on the movie.
     """
 
-    movie = get_movie(db, movie_id)
+    movie = get_movie(db, movie_id, with_properties=True)
 
     if movie is None:
         raise InvalidIDException(f"Movie ID {movie_id} does not exist")
@@ -458,7 +1020,7 @@ def delete_movie_category(
             not on the movie.
     """
 
-    movie = get_movie(db, movie_id)
+    movie = get_movie(db, movie_id, with_properties=True)
 
     if movie is None:
         raise InvalidIDException(f"Movie ID {movie_id} does not exist")
@@ -557,39 +1119,140 @@ def delete_studio(
     return studio.name
 
 
-def get_all_actors(db: Session) -> List[models.Actor]:
-    """Return list of all actors in alphabetical order.
+def filter_movies(
+    db: Session,
+    actor_ids: Iterable[int] = (),
+    category_ids: Iterable[int] = (),
+    series_id: Optional[int] = None,
+    studio_id: Optional[int] = None,
+    processed: Optional[bool] = None,
+    limit: int = 100,
+    after: Optional[Sequence[Any]] = None,
+    facet_limit: int = 50,
+) -> Tuple[Dict[str, Any], Optional[List[Any]]]:
+    """Return a page of the movies matching all filters and their facet counts.
+
+    Movies must have every given actor and category. The facets count the
+    matching movies of each actor, category, series, and studio, and how many
+    are processed. Every filter is an index lookup, and the facets are
+    grouped in SQL, so no movie objects are loaded. The facets of the
+    unfiltered, processed flag and single category queries are cached until
+    the movies or their properties change.
 
     Args:
         db: The database session.
+        actor_ids: Actors the movies must all have.
+        category_ids: Categories the movies must all have.
+        series_id: The series of the movies, if any.
+        studio_id: The studio of the movies, if any.
+        processed: The processed flag of the movies, if any.
+        limit: The maximum number of movies to return.
+        after: The sort key returned with the previous page, if any.
+        facet_limit: The maximum number of values returned for each property
+            facet, those with the most movies first.
+
+    Returns:
+        result: The total, the (id, filename) rows of the page as movies, and
+            the facets, matching MovieFilterSchema.
+        next_key: The sort key to get the next page with, or None if this is
+            the last page.
     """
 
-    return (
-        db.query(models.Actor)
-        .order_by(
-            models.Actor.name,
+    actor_ids = list(actor_ids)
+    category_ids = list(category_ids)
+    # a library has few categories, each on a large part of it, so the
+    # facets of a single category are cached like those of the whole library
+    cached = (
+        not actor_ids
+        and len(category_ids) <= 1
+        and series_id is None
+        and studio_id is None
+    )
+    conditions = []
+
+    if processed is not None:
+        conditions.append(models.Movie.processed == processed)
+
+    if series_id is not None:
+        conditions.append(models.Movie.series_id == series_id)
+
+    if studio_id is not None:
+        conditions.append(models.Movie.studio_id == studio_id)
+
+    for table, column, ids in (
+        (models.movie_actors, models.movie_actors.c.actor_id, actor_ids),
+        (models.movie_categories, models.movie_categories.c.category_id, category_ids),
+    ):
+        for id in ids:
+            conditions.append(
+                models.Movie.id.in_(select(table.c.movie_id).where(column == id))
+            )
+
+    def load() -> Tuple[int, Dict[str, Any]]:
+        return _movie_facets(db, conditions, facet_limit)
+
+    if cached:
+        # these are asked for on every page load, so their facets are
+        # grouped once per change instead of once per request
+        total, facets = _cache.get(
+            ("facets", tuple(category_ids), processed, facet_limit),
+            FACET_TABLES,
+            load,
         )
-        .all()
+    else:
+        total, facets = load()
+
+    query = _order_movies(
+        db.query(models.Movie.id, models.Movie.filename).filter(*conditions)
+    )
+
+    if processed is not None:
+        # the list key starts with the processed flag and char(1), so the
+        # page is read from that part of the index instead of checking the
+        # flag of every movie before it
+        flag = str(int(processed))
+        query = query.filter(
+            models.Movie.list_key >= f"{flag}\x01",
+            models.Movie.list_key < f"{flag}\x02",
+        )
+
+    rows, next_key = _page(query, _movie_sort_key(), limit, after)
+
+    return (
+        {
+            "total": total,
+            "movies": [{"id": id, "filename": filename} for id, filename in rows],
+            "facets": facets,
+        },
+        next_key,
     )
 
 
-def get_all_categories(db: Session) -> List[models.Category]:
+def get_all_actors(db: Session) -> List[ActorSchema]:
+    """Return list of all actors in alphabetical order.
+
+    The list is cached until the actors table changes.
+
+    Args:
+        db: The database session.
+    """
+
+    return _property_list(db, models.Actor, ActorSchema)
+
+
+def get_all_categories(db: Session) -> List[CategorySchema]:
     """Return list of all categories in alphabetical order.
 
+    The list is cached until the categories table changes.
+
     Args:
         db: The database session.
     """
 
-    return (
-        db.query(models.Category)
-        .order_by(
-            models.Category.name,
-        )
-        .all()
-    )
+    return _property_list(db, models.Category, CategorySchema)
 
 
-def get_all_movies(db: Session) -> List[models.Movie]:
+def get_all_movies(db: Session, with_properties: bool = False) -> List[models.Movie]:
     """Return list of all movies in the database.
 
     List will be sorted in the following manner:
@@ -599,53 +1262,53 @@ def get_all_movies(db: Session) -> List[models.Movie]:
 
     Args:
         db: The database session.
+        with_properties: True to eager load the movie properties for callers
+            that use them, so they do not cost extra queries per movie.
     """
 
-    return (
-        db.query(models.Movie)
-        .outerjoin(models.Studio)
-        .outerjoin(models.Series)
-        .order_by(
-            models.Movie.processed,
-            models.Studio.sort_name,
-            models.Series.sort_name,
-            models.Movie.series_number,
-            models.Movie.sort_name,
-        )
-        .all()
-    )
+    query = _order_movies(db.query(models.Movie))
 
+    if with_properties:
+        query = _with_properties(query)
 
-def get_all_series(db: Session) -> List[models.Series]:
+    return query.all()
+
+
+def get_all_movie_files(db: Session) -> List[Tuple[int, str]]:
+    """Return the ID and filename of all movies as plain tuples.
+
+    Uses the same order as get_all_movies, but selects only the two columns
+    so no Movie objects are built.
+
+    Args:
+        db: The database session.
+    """
+
+    return _order_movies(db.query(models.Movie.id, models.Movie.filename)).all()
+
+
+def get_all_series(db: Session) -> List[SeriesSchema]:
     """Return list of all series in alphabetical order.
 
+    The list is cached until the series table changes.
+
     Args:
         db: The database session.
     """
 
-    return (
-        db.query(models.Series)
-        .order_by(
-            models.Series.name,
-        )
-        .all()
-    )
+    return _property_list(db, models.Series, SeriesSchema)
 
 
-def get_all_studios(db: Session) -> List[models.Studio]:
+def get_all_studios(db: Session) -> List[StudioSchema]:
     """Return list of all studios in alphabetical order.
 
+    The list is cached until the studios table changes.
+
     Args:
         db: The database session.
     """
 
-    return (
-        db.query(models.Studio)
-        .order_by(
-            models.Studio.name,
-        )
-        .all()
-    )
+    return _property_list(db, models.Studio, StudioSchema)
 
 
 def get_actor(db: Session, id: int) -> models.Actor:
@@ -659,6 +1322,28 @@ def get_actor(db: Session, id: int) -> models.Actor:
     return db.query(models.Actor).filter(models.Actor.id == id).first()
 
 
+def get_actors(db: Session, ids: Iterable[int]) -> Dict[int, models.Actor]:
+    """Return the actors with the given IDs, using a few IN queries.
+
+    Args:
+        db: The database session.
+        ids: The actor IDs.
+
+    Returns:
+        actors: Actor ID -> Actor, without the IDs that were not found.
+    """
+
+    actors = {}
+
+    for chunk in _chunks(sorted(set(ids)), IN_CLAUSE_SIZE):
+        actors.update(
+            (actor.id, actor)
+            for actor in db.query(models.Actor).filter(models.Actor.id.in_(chunk))
+        )
+
+    return actors
+
+
 def get_actor_by_name(db: Session, name: str) -> models.Actor:
     """Return actor with the given name, or None if not found.
 
@@ -670,6 +1355,29 @@ def get_actor_by_name(db: Session, name: str) -> models.Actor:
     return db.query(models.Actor).filter(models.Actor.name == name).first()
 
 
+def get_actor_movies(db: Session, id: int) -> List[models.Movie]:
+    """Return the movies of an actor with their properties eager loaded.
+
+    Args:
+        db: The database session.
+        id: The actor ID.
+    """
+
+    return (
+        _with_properties(db.query(models.Movie))
+        .join(models.Movie.actors)
+        .filter(models.Actor.id == id)
+        .order_by(models.Movie.sort_key)
+        .all()
+    )
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Return the number of cached property lists and maps, hits, and misses."""
+
+    return _cache.stats()
+
+
 def get_category(db: Session, id: int) -> models.Category:
     """Return category with the given ID, or None if not found.
 
@@ -692,15 +1400,211 @@ def get_category_by_name(db: Session, name: str) -> models.Category:
     return db.query(models.Category).filter(models.Category.name == name).first()
 
 
-def get_movie(db: Session, id: int) -> models.Movie:
+def get_category_movies(db: Session, id: int) -> List[models.Movie]:
+    """Return the movies of a category with their properties eager loaded.
+
+    Args:
+        db: The database session.
+        id: The category ID.
+    """
+
+    return (
+        _with_properties(db.query(models.Movie))
+        .join(models.Movie.categories)
+        .filter(models.Category.id == id)
+        .order_by(models.Movie.sort_key)
+        .all()
+    )
+
+
+def get_job(db: Session, id: int) -> models.Job:
+    """Return job with the given ID, or None if not found.
+
+    Args:
+        db: The database session.
+        id: The job ID.
+    """
+
+    return db.query(models.Job).filter(models.Job.id == id).first()
+
+
+def get_jobs(
+    db: Session, statuses: Optional[Iterable[str]] = None, limit: Optional[int] = None
+) -> List[models.Job]:
+    """Return jobs, newest first.
+
+    Args:
+        db: The database session.
+        statuses: Only return jobs with one of these statuses, if given.
+        limit: The maximum number of jobs to return, if given.
+    """
+
+    query = db.query(models.Job)
+
+    if statuses is not None:
+        query = query.filter(models.Job.status.in_(list(statuses)))
+
+    return query.order_by(models.Job.id.desc()).limit(limit).all()
+
+
+def get_movie(db: Session, id: int, with_properties: bool = False) -> models.Movie:
     """Return movie with the given ID, or None if not found.
 
     Args:
         db: The database session.
         id: The movie ID.
+        with_properties: True to eager load the movie properties.
+    """
+
+    query = db.query(models.Movie)
+
+    if with_properties:
+        query = _with_properties(query)
+
+    return query.filter(models.Movie.id == id).first()
+
+
+def get_movie_associations(
+    db: Session,
+) -> Tuple[
+    Dict[str, Tuple[int, Optional[int], Optional[int]]],
+    Dict[int, Set[int]],
+    Dict[int, Set[int]],
+]:
+    """Return the movies and their property IDs without loading Movie objects.
+
+    Args:
+        db: The database session.
+
+    Returns:
+        movies: Movie filename -> (id, series_id, studio_id).
+        actors: Movie ID -> actor IDs.
+        categories: Movie ID -> category IDs.
+    """
+
+    movies = {
+        filename: (id, series_id, studio_id)
+        for filename, id, series_id, studio_id in db.query(
+            models.Movie.filename,
+            models.Movie.id,
+            models.Movie.series_id,
+            models.Movie.studio_id,
+        )
+    }
+
+    actors = defaultdict(set)
+    categories = defaultdict(set)
+
+    for table, associations in (
+        (models.movie_actors, actors),
+        (models.movie_categories, categories),
+    ):
+        for movie_id, property_id in db.execute(select(*table.c)):
+            associations[movie_id].add(property_id)
+
+    return (movies, actors, categories)
+
+
+def get_movie_ids(db: Session, filenames: Iterable[str]) -> Dict[str, int]:
+    """Return a mapping of movie filename to ID for the given filenames.
+
+    Args:
+        db: The database session.
+        filenames: The movie filenames.
     """
 
-    return db.query(models.Movie).filter(models.Movie.id == id).first()
+    ids = {}
+
+    for chunk in _chunks(list(filenames), IN_CLAUSE_SIZE):
+        ids.update(
+            db.query(models.Movie.filename, models.Movie.id).filter(
+                models.Movie.filename.in_(chunk)
+            )
+        )
+
+    return ids
+
+
+def get_movie_files_page(
+    db: Session, limit: int, after: Optional[Sequence[Any]] = None
+) -> Tuple[List[Tuple[int, str]], Optional[List[Any]]]:
+    """Return one page of movie IDs and filenames in get_all_movies order.
+
+    Pages are found by comparing the sort key instead of using an offset, so
+    every page costs the same however deep into the list it is.
+
+    Args:
+        db: The database session.
+        limit: The maximum number of movies to return.
+        after: The sort key returned with the previous page, if any.
+
+    Returns:
+        movies: The (id, filename) rows of the page.
+        next_key: The sort key to get the next page with, or None if this is
+            the last page.
+    """
+
+    query = _order_movies(db.query(models.Movie.id, models.Movie.filename))
+
+    return _page(query, _movie_sort_key(), limit, after)
+
+
+def get_property_id(
+    db: Session, model: Type[models.TableBase], name: str
+) -> Optional[int]:
+    """Return the ID of the actor, category, series or studio with a name.
+
+    Looks the name up in the cached name to ID map of the table.
+
+    Args:
+        db: The database session.
+        model: The property model class (Actor, Category, Series, or Studio).
+        name: The property name.
+
+    Returns:
+        id: The property ID, or None if not found.
+    """
+
+    return _property_ids(db, model).get(name)
+
+
+def get_property_ids(db: Session, model: Type[models.TableBase]) -> Dict[str, int]:
+    """Return a mapping of name to ID for every actor, category, series or studio.
+
+    Args:
+        db: The database session.
+        model: The property model class (Actor, Category, Series, or Studio).
+    """
+
+    return dict(_property_ids(db, model))
+
+
+def get_property_page(
+    db: Session,
+    model: Type[models.TableBase],
+    limit: int,
+    after: Optional[Sequence[Any]] = None,
+) -> Tuple[List[Tuple[int, str, int]], Optional[List[Any]]]:
+    """Return one page of a property table in alphabetical order.
+
+    Args:
+        db: The database session.
+        model: The Actor, Category, Series, or Studio model.
+        limit: The maximum number of properties to return.
+        after: The sort key returned with the previous page, if any.
+
+    Returns:
+        properties: The (id, name, movie_count) rows of the page.
+        next_key: The sort key to get the next page with, or None if this is
+            the last page.
+    """
+
+    key = _property_sort_key(model)
+    query = db.query(model.id, model.name).order_by(*key)
+    rows, next_key = _page(query, key, limit, after)
+    counts = _movie_counts(db, model, [id for id, _ in rows])
+
+    return [(id, name, counts.get(id, 0)) for id, name in rows], next_key
 
 
 def get_series(db: Session, id: int) -> models.Series:
@@ -725,6 +1629,22 @@ def get_series_by_name(db: Session, name: str) -> models.Series:
     return db.query(models.Series).filter(models.Series.name == name).first()
 
 
+def get_series_movies(db: Session, id: int) -> List[models.Movie]:
+    """Return the movies of a series with their properties eager loaded.
+
+    Args:
+        db: The database session.
+        id: The series ID.
+    """
+
+    return (
+        _with_properties(db.query(models.Movie))
+        .filter(models.Movie.series_id == id)
+        .order_by(models.Movie.sort_key)
+        .all()
+    )
+
+
 def get_studio(db: Session, id: int) -> models.Studio:
     """Return studio with the given ID, or None if not found.
 
@@ -747,6 +1667,131 @@ def get_studio_by_name(db: Session, name: str) -> models.Studio:
     return db.query(models.Studio).filter(models.Studio.name == name).first()
 
 
+def get_studio_movies(db: Session, id: int) -> List[models.Movie]:
+    """Return the movies of a studio with their properties eager loaded.
+
+    Args:
+        db: The database session.
+        id: The studio ID.
+    """
+
+    return (
+        _with_properties(db.query(models.Movie))
+        .filter(models.Movie.studio_id == id)
+        .order_by(models.Movie.sort_key)
+        .all()
+    )
+
+
+def iter_movie_files(db: Session, batch_size: int = 1000) -> Iterator[Tuple[int, str]]:
+    """Yield the ID and filename of all movies in get_all_movies order.
+
+    Rows are fetched from the database cursor in batches as they are
+    consumed, so memory use does not grow with the number of movies.
+
+    Args:
+        db: The database session.
+        batch_size: The number of rows to fetch at a time.
+    """
+
+    query = _order_movies(db.query(models.Movie.id, models.Movie.filename))
+
+    for id, filename in query.yield_per(batch_size):
+        yield id, filename
+
+
+def iter_properties(
+    db: Session, model: Type[models.TableBase], batch_size: int = 1000
+) -> Iterator[Tuple[int, str, int]]:
+    """Yield the ID, name and movie count of a property table in alphabetical order.
+
+    The counts are grouped in SQL and joined to the properties in the same
+    query, so the rows are streamed without holding the counts in memory.
+
+    Args:
+        db: The database session.
+        model: The Actor, Category, Series, or Studio model.
+        batch_size: The number of rows to fetch at a time.
+    """
+
+    column = _movie_count_column(model)
+    counts = (
+        select(column.label("id"), func.count().label("count"))
+        .where(column.isnot(None))
+        .group_by(column)
+        .subquery()
+    )
+    query = (
+        db.query(model.id, model.name, func.coalesce(counts.c.count, 0))
+        .outerjoin(counts, counts.c.id == model.id)
+        .order_by(*_property_sort_key(model))
+    )
+
+    for id, name, count in query.yield_per(batch_size):
+        yield id, name, count
+
+
+def search(
+    db: Session, query: str, kinds: Optional[Iterable[str]] = None, limit: int = 20
+) -> List[Dict[str, Any]]:
+    """Return the movies and properties matching a search, best match first.
+
+    Every word of the query must be the start of a word in the name, or for
+    movies in the name or filename. Matches in names rank above matches in
+    filenames.
+
+    Every match is ranked. The rank is computed by the search index while it
+    reads the matches, so only the best limit rows are sorted and read back.
+
+    Args:
+        db: The database session.
+        query: The search text.
+        kinds: The kinds of results to return, see models.SEARCH_KINDS;
+            defaults to all of them.
+        limit: The maximum number of results.
+
+    Returns:
+        results: The kind, ID, name and filename of each result.
+    """
+
+    words = re.findall(r"\w+", query)
+
+    if len(words) == 0:
+        return []
+
+    factor = models.SEARCH_ROWID_FACTOR
+    codes = {
+        models.SEARCH_KINDS[kind][1]: kind
+        for kind in (models.SEARCH_KINDS if kinds is None else kinds)
+    }
+    params = {
+        # quoted words followed by * match as prefixes of indexed words
+        "match": " ".join(f'"{word}"*' for word in words),
+        "codes": list(codes),
+        "limit": limit,
+    }
+
+    # names weigh ten times as much as filenames in the rank
+    rows = db.execute(
+        text(
+            "SELECT rowid, name, filename FROM search_index "
+            "WHERE search_index MATCH :match AND rank MATCH 'bm25(10.0, 1.0)' "
+            f"AND rowid % {factor} IN :codes ORDER BY rank LIMIT :limit"
+        ).bindparams(bindparam("codes", expanding=True)),
+        params,
+    )
+
+    return [
+        {
+            "kind": codes[rowid % factor],
+            "id": rowid // factor,
+            "name": name,
+            "filename": filename,
+        }
+        for rowid, name, filename in rows
+    ]
+
+
 def update_actor(
     db: Session,
     id: int,
@@ -774,6 +1819,7 @@ def update_actor(
 
     name_old = actor.name
     actor.name = name
+    actor.sort_key = util.generate_sort_key(name)
 
     try:
         db.commit()
@@ -814,6 +1860,7 @@ def update_category(
 
     name_old = category.name
     category.name = name
+    category.sort_key = util.generate_sort_key(name)
 
     try:
         db.commit()
@@ -827,6 +1874,21 @@ def update_category(
     return category
 
 
+def update_job(db: Session, id: int, **values: Any) -> None:
+    """Updates columns of a job in its own transaction.
+
+    Args:
+        db: The database session.
+        id: The job ID.
+        values: The column values to set.
+    """
+
+    db.query(models.Job).filter(models.Job.id == id).update(
+        values, synchronize_session="fetch"
+    )
+    db.commit()
+
+
 def update_movie(db: Session, id: int, data: MovieUpdateSchema) -> models.Movie:
     """Updates movie information in the database.
 
@@ -844,7 +1906,7 @@ def update_movie(db: Session, id: int, data: MovieUpdateSchema) -> models.Movie:
         PathException: Problem updating movie file or links.
     """
 
-    movie = get_movie(db, id)
+    movie = get_movie(db, id, with_properties=True)
 
     if movie is None:
         raise InvalidIDException(f"Movie ID {id} does not exist")
@@ -864,6 +1926,7 @@ def update_movie(db: Session, id: int, data: MovieUpdateSchema) -> models.Movie:
 
     if movie.name != data.name:
         movie.sort_name = util.generate_sort_name(data.name)
+        movie.sort_key = util.generate_sort_key(data.name)
 
     # preserve current series + studio names for link updates later
     series_current = (
@@ -925,6 +1988,7 @@ def update_series(
     old_name = series.name
     series.name = name
     series.sort_name = util.generate_sort_name(name)
+    series.sort_key = util.generate_sort_key(name)
 
     try:
         db.commit()
@@ -966,6 +2030,7 @@ def update_studio(
     old_name = studio.name
     studio.name = name
     studio.sort_name = util.generate_sort_name(name)
+    studio.sort_key = util.generate_sort_key(name)
 
     try:
         db.commit()
@@ -1,11 +1,27 @@
+import threading
+import time
+from typing import Dict, Optional
+
 from sqlalchemy import create_engine, event
-from sqlalchemy.engine import Connection
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 
-from . import models
-from .config import get_sqlite_path
+from . import migrations, versions
+from .config import (
+    get_auto_migrate,
+    get_logger,
+    get_sqlite_optimize_interval,
+    get_sqlite_path,
+    get_sqlite_pragmas,
+    setup_logging,
+)
 
+__engine: Optional[Engine] = None
 __factory = None
+__optimize_lock = threading.Lock()
+__optimized = 0.0
+__pragmas: Dict[str, str] = {}
 
 
 def _fk_pragma_on_connect(conn: Connection, _):
@@ -14,6 +30,10 @@ def _fk_pragma_on_connect(conn: Connection, _):
 
     conn.execute("pragma foreign_keys=ON")
 
+    # values are validated by get_sqlite_pragmas
+    for pragma, value in __pragmas.items():
+        conn.execute(f"pragma {pragma}={value}")
+
 
 def get_db_session() -> Session:
     """Returns a new database session."""
@@ -24,24 +44,106 @@ def get_db_session() -> Session:
     with __factory() as db:
         yield db
 
+    optimize_db()
+
+
+def init_db(migrate: Optional[bool] = None) -> None:
+    """Connects to the database and creates or migrates its schema.
 
-def init_db() -> None:
-    global __factory
+    Args:
+        migrate: True to run pending migrations, False to refuse to start
+            when there are any; defaults to MM_AUTO_MIGRATE.
+
+    Raises:
+        SchemaVersionException: The database schema cannot be used.
+    """
+
+    global __engine, __factory, __optimized, __pragmas
+
+    # read the tuning profile before the first connection uses it
+    __pragmas = get_sqlite_pragmas()
 
     # create the sqlite engine
     # set check_same_thread to False or sqlite will have issues if uvicorn
     # changes threads while accessing the database
-    engine = create_engine(
+    __engine = create_engine(
         get_sqlite_path(),
         echo=False,
         connect_args={"check_same_thread": False},
     )
 
-    # enable foreign key integry checks on sqlite
-    event.listen(engine, "connect", _fk_pragma_on_connect)
+    # enable foreign key integry checks and the tuning pragmas on sqlite
+    event.listen(__engine, "connect", _fk_pragma_on_connect)
 
     # this creates our database sessions
-    __factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    __factory = sessionmaker(autocommit=False, autoflush=False, bind=__engine)
+
+    # create the sqlite database schema or bring it up to date
+    migrations.migrate(__engine, get_auto_migrate() if migrate is None else migrate)
+
+    # values cached for a previous connection do not apply to this one, and
+    # the change counters of the schema are read from now on, through a
+    # connection of its own that the sessions never share
+    versions.reset(
+        create_engine(
+            get_sqlite_path(),
+            poolclass=NullPool,
+            connect_args={"check_same_thread": False},
+        )
+    )
+
+    # the first optimize is due one interval after startup
+    __optimized = time.monotonic()
+
+
+def migrate_db() -> None:
+    """Sets up logging and migrates the database to the latest schema version."""
+
+    # setup logging
+    setup_logging()
+
+    init_db(migrate=True)
+
+    get_logger().info(
+        "Database schema is at version %d", migrations.get_version(__engine)
+    )
+
+
+def optimize_db(force: bool = False) -> bool:
+    """Runs PRAGMA optimize once MM_SQLITE_OPTIMIZE_INTERVAL seconds have passed.
+
+    Sqlite recommends running it periodically on long lived connections, so
+    the query planner statistics follow the data. It is called when a session
+    closes, which for a request is after the response has been sent.
+
+    Args:
+        force: True to run it now, even if the interval is disabled.
+
+    Returns:
+        optimized: True if PRAGMA optimize was run.
+    """
+
+    global __optimized
+
+    interval = get_sqlite_optimize_interval()
+
+    if __engine is None or (not force and interval <= 0):
+        return False
+
+    with __optimize_lock:
+        if not force and time.monotonic() - __optimized < interval:
+            return False
+
+        __optimized = time.monotonic()
+
+    try:
+        with __engine.connect() as conn:
+            conn.exec_driver_sql("pragma optimize")
+    except Exception:
+        get_logger().exception("Failed to optimize the sqlite database")
+
+        return False
+
+    get_logger().debug("Optimized the sqlite database")
 
-    # create sqlite database table schemas
-    models.TableBase.metadata.create_all(bind=engine)
+    return True
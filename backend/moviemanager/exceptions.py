@@ -16,6 +16,18 @@ class IntegrityConstraintException(Exception):
     pass
 
 
+class InvalidJobException(Exception):
+    """Raised when a job kind or its parameters are not valid."""
+
+    pass
+
+
+class JobCancelledException(Exception):
+    """Raised inside a running job when it has been cancelled."""
+
+    pass
+
+
 class ListFilesException(Exception):
     """Raised when we cannot list the files in a directory for any reason."""
 
@@ -26,3 +38,9 @@ class PathException(Exception):
     """Raised when any file operation fails."""
 
     pass
+
+
+class SchemaVersionException(Exception):
+    """Raised when the database schema version cannot be used as it is."""
+
+    pass
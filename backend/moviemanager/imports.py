@@ -0,0 +1,151 @@
+import os
+from logging import Logger
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from . import crud, journal, util
+from .config import get_logger
+from .exceptions import DuplicateEntryException
+
+
+# files moved between progress reports
+MOVE_CHUNK_SIZE = 100
+
+
+def _move_back(filenames: List[str], logger: Logger) -> None:
+    """Moves imported files back to the imports folder after a failure."""
+
+    for file, error in util.migrate_files(filenames, adding=False).items():
+        logger.error("Failed to move %s back to imports: %s", file, error)
+
+
+def batch_import(
+    db: Session, progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """Imports every movie in the imports folder in one pass.
+
+    The whole folder is parsed and checked against the database and the
+    movies folder before anything is changed. The files that pass are moved
+    together and added in a single transaction. If the insert fails, the
+    moved files are moved back to the imports folder; the moves are journaled
+    until the insert commits, so a crash in between is rolled back by
+    journal.recover on the next start.
+
+    Args:
+        db: The database session.
+        progress: Called with the number of files moved so far and the total.
+            An exception raised by it, such as when a job is cancelled,
+            moves the files back and is raised again.
+
+    Returns:
+        report: The number of files imported and failed, and the result of
+            each file, matching ImportReportSchema.
+
+    Raises:
+        ListFilesException: The imports folder could not be listed.
+        Exception: Adding the movies failed other than on a duplicate; the
+            files have been moved back.
+    """
+
+    logger = get_logger()
+
+    path_imports = util.get_movie_path(util.PathType.IMPORT)
+    path_movies = util.get_movie_path(util.PathType.MOVIE)
+
+    # skip the .keep files
+    files = [file for file in util.list_files(path_imports) if file != ".keep"]
+    files_info = util.parse_files_info(db, files)
+
+    existing = crud.get_movie_ids(db, files)
+    errors: Dict[str, str] = {}
+    movies: List[Dict[str, Any]] = []
+
+    for file, (name, studio_id, series_id, series_number, actors) in zip(
+        files, files_info
+    ):
+        if file in existing:
+            errors[file] = f"Movie {file} already exists"
+        elif not os.path.isfile(f"{path_imports}/{file}"):
+            errors[file] = f"{file} is not a file"
+        elif os.path.exists(f"{path_movies}/{file}"):
+            errors[file] = f"Moving {file} to {path_movies} conflicts with existing"
+        else:
+            movies.append(
+                {
+                    "filename": file,
+                    "name": name,
+                    "studio_id": studio_id,
+                    "series_id": series_id,
+                    "series_number": series_number,
+                    "processed": False,
+                    "actor_ids": [actor.id for actor in actors or []],
+                    "category_ids": [],
+                }
+            )
+
+    filenames = [movie["filename"] for movie in movies]
+
+    # journaled until the movies are committed, so a crash part way moves the
+    # files back on the next start; files that failed to move are skipped by
+    # journal.recover, as they are still in the imports folder
+    batch = journal.begin(
+        db,
+        [
+            ("rename", f"{path_imports}/{file}", f"{path_movies}/{file}")
+            for file in filenames
+        ],
+    )
+
+    try:
+        for start in range(0, len(filenames), MOVE_CHUNK_SIZE):
+            end = start + MOVE_CHUNK_SIZE
+            errors.update(util.migrate_files(filenames[start:end]))
+
+            if progress is not None:
+                progress(min(end, len(filenames)), len(filenames))
+    except Exception:
+        _move_back([file for file in filenames[:end] if file not in errors], logger)
+        journal.discard(db, batch)
+
+        raise
+
+    movies = [movie for movie in movies if movie["filename"] not in errors]
+
+    try:
+        # committed by bulk_add_movies together with the movies
+        journal.finish(db, batch)
+        crud.bulk_add_movies(db, movies)
+    except Exception as e:
+        db.rollback()
+
+        moved = [movie["filename"] for movie in movies]
+        _move_back(moved, logger)
+        journal.discard(db, batch)
+
+        if not isinstance(e, DuplicateEntryException):
+            raise
+
+        errors.update((file, str(e)) for file in moved)
+        movies = []
+
+    ids = crud.get_movie_ids(db, (movie["filename"] for movie in movies))
+
+    for file, error in errors.items():
+        logger.warn("Failed to import %s: %s", file, error)
+
+    logger.info("Imported %d movies, %d failed", len(ids), len(errors))
+
+    return {
+        "imported": len(ids),
+        "failed": len(errors),
+        "files": [
+            {
+                "filename": file,
+                "success": file in ids,
+                "id": ids.get(file),
+                "message": errors.get(file),
+            }
+            for file in files
+        ],
+    }
@@ -0,0 +1,306 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from enum import Enum
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Type
+
+from sqlalchemy.orm import Session
+
+from . import crud, imports, models, relink, renames
+from .config import get_job_workers, get_logger
+from .database import get_db_session
+from .exceptions import (
+    InvalidIDException,
+    InvalidJobException,
+    JobCancelledException,
+)
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+UNFINISHED = (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+
+
+@contextmanager
+def _db_session() -> Iterator[Session]:
+    """Yields a database session of its own for a job thread."""
+
+    yield from get_db_session()
+
+
+class JobContext:
+    """Lets a running job report its progress and notice cancellation."""
+
+    def __init__(self, queue: "JobQueue", id: int):
+        self.__queue = queue
+        self.id = id
+        self.percent = 0
+
+    def check_cancelled(self) -> None:
+        """Raises JobCancelledException if the job has been cancelled."""
+
+        if self.__queue.is_cancelled(self.id):
+            raise JobCancelledException(f"Job {self.id} was cancelled")
+
+    def progress(self, done: int, total: int, cancellable: bool = True) -> None:
+        """Records the progress of the job.
+
+        The percentage is only written to the database when it changes.
+
+        Args:
+            done: The units of work done so far.
+            total: The total units of work.
+            cancellable: False if the job cannot stop at this point.
+
+        Raises:
+            JobCancelledException: The job was cancelled and can stop here.
+        """
+
+        percent = 100 if total == 0 else min(100, done * 100 // total)
+
+        if percent != self.percent:
+            self.percent = percent
+
+            with _db_session() as db:
+                crud.update_job(db, self.id, progress=percent)
+
+        if cancellable:
+            self.check_cancelled()
+
+
+JobFunction = Callable[[Session, JobContext, Dict[str, Any]], Any]
+
+
+def _import_job(db: Session, context: JobContext, params: Dict[str, Any]) -> Any:
+    """Imports the imports folder; cancelling moves the files back."""
+
+    return imports.batch_import(db, context.progress)
+
+
+def _relink_job(db: Session, context: JobContext, params: Dict[str, Any]) -> Any:
+    """Relinks the property files; it can only be cancelled before it starts."""
+
+    context.check_cancelled()
+
+    return relink.relink(db, params.get("full", False))
+
+
+def _rename_job(model: Type[models.TableBase]) -> JobFunction:
+    """Returns a job that renames a property and the files of its movies.
+
+    The files are renamed as one batch that is undone if it fails, so the
+    job can only be cancelled before it starts. Its progress follows the
+    file operations of the batch.
+    """
+
+    def run(db: Session, context: JobContext, params: Dict[str, Any]) -> Any:
+        context.check_cancelled()
+
+        _, renamed = renames.rename_property(
+            db,
+            model,
+            params["id"],
+            params["name"],
+            lambda done, total: context.progress(done, total, cancellable=False),
+        )
+
+        return {"renamed": renamed}
+
+    return run
+
+
+JOB_KINDS: Dict[str, JobFunction] = {
+    "import": _import_job,
+    "relink": _relink_job,
+    "rename_actor": _rename_job(models.Actor),
+    "rename_series": _rename_job(models.Series),
+    "rename_studio": _rename_job(models.Studio),
+}
+
+RENAME_MODELS = {
+    "rename_actor": models.Actor,
+    "rename_series": models.Series,
+    "rename_studio": models.Studio,
+}
+
+
+def _check_params(db: Session, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Validates the parameters of a job before it is queued.
+
+    Raises:
+        InvalidJobException: The kind or parameters are not valid.
+        InvalidIDException: The property to rename does not exist.
+    """
+
+    if kind not in JOB_KINDS:
+        raise InvalidJobException(f"Unknown job kind {kind}")
+
+    if kind == "relink":
+        return {"full": bool(params.get("full", False))}
+
+    if kind in RENAME_MODELS:
+        id = params.get("id")
+        name = params.get("name")
+
+        if not isinstance(id, int) or not isinstance(name, str) or not name.strip():
+            raise InvalidJobException(f"{kind} needs an integer id and a name")
+
+        model = RENAME_MODELS[kind]
+        prop = db.query(model).filter(model.id == id).first()
+
+        if prop is None:
+            raise InvalidIDException(f"{model.__name__} ID {id} does not exist")
+
+        return {"id": id, "name": name.strip()}
+
+    return {}
+
+
+class JobQueue:
+    """Runs background jobs on a bounded thread pool.
+
+    Jobs are stored in the jobs table, so the queue survives restarts: jobs
+    that were queued or running when the server stopped are queued again by
+    resume. Cancelling a queued job stops it from starting; a running job
+    stops at the next point where it checks, if it can stop at all.
+    """
+
+    def __init__(self, workers: int):
+        self.__executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="job"
+        )
+        self.__lock = threading.Lock()
+        self.__cancelled: Set[int] = set()
+        self.__running: Set[int] = set()
+
+    def cancel(self, db: Session, id: int) -> models.Job:
+        """Cancels a queued or running job.
+
+        Raises:
+            InvalidIDException: The job does not exist.
+        """
+
+        job = crud.get_job(db, id)
+
+        if job is None:
+            raise InvalidIDException(f"Job ID {id} does not exist")
+
+        if job.status in UNFINISHED:
+            with self.__lock:
+                self.__cancelled.add(id)
+                running = id in self.__running
+
+            if not running:
+                crud.update_job(db, id, status=JobStatus.CANCELLED.value)
+
+        db.refresh(job)
+
+        return job
+
+    def is_cancelled(self, id: int) -> bool:
+        """Returns True if the job has been cancelled."""
+
+        with self.__lock:
+            return id in self.__cancelled
+
+    def resume(self, db: Session) -> int:
+        """Queues the jobs left unfinished by the last server run again.
+
+        Returns:
+            count: The number of jobs queued.
+        """
+
+        jobs = sorted(crud.get_jobs(db, UNFINISHED), key=lambda job: job.id)
+
+        for job in jobs:
+            crud.update_job(db, job.id, status=JobStatus.QUEUED.value, progress=0)
+            self.__executor.submit(self.__run, job.id)
+
+        return len(jobs)
+
+    def shutdown(self) -> None:
+        """Stops the worker threads once the running jobs finish."""
+
+        self.__executor.shutdown(wait=False)
+
+    def submit(self, db: Session, kind: str, params: Dict[str, Any]) -> models.Job:
+        """Validates and queues a job.
+
+        Raises:
+            InvalidJobException: The kind or parameters are not valid.
+            InvalidIDException: The property to rename does not exist.
+        """
+
+        job = crud.add_job(db, kind, _check_params(db, kind, params))
+        self.__executor.submit(self.__run, job.id)
+
+        return job
+
+    def __run(self, id: int) -> None:
+        logger = get_logger()
+
+        with self.__lock:
+            if id in self.__cancelled:
+                self.__cancelled.discard(id)
+                return
+
+            self.__running.add(id)
+
+        try:
+            with _db_session() as db:
+                job = crud.get_job(db, id)
+
+                if job is None or job.status != JobStatus.QUEUED.value:
+                    return
+
+                crud.update_job(db, id, status=JobStatus.RUNNING.value)
+                logger.info("Started job %d (%s)", id, job.kind)
+
+                try:
+                    result = JOB_KINDS[job.kind](db, JobContext(self, id), job.params)
+                except JobCancelledException:
+                    db.rollback()
+                    crud.update_job(db, id, status=JobStatus.CANCELLED.value)
+                    logger.info("Cancelled job %d", id)
+                except Exception as e:
+                    db.rollback()
+                    crud.update_job(db, id, status=JobStatus.FAILED.value, error=str(e))
+                    logger.exception("Job %d failed", id)
+                else:
+                    crud.update_job(
+                        db,
+                        id,
+                        status=JobStatus.SUCCEEDED.value,
+                        progress=100,
+                        result=result,
+                    )
+                    logger.info("Finished job %d", id)
+        except Exception:
+            # the executor would drop the error silently
+            logger.exception("Failed to run job %d", id)
+        finally:
+            with self.__lock:
+                self.__running.discard(id)
+                self.__cancelled.discard(id)
+
+
+__queue: Optional[JobQueue] = None
+__queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Returns the job queue, starting its worker pool on first use."""
+
+    global __queue
+
+    with __queue_lock:
+        if __queue is None:
+            __queue = JobQueue(get_job_workers())
+
+        return __queue
@@ -0,0 +1,237 @@
+import os
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import get_logger
+from .exceptions import PathException
+
+# (kind, path, target) file system operations of a batch:
+#   rename  moves the movie file or link directory path to target
+#   link    creates the symlink path pointing at target
+#   unlink  removes the symlink path pointing at target
+#   mkdir   creates the link directory path
+#   rmdir   removes the link directory path if it is empty
+Operation = Tuple[str, str, str]
+
+
+def _apply(operation: Operation) -> bool:
+    """Applies one operation, returning False if it found nothing to change."""
+
+    kind, path, target = operation
+
+    if kind == "rename":
+        os.rename(path, target)
+    elif kind == "link":
+        try:
+            os.symlink(target, path)
+        except FileExistsError:
+            return False
+    elif kind == "unlink":
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+    elif kind == "mkdir":
+        try:
+            os.mkdir(path)
+        except FileExistsError:
+            return False
+    elif kind == "rmdir":
+        try:
+            os.rmdir(path)
+        except OSError:
+            return False
+
+    return True
+
+
+def _is_applied(operation: Operation) -> bool:
+    """Returns True if the file system shows an operation as applied.
+
+    Used after a crash, when it is not known how far a batch got.
+    """
+
+    kind, path, target = operation
+
+    if kind == "rename":
+        return not os.path.lexists(path) and os.path.lexists(target)
+
+    if kind in ("link", "mkdir"):
+        return os.path.lexists(path)
+
+    return not os.path.lexists(path)
+
+
+def _undo(operation: Operation) -> None:
+    """Reverses an applied operation."""
+
+    kind, path, target = operation
+
+    if kind == "rename":
+        os.rename(target, path)
+    elif kind == "link":
+        os.remove(path)
+    elif kind == "unlink":
+        os.symlink(target, path)
+    elif kind == "mkdir":
+        os.rmdir(path)
+    elif kind == "rmdir":
+        os.mkdir(path)
+
+
+def apply_operations(
+    operations: Sequence[Operation],
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Operation]:
+    """Applies file system operations in order.
+
+    Existence checks are left to the operations themselves, so each one costs
+    a single system call. A missing link to remove, or a link or directory
+    that already exists, is skipped.
+
+    Args:
+        operations: The operations to apply.
+        progress: Called with the number of operations done so far and the
+            total after each one. An exception raised by it undoes the
+            applied operations and is raised again.
+
+    Returns:
+        applied: The operations that changed something, in order, for
+            undo_operations.
+
+    Raises:
+        PathException: An operation failed; the operations applied before it
+            have been undone.
+    """
+
+    applied: List[Operation] = []
+
+    for done, operation in enumerate(operations, 1):
+        try:
+            if _apply(operation):
+                applied.append(operation)
+        except OSError as e:
+            undo_operations(applied)
+
+            kind, path, target = operation
+            raise PathException(f"Failed to {kind} {path} -> {target}: {e}")
+
+        if progress is not None:
+            try:
+                progress(done, len(operations))
+            except Exception:
+                undo_operations(applied)
+
+                raise
+
+    return applied
+
+
+def undo_operations(applied: List[Operation]) -> None:
+    """Reverses applied operations, newest first.
+
+    Every operation is attempted; failures are logged, and leave the links
+    for relink_property_files to repair.
+
+    Args:
+        applied: The operations returned by apply_operations.
+    """
+
+    for operation in reversed(applied):
+        try:
+            _undo(operation)
+        except OSError:
+            get_logger().exception("Failed to undo %s %s", operation[0], operation[1])
+
+
+def begin(db: Session, operations: List[Operation]) -> str:
+    """Records the planned operations of a batch before any is applied.
+
+    The rows are committed on a connection of their own, so changes pending
+    in the session are not committed with them. The caller then applies the
+    operations, and deletes the rows with finish in the transaction that
+    commits the database side of the batch. Rows left after a crash mark a
+    batch whose database changes were never committed, for recover to roll
+    back.
+
+    Args:
+        db: The database session.
+        operations: The operations in the order they will be applied.
+
+    Returns:
+        batch: The batch ID to pass to finish or discard.
+    """
+
+    batch = uuid.uuid4().hex
+
+    if operations:
+        with db.get_bind().begin() as conn:
+            conn.execute(
+                insert(models.FileOperation),
+                [
+                    {"batch": batch, "kind": kind, "path": path, "target": target}
+                    for kind, path, target in operations
+                ],
+            )
+
+    return batch
+
+
+def finish(db: Session, batch: str) -> None:
+    """Deletes the rows of a batch in the session transaction.
+
+    The rows are gone exactly when the transaction commits, together with the
+    database changes of the batch.
+    """
+
+    db.execute(delete(models.FileOperation).where(models.FileOperation.batch == batch))
+
+
+def discard(db: Session, batch: str) -> None:
+    """Deletes the rows of a batch whose operations have been undone."""
+
+    with db.get_bind().begin() as conn:
+        conn.execute(
+            delete(models.FileOperation).where(models.FileOperation.batch == batch)
+        )
+
+
+def recover(db: Session) -> int:
+    """Rolls back the batches left unfinished by a crash.
+
+    Their database changes were never committed, so each of their operations
+    that the file system shows as applied is undone, newest first. Only the
+    journaled operations are checked, not the whole library.
+
+    Args:
+        db: The database session.
+
+    Returns:
+        count: The number of batches rolled back.
+    """
+
+    logger = get_logger()
+    batches: Dict[str, List[Operation]] = OrderedDict()
+
+    for row in db.query(models.FileOperation).order_by(models.FileOperation.id):
+        batches.setdefault(row.batch, []).append((row.kind, row.path, row.target))
+
+    for batch, operations in batches.items():
+        applied = [operation for operation in operations if _is_applied(operation)]
+        undo_operations(applied)
+
+        logger.warning(
+            "Rolled back %d of %d file operations of interrupted batch %s",
+            len(applied),
+            len(operations),
+            batch,
+        )
+
+        discard(db, batch)
+
+    return len(batches)
@@ -1,6 +1,7 @@
-from . import create_app
+from . import create_app, journal
 from .config import setup_logging
-from .database import init_db
+from .database import get_db_session, init_db
+from .jobs import get_job_queue
 
 ################################################################################
 # setup logging and database connection
@@ -8,6 +9,18 @@ from .database import init_db
 setup_logging()
 init_db()
 
+################################################################################
+# roll back the file operations of batches interrupted by the last run
+
+for db in get_db_session():
+    journal.recover(db)
+
+################################################################################
+# queue the background jobs left unfinished by the last run
+
+for db in get_db_session():
+    get_job_queue().resume(db)
+
 ################################################################################
 # create the FastAPI app
 
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from . import util
+from .config import get_manifest_path, get_scan_workers
+from .exceptions import ListFilesException
+
+MANIFEST_VERSION = 1
+
+# directory timestamps can be coarser than the clock, so a directory
+# modified this recently may still change without its mtime moving
+RACY_SECONDS = 2
+
+
+class Fingerprint(NamedTuple):
+    """Identifies the state of a directory without listing it."""
+
+    inode: int
+    mtime: int
+    size: int
+    entries: str
+
+    # hash of the links the database wanted when relink last synced a
+    # property directory, or None if relink has not synced it
+    wanted: Optional[str] = None
+
+
+class LinkDirChanges(NamedTuple):
+    """Link directories that differ from the manifest."""
+
+    # property names for each link directory type
+    names: Dict[util.PathType, List[str]]
+
+    # property directories that are new or were modified
+    changed: List[Tuple[util.PathType, str]]
+
+    # property directories in the manifest that no longer exist
+    removed: List[Tuple[util.PathType, str]]
+
+
+def hash_entries(entries: Iterable[str]) -> str:
+    """Returns a short hash of the sorted directory entry names."""
+
+    digest = hashlib.sha1("\0".join(sorted(entries)).encode("utf-8", "surrogateescape"))
+
+    return digest.hexdigest()[:16]
+
+
+def link_key(path_type: util.PathType, name: Optional[str] = None) -> str:
+    """Returns the manifest key of a link or property directory."""
+
+    return path_type.value if name is None else f"{path_type.value}/{name}"
+
+
+def stat_dir(path: str) -> Optional[os.stat_result]:
+    """Returns the stat of a directory, or None if it cannot be read."""
+
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+class Manifest:
+    """Fingerprints of the movie and link directories at the last sync.
+
+    A directory whose inode, mtime, and size still match its fingerprint has
+    not gained, lost, or renamed any entries since the manifest was saved, so
+    rebuild and relink can skip reading it. The entries hash catches
+    directories that were touched without their contents changing.
+
+    An unchanged directory only holds the right links if the database still
+    wants the same ones, so relink also records the hash of the wanted links
+    and checks a directory again when it differs. Rebuild and reconcile read
+    the directories to update the database, and record them as not synced.
+
+    The manifest is a compact JSON file in the DB path; MM_MANIFEST_PATH
+    overrides its location.
+    """
+
+    def __init__(self, dirs: Optional[Dict[str, Fingerprint]] = None):
+        self.dirs: Dict[str, Fingerprint] = dirs if dirs is not None else {}
+
+    @classmethod
+    def load(cls) -> "Manifest":
+        """Loads the saved manifest, or an empty one if none is usable."""
+
+        try:
+            with open(get_manifest_path(), "r") as f:
+                data = json.load(f)
+
+            if data.get("version") != MANIFEST_VERSION:
+                return cls()
+
+            return cls(
+                {key: Fingerprint(*value) for key, value in data["dirs"].items()}
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return cls()
+
+    def save(self) -> None:
+        """Atomically writes the manifest to disk."""
+
+        path = get_manifest_path()
+        path_tmp = f"{path}.tmp"
+
+        with open(path_tmp, "w") as f:
+            json.dump(
+                {"version": MANIFEST_VERSION, "dirs": self.dirs},
+                f,
+                separators=(",", ":"),
+            )
+
+        os.replace(path_tmp, path)
+
+    def changed(self, key: str, stat: Optional[os.stat_result]) -> bool:
+        """Returns True if the directory stat differs from its fingerprint."""
+
+        fingerprint = self.dirs.get(key)
+
+        return (
+            stat is None
+            or fingerprint is None
+            or (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            != (fingerprint.inode, fingerprint.mtime, fingerprint.size)
+        )
+
+    def same_entries(self, key: str, entries: Iterable[str]) -> bool:
+        """Returns True if the directory entries hash matches its fingerprint."""
+
+        fingerprint = self.dirs.get(key)
+
+        return fingerprint is not None and fingerprint.entries == hash_entries(entries)
+
+    def record(
+        self,
+        key: str,
+        stat: Optional[os.stat_result],
+        entries: Iterable[str],
+        wanted: Optional[str] = None,
+    ) -> None:
+        """Records the fingerprint of a directory.
+
+        The stat must be taken before listing the entries, so a change made
+        while listing is caught the next time around.
+
+        Args:
+            key: The manifest key of the directory.
+            stat: The directory stat, or None to forget the directory.
+            entries: The directory entries.
+            wanted: The hash_entries of the links relink synced the directory
+                to, if it did.
+        """
+
+        if stat is None:
+            self.forget(key)
+            return
+
+        # a racy mtime never matches, so the entries hash decides next time
+        mtime = stat.st_mtime_ns
+
+        if time.time() - stat.st_mtime < RACY_SECONDS:
+            mtime = -1
+
+        self.dirs[key] = Fingerprint(
+            stat.st_ino, mtime, stat.st_size, hash_entries(entries), wanted
+        )
+
+    def synced(self, key: str, wanted: str) -> bool:
+        """Returns True if relink last synced a directory to the wanted links."""
+
+        fingerprint = self.dirs.get(key)
+
+        return fingerprint is not None and fingerprint.wanted == wanted
+
+    def forget(self, key: str) -> None:
+        """Removes a directory from the manifest."""
+
+        self.dirs.pop(key, None)
+
+    def names(self, path_type: util.PathType) -> List[str]:
+        """Returns the property directory names recorded for a link directory."""
+
+        prefix = f"{path_type.value}/"
+
+        return [key.split("/", 1)[1] for key in self.dirs if key.startswith(prefix)]
+
+    def link_dir_changes(self, path_types: Iterable[util.PathType]) -> LinkDirChanges:
+        """Finds the property directories that changed since the last sync.
+
+        A link directory whose own fingerprint is unchanged has the same
+        property directories as before, so it is not listed again. Each
+        property directory then costs a single stat, spread over the
+        MM_SCAN_WORKERS thread pool.
+
+        Args:
+            path_types: The link directory types to check.
+
+        Returns:
+            changes: The property names and the changed or removed directories.
+        """
+
+        changes = LinkDirChanges({}, [], [])
+        executor = ThreadPoolExecutor(max_workers=max(1, get_scan_workers()))
+
+        for path_type in path_types:
+            key = link_key(path_type)
+            path = util.get_movie_path(path_type)
+            stat = stat_dir(path)
+            known: Set[str] = set(self.names(path_type))
+
+            if stat is None:
+                names = []
+            elif not self.changed(key, stat):
+                names = sorted(known)
+            else:
+                try:
+                    names = util.list_link_dirs(path_type)
+                except ListFilesException:
+                    names = []
+
+                self.record(key, stat, names)
+
+            changes.names[path_type] = names
+
+            dir_stats = executor.map(stat_dir, (f"{path}/{name}" for name in names))
+
+            for name, dir_stat in zip(names, dir_stats):
+                if dir_stat is None:
+                    changes.removed.append((path_type, name))
+                elif self.changed(link_key(path_type, name), dir_stat):
+                    changes.changed.append((path_type, name))
+
+            changes.removed.extend(
+                (path_type, name) for name in sorted(known - set(names))
+            )
+
+        executor.shutdown()
+
+        return changes
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# latencies kept per route for the percentiles
+SAMPLE_SIZE = 1024
+
+
+class LatencyMiddleware:
+    """Records how long each route takes to answer a request.
+
+    The time is measured until the handler returns its response, before the
+    body of a streaming response is sent. Requests are grouped by method and
+    route path, so /movies/1 and /movies/2 are counted together.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.__paths: Dict[Callable[..., Any], str] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            path = self.__route_path(scope)
+
+            if path is not None:
+                record(f"{scope['method']} {path}", time.perf_counter() - start)
+
+    def __route_path(self, scope: Scope) -> Optional[str]:
+        """Returns the path template of the route that handled the request."""
+
+        endpoint = scope.get("endpoint")
+
+        if endpoint is None:
+            return None
+
+        if endpoint not in self.__paths:
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    self.__paths[endpoint] = route.path
+
+        return self.__paths.get(endpoint)
+
+
+__lock = threading.Lock()
+__samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=SAMPLE_SIZE))
+__counts: Dict[str, int] = defaultdict(int)
+
+
+def record(key: str, seconds: float) -> None:
+    """Records the latency of one request."""
+
+    with __lock:
+        __samples[key].append(seconds)
+        __counts[key] += 1
+
+
+def get_latency_stats() -> Dict[str, Dict[str, float]]:
+    """Returns request counts and latency percentiles in ms for each route.
+
+    The percentiles cover the last SAMPLE_SIZE requests of each route.
+    """
+
+    with __lock:
+        samples = {key: sorted(values) for key, values in __samples.items()}
+        counts = dict(__counts)
+
+    def percentile(values, fraction):
+        return round(
+            values[min(len(values) - 1, int(len(values) * fraction))] * 1000, 3
+        )
+
+    return {
+        key: {
+            "count": counts[key],
+            "p50_ms": percentile(values, 0.5),
+            "p95_ms": percentile(values, 0.95),
+            "p99_ms": percentile(values, 0.99),
+            "max_ms": round(values[-1] * 1000, 3),
+        }
+        for key, values in sorted(samples.items())
+    }
+
+
+def reset() -> None:
+    """Clears the recorded latencies."""
+
+    with __lock:
+        __samples.clear()
+        __counts.clear()
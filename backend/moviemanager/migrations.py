@@ -0,0 +1,355 @@
+import secrets
+from typing import Any, Callable, Dict, Iterable, List
+
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Connection, Engine
+
+from . import models, util
+from .config import get_logger
+from .exceptions import SchemaVersionException
+
+# rows updated per transaction when a migration fills in a new column
+BACKFILL_BATCH_SIZE = 5000
+
+Migration = Callable[[Engine], None]
+
+################################################################################
+# helpers
+
+
+def _backfill(engine: Engine, table: str, assignment: str, where: str) -> int:
+    """Updates the rows of a table matching where in batches.
+
+    Each batch is committed on its own, so readers are only blocked for one
+    batch at a time on a large library.
+
+    Args:
+        engine: The database engine.
+        table: The table to update.
+        assignment: The SET clause.
+        where: Matches the rows still to update; it must stop matching a row
+            once the row is updated.
+
+    Returns:
+        count: The number of rows updated.
+    """
+
+    logger = get_logger()
+    total = 0
+
+    while True:
+        with engine.begin() as conn:
+            count = conn.exec_driver_sql(
+                f"UPDATE {table} SET {assignment} WHERE rowid IN "
+                f"(SELECT rowid FROM {table} WHERE {where} LIMIT ?)",
+                (BACKFILL_BATCH_SIZE,),
+            ).rowcount
+
+        if count == 0:
+            return total
+
+        total += count
+        logger.info("Updated %d rows of %s", total, table)
+
+
+def _create_functions(conn: Any, _: Any) -> None:
+    """Registers the SQL functions of the migrations on a new connection."""
+
+    conn.create_function("sort_key", 1, util.generate_sort_key)
+
+
+def _create_indexes(engine: Engine, table: str, names: Iterable[str]) -> None:
+    """Creates the named indexes of a table, each in its own transaction.
+
+    The index definitions are taken from the models. Indexes that already
+    exist are skipped.
+    """
+
+    logger = get_logger()
+    indexes = {
+        index.name: index for index in models.TableBase.metadata.tables[table].indexes
+    }
+
+    for name in names:
+        with engine.begin() as conn:
+            if name not in {
+                index["name"] for index in inspect(conn).get_indexes(table)
+            }:
+                logger.info("Creating index %s", name)
+                indexes[name].create(conn)
+
+
+def _create_triggers(conn: Connection, triggers: Dict[str, str]) -> None:
+    """Creates the triggers that do not exist yet."""
+
+    for name, trigger in triggers.items():
+        conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {trigger}")
+
+
+def _insert_table_versions(conn: Connection) -> None:
+    """Adds the change counter rows and the epoch if they do not exist yet."""
+
+    rows = [(table, 0) for table in models.VERSIONED_TABLES]
+    rows.append((models.VERSION_EPOCH, secrets.randbits(31)))
+
+    for row in rows:
+        conn.exec_driver_sql(
+            "INSERT OR IGNORE INTO table_versions (name, version) VALUES (?, ?)",
+            row,
+        )
+
+
+def _set_version(conn: Connection, version: int) -> None:
+    """Records the schema version in the database."""
+
+    # pragma values cannot be bound parameters
+    conn.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+
+################################################################################
+# migrations
+#
+# Each migration takes the database from the version before it to its own
+# version, its position in MIGRATIONS counting from 1. Databases created
+# before migrations existed are version 0. Migrations may be interrupted, so
+# every step must skip work that is already done.
+
+
+def _add_jobs_table(engine: Engine) -> None:
+    """Adds the table of background jobs."""
+
+    with engine.begin() as conn:
+        models.Job.__table__.create(conn, checkfirst=True)
+
+
+def _add_secondary_indexes(engine: Engine) -> None:
+    """Indexes the foreign keys and the reverse side of the association tables."""
+
+    # the movies indexes on series_id and studio_id are created by
+    # _add_sort_keys, which replaced the sort name in them
+    _create_indexes(engine, "movie_actors", ["ix_movie_actors_actor_id"])
+    _create_indexes(engine, "movie_categories", ["ix_movie_categories_category_id"])
+
+
+def _add_movie_list_key(engine: Engine) -> None:
+    """Stores the get_all_movies sort key in an indexed column."""
+
+    with engine.begin() as conn:
+        columns = {column["name"] for column in inspect(conn).get_columns("movies")}
+
+        if "list_key" not in columns:
+            conn.exec_driver_sql("ALTER TABLE movies ADD COLUMN list_key VARCHAR")
+
+    # the key is built from the sort keys now, so it is filled in and kept up
+    # to date from _add_sort_keys on
+    _create_indexes(engine, "movies", ["ix_movies_list_key"])
+
+
+def _add_search_index(engine: Engine) -> None:
+    """Adds the full text search index of movie and property names."""
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(models.SEARCH_INDEX)
+        _create_triggers(conn, models.SEARCH_TRIGGERS)
+
+        # an interrupted run may have left part of the entries
+        conn.exec_driver_sql("DELETE FROM search_index")
+
+    for table, code in models.SEARCH_KINDS.values():
+        filename = "filename" if table == "movies" else "NULL"
+        last_id = 0
+
+        while True:
+            with engine.begin() as conn:
+                ids = [
+                    id
+                    for id, in conn.exec_driver_sql(
+                        f"SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+                        (last_id, BACKFILL_BATCH_SIZE),
+                    )
+                ]
+
+                if len(ids) == 0:
+                    break
+
+                conn.exec_driver_sql(
+                    "INSERT INTO search_index (rowid, name, filename) "
+                    f"SELECT id * {models.SEARCH_ROWID_FACTOR} + {code}, name, "
+                    f"{filename} FROM {table} WHERE id BETWEEN ? AND ?",
+                    (ids[0], ids[-1]),
+                )
+
+            last_id = ids[-1]
+            get_logger().info("Indexed %s up to ID %d for search", table, last_id)
+
+
+def _add_processed_indexes(engine: Engine) -> None:
+    """Indexes movies and their series and studios by their processed flag."""
+
+    _create_indexes(
+        engine,
+        "movies",
+        [
+            "ix_movies_processed",
+            "ix_movies_processed_series_id",
+            "ix_movies_processed_studio_id",
+        ],
+    )
+
+
+def _add_file_operations_table(engine: Engine) -> None:
+    """Adds the journal of batched file operations."""
+
+    with engine.begin() as conn:
+        models.FileOperation.__table__.create(conn, checkfirst=True)
+
+
+def _add_sort_keys(engine: Engine) -> None:
+    """Stores natural sort keys for every table and orders the listings by them."""
+
+    # the backfills call the sort_key function
+    add_functions(engine)
+
+    with engine.begin() as conn:
+        for table in models.SORT_KEY_TABLES:
+            columns = {column["name"] for column in inspect(conn).get_columns(table)}
+
+            if "sort_key" not in columns:
+                conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN sort_key VARCHAR")
+
+            # the keys are written by the application; early builds of this
+            # migration filled them in with triggers calling sort_key
+            for name in (f"{table}_sort_key_insert", f"{table}_sort_key_update"):
+                conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+
+        # the movie list key is rebuilt from the sort keys below, so its
+        # triggers must not recompute it for every property key filled in
+        for name in models.MOVIE_LIST_KEY_TRIGGERS:
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+
+        for name in ("ix_movies_series_id_sort_name", "ix_movies_studio_id_sort_name"):
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+    for table in ("actors", "categories", "series", "studios"):
+        _backfill(engine, table, "sort_key = sort_key(name)", "sort_key IS NULL")
+        _create_indexes(engine, table, [f"ix_{table}_sort_key"])
+
+    # the list key reads the sort keys filled in above
+    _backfill(engine, "movies", "sort_key = sort_key(name)", "sort_key IS NULL")
+    _backfill(
+        engine, "movies", f"list_key = {models.MOVIE_LIST_KEY}", "list_key IS NULL"
+    )
+    _create_indexes(
+        engine,
+        "movies",
+        ["ix_movies_series_id_sort_key", "ix_movies_studio_id_sort_key"],
+    )
+
+    with engine.begin() as conn:
+        _create_triggers(conn, models.MOVIE_LIST_KEY_TRIGGERS)
+
+
+def _add_table_versions(engine: Engine) -> None:
+    """Adds the table change counters that other processes can see."""
+
+    with engine.begin() as conn:
+        models.TableVersion.__table__.create(conn, checkfirst=True)
+        _insert_table_versions(conn)
+        _create_triggers(conn, models.VERSION_TRIGGERS)
+
+
+MIGRATIONS: List[Migration] = [
+    _add_jobs_table,
+    _add_secondary_indexes,
+    _add_movie_list_key,
+    _add_search_index,
+    _add_processed_indexes,
+    _add_file_operations_table,
+    _add_sort_keys,
+    _add_table_versions,
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+################################################################################
+# public functions
+
+
+def add_functions(engine: Engine) -> None:
+    """Registers the SQL functions used by the migrations on every connection.
+
+    The schema itself calls no application functions, so other connections
+    to the database do not need them.
+    """
+
+    if not event.contains(engine, "connect", _create_functions):
+        event.listen(engine, "connect", _create_functions)
+
+
+def get_version(engine: Engine) -> int:
+    """Returns the schema version recorded in the database."""
+
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def migrate(engine: Engine, upgrade: bool = True) -> int:
+    """Creates the database schema or brings it up to the latest version.
+
+    A new database is created from the models and stamped with the latest
+    version. Otherwise the migrations after the recorded version are run in
+    order, and the version is recorded after each one. The SQL functions of
+    the migrations are registered on the engine first, see add_functions.
+
+    Args:
+        engine: The database engine.
+        upgrade: False to refuse to migrate an existing database.
+
+    Returns:
+        count: The number of migrations run.
+
+    Raises:
+        SchemaVersionException: The database is newer than this version of
+            the application, or it needs migrating and upgrade is False.
+    """
+
+    logger = get_logger()
+
+    add_functions(engine)
+
+    with engine.begin() as conn:
+        if not inspect(conn).has_table("movies"):
+            models.TableBase.metadata.create_all(bind=conn)
+            conn.exec_driver_sql(models.SEARCH_INDEX)
+            _create_triggers(conn, models.MOVIE_LIST_KEY_TRIGGERS)
+            _create_triggers(conn, models.SEARCH_TRIGGERS)
+            _insert_table_versions(conn)
+            _create_triggers(conn, models.VERSION_TRIGGERS)
+            _set_version(conn, LATEST_VERSION)
+
+            logger.info("Created database schema version %d", LATEST_VERSION)
+
+            return 0
+
+    version = get_version(engine)
+
+    if version > LATEST_VERSION:
+        raise SchemaVersionException(
+            f"Database schema version {version} is newer than the supported "
+            f"version {LATEST_VERSION}"
+        )
+
+    if version < LATEST_VERSION and not upgrade:
+        raise SchemaVersionException(
+            f"Database schema version {version} must be migrated to version "
+            f"{LATEST_VERSION}, run with --migrate"
+        )
+
+    for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+        logger.info("Migrating database to version %d: %s", number, migration.__doc__)
+        migration(engine)
+
+        with engine.begin() as conn:
+            _set_version(conn, number)
+
+    return LATEST_VERSION - version
@@ -1,4 +1,18 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Table
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    Text,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -20,6 +34,8 @@ movie_actors = Table(
         ForeignKey("actors.id"),
         primary_key=True,
     ),
+    # the primary key only covers lookups by movie, this covers Actor.movies
+    Index("ix_movie_actors_actor_id", "actor_id", "movie_id"),
 )
 
 movie_categories = Table(
@@ -31,6 +47,7 @@ movie_categories = Table(
         ForeignKey("categories.id"),
         primary_key=True,
     ),
+    Index("ix_movie_categories_category_id", "category_id", "movie_id"),
 )
 
 ################################################################################
@@ -45,12 +62,14 @@ class Actor(TableBase):
 
     id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False, unique=True)
+    # natural sort key, see SORT_KEY_TABLES
+    sort_key = Column(String, nullable=True, index=True)
 
     movies = relationship(
         "Movie",
         secondary=movie_actors,
         back_populates="actors",
-        order_by="Movie.sort_name",
+        order_by="Movie.sort_key",
         passive_deletes="all",
     )
 
@@ -63,18 +82,59 @@ class Category(TableBase):
 
     id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False, unique=True)
+    # natural sort key, see SORT_KEY_TABLES
+    sort_key = Column(String, nullable=True, index=True)
 
     movies = relationship(
         "Movie",
         secondary=movie_categories,
         back_populates="categories",
-        order_by="Movie.sort_name",
+        order_by="Movie.sort_key",
         passive_deletes="all",
     )
 
 
+class FileOperation(TableBase):
+    __tablename__ = "file_operations"
+
+    id = Column(Integer, primary_key=True)
+    batch = Column(String(32), nullable=False, index=True)
+    kind = Column(String(8), nullable=False)
+    path = Column(Text, nullable=False)
+    target = Column(Text, nullable=False)
+
+
+class Job(TableBase):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=False)
+    progress = Column(Integer, default=0, nullable=False)
+    params = Column(JSON, nullable=False)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated = Column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+    )
+
+
 class Movie(TableBase):
     __tablename__ = "movies"
+    __table_args__ = (
+        # Series.movies and Studio.movies are read in sort_key order
+        Index("ix_movies_series_id_sort_key", "series_id", "sort_key"),
+        Index("ix_movies_studio_id_sort_key", "studio_id", "sort_key"),
+        # filter_movies joins the association tables to movies by processed
+        # flag, and counts their series and studios
+        Index("ix_movies_processed", "processed"),
+        Index("ix_movies_processed_series_id", "processed", "series_id"),
+        Index("ix_movies_processed_studio_id", "processed", "studio_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     filename = Column(String(255), nullable=False, unique=True)
@@ -99,6 +159,17 @@ class Movie(TableBase):
         default=False,
         nullable=False,
     )
+    # get_all_movies sort key, maintained by the MOVIE_LIST_KEY_TRIGGERS
+    list_key = Column(
+        String,
+        nullable=True,
+        index=True,
+    )
+    # natural sort key, see SORT_KEY_TABLES
+    sort_key = Column(
+        String,
+        nullable=True,
+    )
 
     actors = relationship(
         "Actor",
@@ -136,11 +207,13 @@ class Series(TableBase):
     id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False, unique=True)
     sort_name = Column(String(255), nullable=False, unique=True)
+    # natural sort key, see SORT_KEY_TABLES
+    sort_key = Column(String, nullable=True, index=True)
 
     movies = relationship(
         "Movie",
         back_populates="series",
-        order_by="Movie.sort_name",
+        order_by="Movie.sort_key",
         passive_deletes="all",
     )
 
@@ -154,10 +227,178 @@ class Studio(TableBase):
     id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False, unique=True)
     sort_name = Column(String(255), nullable=False, unique=True)
+    # natural sort key, see SORT_KEY_TABLES
+    sort_key = Column(String, nullable=True, index=True)
 
     movies = relationship(
         "Movie",
         back_populates="studio",
-        order_by="Movie.sort_name",
+        order_by="Movie.sort_key",
         passive_deletes="all",
     )
+
+
+class TableVersion(TableBase):
+    __tablename__ = "table_versions"
+
+    # change counter of a table, maintained by the VERSION_TRIGGERS
+    name = Column(String(32), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+
+################################################################################
+# triggers
+
+# Names sort naturally by their sort_key column, which holds
+# util.generate_sort_key of the name. The crud functions write it along with
+# the name, as they do the sort name, so the database needs no application
+# functions. Other tools writing names must write the key along with them.
+SORT_KEY_TABLES = ("actors", "categories", "movies", "series", "studios")
+
+# The get_all_movies order uses the studio and series sort keys, which no
+# index on movies can cover. The sort key is stored in movies.list_key as a
+# string that compares like the tuple (processed, studio sort key, series sort
+# key, series number, movie sort key), so listing movies is an index scan.
+# The parts are joined with char(1), which sorts before any character in a
+# name, and series numbers are zero padded so they compare as numbers.
+MOVIE_LIST_KEY = """
+    movies.processed
+    || char(1) || coalesce(
+        (SELECT studios.sort_key FROM studios WHERE studios.id = movies.studio_id),
+        ''
+    )
+    || char(1) || coalesce(
+        (SELECT series.sort_key FROM series WHERE series.id = movies.series_id),
+        ''
+    )
+    || char(1) || CASE
+        WHEN movies.series_number IS NULL THEN ''
+        ELSE printf('%010d', movies.series_number)
+    END
+    || char(1) || coalesce(movies.sort_key, '')
+"""
+
+MOVIE_LIST_KEY_TRIGGERS = {
+    "movies_list_key_insert": f"""
+        AFTER INSERT ON movies BEGIN
+            UPDATE movies SET list_key = {MOVIE_LIST_KEY} WHERE id = NEW.id;
+        END
+    """,
+    "movies_list_key_update": f"""
+        AFTER UPDATE OF processed, sort_key, series_id, series_number, studio_id
+        ON movies BEGIN
+            UPDATE movies SET list_key = {MOVIE_LIST_KEY} WHERE id = NEW.id;
+        END
+    """,
+    "series_list_key_update": f"""
+        AFTER UPDATE OF sort_key ON series BEGIN
+            UPDATE movies SET list_key = {MOVIE_LIST_KEY}
+            WHERE series_id = NEW.id;
+        END
+    """,
+    "studios_list_key_update": f"""
+        AFTER UPDATE OF sort_key ON studios BEGIN
+            UPDATE movies SET list_key = {MOVIE_LIST_KEY}
+            WHERE studio_id = NEW.id;
+        END
+    """,
+}
+
+# Every committed change to a table the API caches increments its row in
+# table_versions, whichever process made it. versions.get reads the counters,
+# so cached values and ETags follow changes made by run.py commands too. The
+# VERSION_EPOCH row holds a random number picked when the database is created
+# instead, so a new database does not reuse the ETags of an old one.
+#
+# The derived sort and list keys are left out of the columns whose updates
+# count, as they only change along with these, and the triggers that fill
+# them in would otherwise count every insert three times.
+VERSIONED_TABLES = {
+    "actors": "name",
+    "categories": "name",
+    "movie_actors": "movie_id, actor_id",
+    "movie_categories": "movie_id, category_id",
+    "movies": (
+        "filename, name, sort_name, series_id, series_number, studio_id, processed"
+    ),
+    "series": "name, sort_name",
+    "studios": "name, sort_name",
+}
+
+VERSION_EPOCH = "epoch"
+
+VERSION_TRIGGERS = {
+    f"{table}_version_{event.split()[0].lower()}": f"""
+        AFTER {event} ON {table} BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+        END
+    """
+    for table, columns in VERSIONED_TABLES.items()
+    for event in ("INSERT", f"UPDATE OF {columns}", "DELETE")
+}
+
+################################################################################
+# full text search
+
+# The search index holds the names of movies and their properties and the
+# movie filenames. The rowid of an entry is the row ID times 8 plus the code
+# of its kind, so entries are found by rowid when a row changes.
+SEARCH_KINDS = {
+    "movie": ("movies", 0),
+    "actor": ("actors", 1),
+    "category": ("categories", 2),
+    "series": ("series", 3),
+    "studio": ("studios", 4),
+}
+
+SEARCH_ROWID_FACTOR = 8
+
+SEARCH_INDEX = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        name,
+        filename,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+"""
+
+
+def _search_triggers() -> Dict[str, str]:
+    """Returns the triggers that copy name changes into the search index."""
+
+    triggers = {}
+
+    for table, code in SEARCH_KINDS.values():
+        new_rowid = f"NEW.id * {SEARCH_ROWID_FACTOR} + {code}"
+        old_rowid = f"OLD.id * {SEARCH_ROWID_FACTOR} + {code}"
+        movies = table == "movies"
+        filename = "NEW.filename" if movies else "NULL"
+
+        triggers[
+            f"{table}_search_insert"
+        ] = f"""
+            AFTER INSERT ON {table} BEGIN
+                INSERT INTO search_index (rowid, name, filename)
+                VALUES ({new_rowid}, NEW.name, {filename});
+            END
+        """
+        triggers[
+            f"{table}_search_update"
+        ] = f"""
+            AFTER UPDATE OF {"name, filename" if movies else "name"} ON {table} BEGIN
+                UPDATE search_index SET name = NEW.name, filename = {filename}
+                WHERE rowid = {new_rowid};
+            END
+        """
+        triggers[
+            f"{table}_search_delete"
+        ] = f"""
+            AFTER DELETE ON {table} BEGIN
+                DELETE FROM search_index WHERE rowid = {old_rowid};
+            END
+        """
+
+    return triggers
+
+
+SEARCH_TRIGGERS = _search_triggers()
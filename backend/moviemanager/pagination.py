@@ -0,0 +1,101 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from fastapi import Query, status
+from fastapi.exceptions import HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# response header holding the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# page size used when a cursor is given without a limit
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# every sort key is a sort column and the row ID
+KEY_SIZE = 2
+
+################################################################################
+# query parameters shared by the list endpoints
+
+LimitQuery = Query(
+    None,
+    ge=1,
+    le=MAX_PAGE_SIZE,
+    description="Maximum number of rows to return; enables pagination",
+)
+AfterQuery = Query(
+    None,
+    description=f"Cursor from the {NEXT_CURSOR_HEADER} header of the previous page",
+)
+StreamQuery = Query(
+    False,
+    description="Stream every row as newline delimited JSON",
+)
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[List[Any]]:
+    """Returns the sort key encoded in a page cursor.
+
+    Args:
+        cursor: The cursor from the previous page, or None for the first page.
+
+    Raises:
+        HTTPException: The cursor is malformed.
+    """
+
+    if cursor is None:
+        return None
+
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        key = None
+
+    if not isinstance(key, list) or len(key) != KEY_SIZE:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, detail={"message": "Invalid cursor"}
+        )
+
+    return key
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    """Returns an opaque page cursor for a sort key."""
+
+    data = json.dumps(list(key), separators=(",", ":"))
+
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+
+def page_response(
+    rows: Union[List[Dict[str, Any]], Dict[str, Any]],
+    next_key: Optional[Sequence[Any]],
+    headers: Optional[Dict[str, str]] = None,
+) -> JSONResponse:
+    """Returns a page of rows, with the next page cursor in a header.
+
+    List endpoints keep a plain list body so paginated and unpaginated
+    responses have the same shape. The header is left out on the last page.
+    """
+
+    response = JSONResponse(rows, headers=headers)
+
+    if next_key is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(next_key)
+
+    return response
+
+
+def stream_response(
+    rows: Iterable[Dict[str, Any]], headers: Optional[Dict[str, str]] = None
+) -> StreamingResponse:
+    """Returns rows as newline delimited JSON, serialized as they are read."""
+
+    return StreamingResponse(
+        (json.dumps(row) + "\n" for row in rows),
+        headers=headers,
+        media_type="application/x-ndjson",
+    )
@@ -0,0 +1,120 @@
+import os.path
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+# name, studio, series, series_number, actors parsed from a filename
+ParsedFilename = Tuple[
+    Optional[str], Optional[str], Optional[str], Optional[str], Optional[str]
+]
+
+# filenames sent to a worker process at a time by parse_many
+PARSE_CHUNK_SIZE = 10000
+
+
+class FilenameParser:
+    """Parses movie properties from filenames with a precompiled grammar.
+
+    The grammar is the inverse of util.generate_movie_filename:
+
+        [Studio] {Series Series#} MovieName (Actor1, Actor2, ..., ActorN).ext
+
+    Every part is optional. A filename that does not match the grammar is
+    parsed as a movie name alone.
+    """
+
+    # The series and movie names are matched greedily, then give back the
+    # trailing series number or space a lazy match would have left. That
+    # takes one backtrack instead of a retry after every character, and parses
+    # the same names. The pattern is used with match, anchoring the start.
+    PATTERN = (
+        # Optional studio
+        r"(?:\[([A-Za-z0-9 :.,\'-]+)\])?"
+        # Optional space
+        r" ?"
+        # Optional series name, ending before a space and number if present
+        r"(?:{([A-Za-z0-9 :.,\'-]*[A-Za-z0-9 :.,\'-](?= [0-9]+})"
+        r"|[A-Za-z0-9 :.,\'-]+)"
+        # Optional series number
+        r"(?: ([0-9]+))?})?"
+        # Optional space
+        r" ?"
+        # Optional movie name, ending before a space if one is left
+        r"([A-Za-z0-9 :.,\'-]*[A-Za-z0-9 :.,\'-](?= (?:\(|$))"
+        r"|[A-Za-z0-9 :.,\'-]+)?"
+        # Optional space
+        r" ?"
+        # Optional actor list
+        r"(?:\(([A-Za-z0-9 .,\'-]+)\))?"
+        # End of line
+        r"$"
+    )
+
+    def __init__(self):
+        self.__match = re.compile(self.PATTERN).match
+
+    def parse(self, filename: str) -> ParsedFilename:
+        """Parses one filename, see util.parse_filename."""
+
+        name, _ = os.path.splitext(filename)
+        matches = self.__match(name)
+
+        if matches is None:
+            return (name, None, None, None, None)
+
+        studio_name, series_name, series_number, name, actor_names = matches.groups()
+
+        return (name, studio_name, series_name, series_number, actor_names)
+
+    def parse_many(
+        self, filenames: Iterable[str], workers: int = 0
+    ) -> List[ParsedFilename]:
+        """Parses many filenames.
+
+        Parsing is CPU bound, so threads do not help. With workers, an input
+        of more than one chunk is split across a pool of processes; starting
+        the pool and copying the filenames to it costs more than parsing a
+        small input in process.
+
+        Args:
+            filenames: The filenames to parse.
+            workers: The number of worker processes, 0 to parse in process.
+
+        Returns:
+            parsed: The parse result for each filename, in order.
+        """
+
+        filenames = list(filenames)
+
+        if workers > 0 and len(filenames) > PARSE_CHUNK_SIZE:
+            chunks = []
+
+            for start in range(0, len(filenames), PARSE_CHUNK_SIZE):
+                end = start + PARSE_CHUNK_SIZE
+                chunks.append(filenames[start:end])
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return [
+                    parsed
+                    for chunk in executor.map(_parse_chunk, chunks)
+                    for parsed in chunk
+                ]
+
+        parse = self.parse
+
+        return [parse(filename) for filename in filenames]
+
+
+_parser = FilenameParser()
+
+
+def _parse_chunk(filenames: List[str]) -> List[ParsedFilename]:
+    """Parses a chunk of filenames in a worker process."""
+
+    return _parser.parse_many(filenames)
+
+
+def get_filename_parser() -> FilenameParser:
+    """Returns the shared filename parser."""
+
+    return _parser
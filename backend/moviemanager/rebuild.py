@@ -1,212 +1,666 @@
 import sys
-from typing import Dict, List
+import time
+from logging import Logger
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
 
-from . import config, crud, util
+from sqlalchemy.orm import Session
+
+from . import config, crud, models, parsing, util
 from .database import get_db_session, init_db
 from .exceptions import ListFilesException
-
-
-def rebuild_db():
-    """Recreates the sqlite database from information on the file system."""
-
-    # setup logging and get app configuration
-    config.setup_logging()
-    logger = config.get_logger()
-
-    # create the database tables and get a connection
-    init_db()
-    db = next(get_db_session())
+from .manifest import Manifest, link_key, stat_dir
+
+PROPERTY_MODELS = {
+    util.PathType.ACTOR: models.Actor,
+    util.PathType.CATEGORY: models.Category,
+    util.PathType.SERIES: models.Series,
+    util.PathType.STUDIO: models.Studio,
+}
+
+
+class Library(NamedTuple):
+    """Movie library information read from the file system."""
+
+    # movie filenames in the movies directory
+    movie_files: List[str]
+
+    # deduplicated and alphabetized property names
+    properties: Dict[util.PathType, List[str]]
+
+    # movie filename -> property names
+    movie_actors: Dict[str, Set[str]]
+    movie_categories: Dict[str, Set[str]]
+    movie_series: Dict[str, Optional[str]]
+    movie_studios: Dict[str, Optional[str]]
+
+    # movie filename -> data parsed from the filename
+    movie_name: Dict[str, Optional[str]]
+    movie_series_number: Dict[str, Optional[str]]
+
+
+class LibraryDiff(NamedTuple):
+    """Changes needed to bring the database in line with the file system."""
+
+    properties_added: Dict[util.PathType, List[str]]
+    movies_added: List[str]
+    movies_removed: Dict[str, int]
+    movies_updated: List[Tuple[str, Optional[str], Optional[str]]]
+    actors_added: List[Tuple[str, str]]
+    actors_removed: List[Tuple[str, str]]
+    categories_added: List[Tuple[str, str]]
+    categories_removed: List[Tuple[str, str]]
+
+    def summary(self) -> Dict[str, int]:
+        """Returns the number of changes of each kind."""
+
+        return {
+            "properties_added": sum(
+                len(names) for names in self.properties_added.values()
+            ),
+            "movies_added": len(self.movies_added),
+            "movies_removed": len(self.movies_removed),
+            "movies_updated": len(self.movies_updated),
+            "actors_added": len(self.actors_added),
+            "actors_removed": len(self.actors_removed),
+            "categories_added": len(self.categories_added),
+            "categories_removed": len(self.categories_removed),
+        }
+
+
+def _scan_library(
+    logger: Logger,
+    workers: Optional[int] = None,
+    manifest: Optional[Manifest] = None,
+) -> Library:
+    """Reads the movie files and property links from the file system.
+
+    Args:
+        logger: The application logger.
+        workers: Number of threads scanning link directories.
+        manifest: Manifest to record the fingerprint of every directory in.
+
+    Returns:
+        library: The library information.
+
+    Raises:
+        ListFilesException: The movies directory cannot be read.
+    """
+
+    if manifest is None:
+        manifest = Manifest()
 
     # list the movie files
-    try:
-        path = util.get_movie_path(util.PathType.MOVIE)
-        movie_files = util.list_files(path)
-    except ListFilesException as e:
-        logger.critical(str(e))
-        sys.exit(1)
+    path = util.get_movie_path(util.PathType.MOVIE)
+    stat = stat_dir(path)
+    movie_files = util.list_files(path)
+
+    manifest.record(util.PathType.MOVIE.value, stat, movie_files)
 
     # create lists of movie properties
     # seed them with the files in the link directories
-    actors = []
-    categories = []
-    series = []
-    studios = []
-
-    for path_type in (
-        util.PathType.ACTOR,
-        util.PathType.CATEGORY,
-        util.PathType.SERIES,
-        util.PathType.STUDIO,
-    ):
-        files: List[str] = locals()[path_type.value]
+    properties: Dict[util.PathType, List[str]] = {}
+
+    for path_type in PROPERTY_MODELS:
         path = util.get_movie_path(path_type)
+        stat = stat_dir(path)
 
         try:
-            files.extend(util.list_files(path))
+            properties[path_type] = util.list_link_dirs(path_type)
+            manifest.record(link_key(path_type), stat, properties[path_type])
             logger.info("Loaded %s from link directory %s", path_type, path)
         except ListFilesException:
+            properties[path_type] = []
             logger.warn("Failed to load %s from link directory %s", path_type, path)
 
     # create association lists of movies -> properties
     # seed these with the files in the link directories
-    movie_actors = {filename: [] for filename in movie_files}
-    movie_categories = {filename: [] for filename in movie_files}
-    movie_series = {filename: [] for filename in movie_files}
-    movie_studios = {filename: [] for filename in movie_files}
-
-    for path_type in (
-        util.PathType.ACTOR,
-        util.PathType.CATEGORY,
-        util.PathType.SERIES,
-        util.PathType.STUDIO,
-    ):
-        names: List[str] = locals()[path_type.value]
-        path = util.get_movie_path(path_type)
+    associations: Dict[util.PathType, Dict[str, List[str]]] = {
+        path_type: {filename: [] for filename in movie_files}
+        for path_type in PROPERTY_MODELS
+    }
 
-        for name in names:
-            full_path = f"{path}/{name}"
-
-            try:
-                files = util.list_files(full_path)
-                logger.info("Loaded link files from %s", full_path)
-            except ListFilesException:
-                logger.error("Unable to read link files in %s", full_path)
-                continue
-
-            properties: Dict[str, List[str]] = locals()[f"movie_{path_type.value}"]
-
-            for file in files:
-                # if this test is false, it means there is a broken link
-                # a link directory file is pointing at a non-existent movie file
-                if file in properties:
-                    properties[file].append(name)
-                    logger.info(
-                        "Associated movie %s with %s in %s", file, name, path_type
-                    )
-                else:
-                    logger.warn("Broken link file %s/%s", full_path, file)
+    link_dirs = [
+        (path_type, name) for path_type, names in properties.items() for name in names
+    ]
+
+    # scan the property directories in parallel and stream in their links
+    for path_type, name, stat, files in util.scan_link_dirs(
+        link_dirs,
+        workers,
+        on_error=lambda path: logger.error("Unable to read link files in %s", path),
+    ):
+        manifest.record(link_key(path_type, name), stat, files)
+        movie_properties = associations[path_type]
+
+        for file in files:
+            # if this test is false, it means there is a broken link
+            # a link directory file is pointing at a non-existent movie file
+            if file in movie_properties:
+                movie_properties[file].append(name)
+                logger.debug("Associated movie %s with %s in %s", file, name, path_type)
+            else:
+                logger.warn(
+                    "Broken link file %s/%s/%s",
+                    util.get_movie_path(path_type),
+                    name,
+                    file,
+                )
 
     # get the remaining movie data from the movie files
     movie_name = {filename: None for filename in movie_files}
     movie_series_number = {filename: None for filename in movie_files}
 
-    for file in movie_files:
-        (
-            name,
-            studio_name,
-            series_name,
-            series_number,
-            actor_names,
-        ) = util.parse_filename(file)
+    parser = parsing.get_filename_parser()
+    parsed = parser.parse_many(movie_files, config.get_parse_workers())
 
+    for file, (
+        name,
+        studio_name,
+        series_name,
+        series_number,
+        actor_names,
+    ) in zip(movie_files, parsed):
         if name is not None:
             movie_name[file] = name
-            logger.info("Parsed name %s from file %s", name, file)
+            logger.debug("Parsed name %s from file %s", name, file)
 
         if actor_names is not None:
             file_actors = actor_names.split(", ")
 
-            actors.extend(file_actors)
-            movie_actors[file].extend(file_actors)
+            properties[util.PathType.ACTOR].extend(file_actors)
+            associations[util.PathType.ACTOR][file].extend(file_actors)
 
-            logger.info("Parsed actors (%s) from file %s", actor_names, file)
+            logger.debug("Parsed actors (%s) from file %s", actor_names, file)
 
         if series_name is not None:
-            series.append(series_name)
-            movie_series[file].append(series_name)
+            properties[util.PathType.SERIES].append(series_name)
+            associations[util.PathType.SERIES][file].append(series_name)
 
-            logger.info("Parsed series %s from file %s", series_name, file)
+            logger.debug("Parsed series %s from file %s", series_name, file)
 
         if series_number is not None:
             movie_series_number[file] = series_number
 
-            logger.info("Parsed series number %s from file %s", series_number, file)
+            logger.debug("Parsed series number %s from file %s", series_number, file)
 
         if studio_name is not None:
-            studios.append(studio_name)
-            movie_studios[file].append(studio_name)
-
-            logger.info("Parsed studio %s from file %s", studio_name, file)
+            properties[util.PathType.STUDIO].append(studio_name)
+            associations[util.PathType.STUDIO][file].append(studio_name)
+
+            logger.debug("Parsed studio %s from file %s", studio_name, file)
+
+    # if there is more than one series/studio after deduplication
+    # it means something is odd with the link directories
+    # no right answer here, so just pick one (consistently)
+    def pick_one(path_type: util.PathType) -> Dict[str, Optional[str]]:
+        return {
+            filename: min(names) if len(names) > 0 else None
+            for filename, names in associations[path_type].items()
+        }
+
+    return Library(
+        movie_files=movie_files,
+        # deduplicate and alphabetize the movie properties
+        properties={
+            path_type: sorted(set(names)) for path_type, names in properties.items()
+        },
+        # deduplicate actors and categories
+        movie_actors={
+            filename: set(names)
+            for filename, names in associations[util.PathType.ACTOR].items()
+        },
+        movie_categories={
+            filename: set(names)
+            for filename, names in associations[util.PathType.CATEGORY].items()
+        },
+        movie_series=pick_one(util.PathType.SERIES),
+        movie_studios=pick_one(util.PathType.STUDIO),
+        movie_name=movie_name,
+        movie_series_number=movie_series_number,
+    )
+
+
+def _movie_rows(
+    library: Library,
+    filenames: List[str],
+    property_ids: Dict[util.PathType, Dict[str, int]],
+) -> List[Dict]:
+    """Builds crud.bulk_add_movies rows for movie files in the library."""
+
+    actor_ids = property_ids[util.PathType.ACTOR]
+    category_ids = property_ids[util.PathType.CATEGORY]
+    series_ids = property_ids[util.PathType.SERIES]
+    studio_ids = property_ids[util.PathType.STUDIO]
+
+    return [
+        {
+            "filename": filename,
+            "name": library.movie_name[filename],
+            "studio_id": studio_ids.get(library.movie_studios[filename]),
+            "series_id": series_ids.get(library.movie_series[filename]),
+            "series_number": library.movie_series_number[filename],
+            "processed": True,
+            "actor_ids": [actor_ids[name] for name in library.movie_actors[filename]],
+            "category_ids": [
+                category_ids[name] for name in library.movie_categories[filename]
+            ],
+        }
+        for filename in filenames
+    ]
+
+
+def _diff_library(db: Session, library: Library) -> LibraryDiff:
+    """Compares the library on the file system with the database.
+
+    Args:
+        db: The database session.
+        library: The library information from the file system.
+
+    Returns:
+        diff: The changes needed to make the database match the library.
+    """
+
+    property_ids = {
+        path_type: crud.get_property_ids(db, model)
+        for path_type, model in PROPERTY_MODELS.items()
+    }
 
-    # deduplicate and alphabetize the movie properties
-    actors = sorted(set(actors))
-    categories = sorted(set(categories))
-    series = sorted(set(series))
-    studios = sorted(set(studios))
+    property_names = {
+        path_type: {id: name for name, id in ids.items()}
+        for path_type, ids in property_ids.items()
+    }
 
-    # create database entries for the movie properties
-    # generate an association of names to DB entries
-    actor_by_name = {
-        actor.name: actor for actor in [crud.add_actor(db, actor) for actor in actors]
+    movies, movie_actors, movie_categories = crud.get_movie_associations(db)
+
+    files = set(library.movie_files)
+
+    diff = LibraryDiff(
+        properties_added={
+            path_type: [name for name in names if name not in property_ids[path_type]]
+            for path_type, names in library.properties.items()
+        },
+        movies_added=[
+            filename for filename in library.movie_files if filename not in movies
+        ],
+        movies_removed={
+            filename: movie[0]
+            for filename, movie in movies.items()
+            if filename not in files
+        },
+        movies_updated=[],
+        actors_added=[],
+        actors_removed=[],
+        categories_added=[],
+        categories_removed=[],
+    )
+
+    series_names = property_names[util.PathType.SERIES]
+    studio_names = property_names[util.PathType.STUDIO]
+
+    for filename, (id, series_id, studio_id) in movies.items():
+        if filename not in files:
+            continue
+
+        series = library.movie_series[filename]
+        studio = library.movie_studios[filename]
+
+        if series != series_names.get(series_id) or studio != studio_names.get(
+            studio_id
+        ):
+            diff.movies_updated.append((filename, series, studio))
+
+        for names_db, names_fs, added, removed in (
+            (
+                {property_names[util.PathType.ACTOR][i] for i in movie_actors[id]},
+                library.movie_actors[filename],
+                diff.actors_added,
+                diff.actors_removed,
+            ),
+            (
+                {
+                    property_names[util.PathType.CATEGORY][i]
+                    for i in movie_categories[id]
+                },
+                library.movie_categories[filename],
+                diff.categories_added,
+                diff.categories_removed,
+            ),
+        ):
+            added.extend((filename, name) for name in sorted(names_fs - names_db))
+            removed.extend((filename, name) for name in sorted(names_db - names_fs))
+
+    return diff
+
+
+def _diff_link_dirs(
+    db: Session,
+    logger: Logger,
+    links: Dict[Tuple[util.PathType, str], List[str]],
+    removed: List[Tuple[util.PathType, str]],
+) -> LibraryDiff:
+    """Compares changed actor and category directories with the database.
+
+    Used when the movies directory is unchanged since the last sync, so only
+    the movies linked from, or associated with, each changed property need to
+    be checked.
+
+    Args:
+        db: The database session.
+        logger: The application logger.
+        links: Changed (path_type, name) property directories -> link files.
+        removed: Property directories that no longer exist.
+
+    Returns:
+        diff: The changes needed to make the database match the directories.
+    """
+
+    diff = LibraryDiff(
+        properties_added={path_type: [] for path_type in PROPERTY_MODELS},
+        movies_added=[],
+        movies_removed={},
+        movies_updated=[],
+        actors_added=[],
+        actors_removed=[],
+        categories_added=[],
+        categories_removed=[],
+    )
+
+    for path_type, name in removed:
+        links[(path_type, name)] = []
+
+    for (path_type, name), files in sorted(links.items(), key=str):
+        if path_type == util.PathType.ACTOR:
+            prop = crud.get_actor_by_name(db, name)
+            added, removed_links = diff.actors_added, diff.actors_removed
+        else:
+            prop = crud.get_category_by_name(db, name)
+            added, removed_links = diff.categories_added, diff.categories_removed
+
+        if prop is None and (path_type, name) not in removed:
+            diff.properties_added[path_type].append(name)
+
+        current = {movie.filename for movie in prop.movies} if prop else set()
+        desired = set(crud.get_movie_ids(db, files))
+
+        for file in set(files) - desired:
+            logger.warn(
+                "Broken link file %s/%s/%s", util.get_movie_path(path_type), name, file
+            )
+
+        if path_type == util.PathType.ACTOR:
+            # actors named in the movie filename do not need a link
+            for filename in current | desired:
+                actor_names = util.parse_filename(filename)[4]
+
+                if actor_names is not None and name in actor_names.split(", "):
+                    desired.add(filename)
+
+        added.extend((filename, name) for filename in sorted(desired - current))
+        removed_links.extend((filename, name) for filename in sorted(current - desired))
+
+    return diff
+
+
+def _apply_diff(
+    db: Session,
+    library: Optional[Library],
+    diff: LibraryDiff,
+    batch_size: int,
+) -> None:
+    """Applies the changes in a library diff to the database."""
+
+    property_ids = {
+        path_type: crud.get_property_ids(db, model)
+        for path_type, model in PROPERTY_MODELS.items()
     }
 
-    logger.info("Imported actors into database")
+    for path_type, names in diff.properties_added.items():
+        if len(names) > 0:
+            property_ids[path_type].update(
+                crud.bulk_add_properties(
+                    db, PROPERTY_MODELS[path_type], names, batch_size
+                )
+            )
 
-    category_by_name = {
-        category.name: category
-        for category in [crud.add_category(db, category) for category in categories]
-    }
+    if len(diff.movies_removed) > 0:
+        crud.bulk_delete_movies(db, list(diff.movies_removed.values()))
 
-    logger.info("Imported categories into database")
+    if len(diff.movies_added) > 0:
+        crud.bulk_add_movies(
+            db, _movie_rows(library, diff.movies_added, property_ids), batch_size
+        )
 
-    series_by_name = {
-        series.name: series
-        for series in [crud.add_series(db, series) for series in series]
-    }
+    movie_ids = crud.get_movie_ids(
+        db,
+        {filename for filename, _, _ in diff.movies_updated}
+        | {filename for filename, _ in diff.actors_added + diff.actors_removed}
+        | {filename for filename, _ in diff.categories_added + diff.categories_removed},
+    )
 
-    logger.info("Imported series into database")
+    if len(diff.movies_updated) > 0:
+        crud.bulk_update_movies(
+            db,
+            [
+                {
+                    "id": movie_ids[filename],
+                    "series_id": property_ids[util.PathType.SERIES].get(series),
+                    "studio_id": property_ids[util.PathType.STUDIO].get(studio),
+                }
+                for filename, series, studio in diff.movies_updated
+            ],
+        )
 
-    studio_by_name = {
-        studio.name: studio
-        for studio in [crud.add_studio(db, studio) for studio in studios]
-    }
+    for table, path_type, added, removed in (
+        (
+            models.movie_actors,
+            util.PathType.ACTOR,
+            diff.actors_added,
+            diff.actors_removed,
+        ),
+        (
+            models.movie_categories,
+            util.PathType.CATEGORY,
+            diff.categories_added,
+            diff.categories_removed,
+        ),
+    ):
+        if len(added) + len(removed) > 0:
+            ids = property_ids[path_type]
 
-    logger.info("Imported studios into database")
+            crud.bulk_update_movie_associations(
+                db,
+                table,
+                [(movie_ids[filename], ids[name]) for filename, name in added],
+                [(movie_ids[filename], ids[name]) for filename, name in removed],
+                batch_size,
+            )
 
-    # add the movies files to the database with their property associations
-    for filename in movie_files:
-        name = movie_name[filename]
-        series_number = movie_series_number[filename]
-        series_id = None
-        studio_id = None
-        actors_list = None
-        categories_list = None
 
-        # if there is more than one series/studio after deduplication
-        # it means something is odd with the link directories
-        # no right answer here, so just pick one
-        if len(movie_series[filename]) > 0:
-            series_name = list(set(movie_series[filename]))[0]
-            series_id = series_by_name[series_name].id
+def rebuild_db(batch_size: int = 5000, workers: Optional[int] = None):
+    """Recreates the sqlite database from information on the file system.
 
-        if len(movie_studios[filename]) > 0:
-            studio_name = list(set(movie_studios[filename]))[0]
-            studio_id = studio_by_name[studio_name].id
+    Properties, movies, and their associations are inserted with batched
+    statements in a few transactions rather than one commit per row.
 
-        # deduplicate actors and categories
-        # create a list of DB objects for the movie associations
-        movie_actors_set = set(movie_actors[filename])
-        actors_list = [actor_by_name[actor_name] for actor_name in movie_actors_set]
+    Args:
+        batch_size: Number of rows per insert statement.
+        workers: Number of threads scanning link directories; defaults to
+            MM_SCAN_WORKERS.
+    """
 
-        movie_categories_set = set(movie_categories[filename])
-        categories_list = [
-            category_by_name[category_name] for category_name in movie_categories_set
-        ]
+    # setup logging and get app configuration
+    config.setup_logging()
+    logger = config.get_logger()
 
-        # add the movie to the database
-        crud.add_movie(
-            db,
-            filename,
-            name,
-            studio_id,
-            series_id,
-            series_number,
-            actors_list,
-            categories_list,
-            True,
+    # create the database tables and get a connection
+    init_db()
+    db = next(get_db_session())
+
+    # read the library from the file system
+    manifest = Manifest()
+
+    try:
+        library = _scan_library(logger, workers, manifest)
+    except ListFilesException as e:
+        logger.critical(str(e))
+        sys.exit(1)
+
+    # create database entries for the movie properties in bulk
+    # generate an association of names to DB IDs
+    time_start = time.perf_counter()
+    property_ids: Dict[util.PathType, Dict[str, int]] = {}
+
+    for path_type, model in PROPERTY_MODELS.items():
+        property_ids[path_type] = crud.bulk_add_properties(
+            db, model, library.properties[path_type], batch_size
+        )
+
+        logger.info("Imported %s into database", path_type.value)
+
+    # add the movies to the database with their property associations
+    movies = _movie_rows(library, library.movie_files, property_ids)
+
+    rows = crud.bulk_add_movies(db, movies, batch_size)
+    rows += sum(len(names) for names in library.properties.values())
+
+    elapsed = time.perf_counter() - time_start
+
+    logger.info(
+        "Imported %d movies (%d rows) in %.2f seconds (%.0f rows/sec)",
+        len(movies),
+        rows,
+        elapsed,
+        rows / elapsed if elapsed > 0 else rows,
+    )
+
+    # remember the file system state for the next reconcile or relink
+    manifest.save()
+
+
+def reconcile_db(
+    dry_run: bool = False,
+    batch_size: int = 5000,
+    workers: Optional[int] = None,
+    full: bool = False,
+) -> Dict[str, int]:
+    """Updates an existing sqlite database to match the file system.
+
+    Movies, movie actors, and movie categories are compared with the movie
+    files and link directories. Only the rows that differ are inserted,
+    updated, or deleted. Properties missing from the database are added, but
+    unused properties are kept.
+
+    When the movies directory and the series and studio link directories are
+    unchanged since the manifest was last saved, only the actor and category
+    directories whose fingerprints changed are read and compared.
+
+    Args:
+        dry_run: True to report the changes without applying them.
+        batch_size: Number of rows per insert statement.
+        workers: Number of threads scanning link directories; defaults to
+            MM_SCAN_WORKERS.
+        full: True to ignore the manifest and compare the whole library.
+
+    Returns:
+        summary: The number of changes of each kind.
+    """
+
+    # setup logging and get app configuration
+    config.setup_logging()
+    logger = config.get_logger()
+
+    # create the database tables if needed and get a connection
+    init_db()
+    db = next(get_db_session())
+
+    manifest = Manifest() if full else Manifest.load()
+    library = None
+    changes = None
+
+    if not manifest.changed(
+        util.PathType.MOVIE.value, stat_dir(util.get_movie_path(util.PathType.MOVIE))
+    ):
+        changes = manifest.link_dir_changes(PROPERTY_MODELS)
+
+        # series and studios hold a single value per movie, so any change
+        # there needs the whole library to pick the right one
+        if any(
+            path_type in (util.PathType.SERIES, util.PathType.STUDIO)
+            for path_type, _ in changes.changed + changes.removed
+        ):
+            changes = None
+
+    if changes is None:
+        manifest = Manifest()
+
+        try:
+            library = _scan_library(logger, workers, manifest)
+        except ListFilesException as e:
+            logger.critical(str(e))
+            sys.exit(1)
+
+        diff = _diff_library(db, library)
+    else:
+        links = {}
+
+        for path_type, name, stat, files in util.scan_link_dirs(
+            changes.changed,
+            workers,
+            on_error=lambda path: logger.error("Unable to read link files in %s", path),
+        ):
+            key = link_key(path_type, name)
+
+            # touched, but holding the same links as last time
+            if not manifest.same_entries(key, files):
+                links[(path_type, name)] = files
+
+            manifest.record(key, stat, files)
+
+        for path_type, name in changes.removed:
+            manifest.forget(link_key(path_type, name))
+
+        logger.info(
+            "Skipped %d unchanged link directories",
+            sum(len(names) for names in changes.names.values()) - len(changes.changed),
         )
 
-        logger.info("Imported movie %s into database", filename)
+        diff = _diff_link_dirs(db, logger, links, changes.removed)
+
+    summary = diff.summary()
+
+    for path_type, names in diff.properties_added.items():
+        for name in names:
+            logger.info("Add %s %s", path_type.value, name)
+
+    for filename in diff.movies_added:
+        logger.info("Add movie %s", filename)
+
+    for filename in diff.movies_removed:
+        logger.info("Remove movie %s", filename)
+
+    for filename, series, studio in diff.movies_updated:
+        logger.info("Set series %s and studio %s on %s", series, studio, filename)
+
+    for label, changes in (
+        ("Add actor", diff.actors_added),
+        ("Remove actor", diff.actors_removed),
+        ("Add category", diff.categories_added),
+        ("Remove category", diff.categories_removed),
+    ):
+        for filename, name in changes:
+            logger.info("%s %s on %s", label, name, filename)
+
+    logger.info(
+        "%s: %s",
+        "Dry run" if dry_run else "Reconciled",
+        ", ".join(f"{count} {change}" for change, count in summary.items()),
+    )
+
+    if not dry_run:
+        _apply_diff(db, library, diff, batch_size)
+        manifest.save()
+
+    return summary
 
 
 if __name__ == "__main__":
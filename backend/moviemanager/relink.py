@@ -1,40 +1,285 @@
+import os
+from collections import defaultdict
+from logging import Logger
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
 from . import config, crud, models, util
 from .database import get_db_session, init_db
+from .manifest import Manifest, hash_entries, link_key
 
+LINK_TYPES = (
+    util.PathType.ACTOR,
+    util.PathType.CATEGORY,
+    util.PathType.SERIES,
+    util.PathType.STUDIO,
+)
 
-def relink_property_files():
-    """Recreates property link files from database."""
+LinkDir = Tuple[util.PathType, str]
+
+
+def _desired_links(db: Session) -> Dict[LinkDir, Set[str]]:
+    """Returns the link files each property directory should hold.
+
+    Args:
+        db: The database session.
+
+    Returns:
+        links: (path_type, name) -> movie filenames.
+    """
+
+    names = {
+        path_type: {id: name for name, id in crud.get_property_ids(db, model).items()}
+        for path_type, model in (
+            (util.PathType.ACTOR, models.Actor),
+            (util.PathType.CATEGORY, models.Category),
+            (util.PathType.SERIES, models.Series),
+            (util.PathType.STUDIO, models.Studio),
+        )
+    }
+
+    movies, actors, categories = crud.get_movie_associations(db)
+    links: Dict[LinkDir, Set[str]] = defaultdict(set)
+
+    for filename, (id, series_id, studio_id) in movies.items():
+        for path_type, ids in (
+            (util.PathType.ACTOR, actors[id]),
+            (util.PathType.CATEGORY, categories[id]),
+            (util.PathType.SERIES, () if series_id is None else (series_id,)),
+            (util.PathType.STUDIO, () if studio_id is None else (studio_id,)),
+        ):
+            for property_id in ids:
+                links[(path_type, names[path_type][property_id])].add(filename)
+
+    return links
+
+
+def _sync_link_dir(
+    logger: Logger,
+    link_dir: LinkDir,
+    wanted: Set[str],
+    existing: Optional[List[str]],
+    counts: Dict[str, int],
+) -> bool:
+    """Creates, repairs, and removes the links in one property directory.
+
+    Args:
+        logger: The application logger.
+        link_dir: The (path_type, name) property directory.
+        wanted: Movie filenames that should be linked.
+        existing: Entries currently in the directory, or None if it is missing.
+        counts: Counters of the operations performed, updated in place.
+
+    Returns:
+        modified: True if anything in the directory was changed.
+
+    Raises:
+        OSError: A link or the directory could not be changed.
+    """
+
+    path_type, name = link_dir
+    path_base = f"{util.get_movie_path(path_type)}/{name}"
+    path_movies = util.get_movie_path(util.PathType.MOVIE, False)
+    entries = set(existing) if existing is not None else set()
+    repaired = set()
+    modified = False
+
+    def remove(filename: str) -> None:
+        counts["syscalls"] += 1
+        os.remove(f"{path_base}/{filename}")
+        entries.discard(filename)
+
+    if existing is None and len(wanted) > 0:
+        counts["syscalls"] += 1
+        os.makedirs(path_base, exist_ok=True)
+        modified = True
+
+    # links that no longer match the database, including dangling links
+    # left behind by movies renamed outside the application
+    for filename in sorted(entries - wanted):
+        counts["syscalls"] += 1
+
+        if os.path.islink(f"{path_base}/{filename}"):
+            logger.info("Removing stale link %s/%s", path_base, filename)
+            remove(filename)
+            counts["removed"] += 1
+            modified = True
+
+    # links with the right name but the wrong target
+    for filename in sorted(entries & wanted):
+        target = f"{path_movies}/{filename}"
+        counts["syscalls"] += 1
+
+        try:
+            current = os.readlink(f"{path_base}/{filename}")
+        except OSError:
+            current = None
+
+        if current != target:
+            logger.info("Repairing link %s/%s", path_base, filename)
+            remove(filename)
+            repaired.add(filename)
+
+    for filename in sorted(wanted - entries):
+        if filename not in repaired:
+            logger.info("Adding link %s/%s", path_base, filename)
+
+        counts["syscalls"] += 1
+        os.symlink(f"{path_movies}/{filename}", f"{path_base}/{filename}")
+        counts["repaired" if filename in repaired else "created"] += 1
+        modified = True
+
+    if existing is not None and len(wanted) == 0 and len(entries) == 0:
+        counts["syscalls"] += 1
+        os.rmdir(path_base)
+        modified = True
+
+    return modified
+
+
+def relink(db: Session, full: bool = False) -> Dict[str, int]:
+    """Recreates property link files from database.
+
+    The desired links are computed from the database in a few queries and
+    compared with the link directories, which are read in bulk. Only missing,
+    stale, or broken links are touched. Property directories whose
+    fingerprint is unchanged since relink last synced them to the same wanted
+    links are assumed to hold the right links and are skipped.
+
+    Args:
+        db: The database session.
+        full: True to ignore the manifest and check every directory.
+
+    Returns:
+        counts: Links created, removed, and repaired, and the syscalls made
+            and saved compared to checking every link individually.
+    """
 
-    # setup logging
-    config.setup_logging()
     logger = config.get_logger()
 
-    # setup database connection
-    init_db()
-    db = next(get_db_session())
+    manifest = Manifest() if full else Manifest.load()
+    changes = manifest.link_dir_changes(LINK_TYPES)
+    on_disk = {
+        (path_type, name)
+        for path_type, names in changes.names.items()
+        for name in names
+    }
+
+    desired = _desired_links(db)
+    wanted = {link_dir: hash_entries(files) for link_dir, files in desired.items()}
+    nothing = hash_entries(())
+
+    # new or modified directories, and directories whose wanted links changed
+    # since they were last synced, including the ones not on disk yet
+    to_check = set(changes.changed) | {
+        link_dir
+        for link_dir in on_disk | set(desired)
+        if not manifest.synced(link_key(*link_dir), wanted.get(link_dir, nothing))
+    }
+
+    counts = {
+        "created": 0,
+        "removed": 0,
+        "repaired": 0,
+        "skipped": sum(
+            len(files)
+            for link_dir, files in desired.items()
+            if link_dir not in to_check
+        ),
+        "syscalls": len(on_disk) + len(LINK_TYPES),
+    }
+
+    existing: Dict[LinkDir, List[str]] = {}
+    stats: Dict[LinkDir, os.stat_result] = {}
+
+    for path_type, name, stat, files in util.scan_link_dirs(
+        to_check & on_disk,
+        on_error=lambda path: logger.error("Unable to read link files in %s", path),
+    ):
+        existing[(path_type, name)] = files
+        stats[(path_type, name)] = stat
+        counts["syscalls"] += 2
+
+    modified = set()
+    failed = set()
+
+    for link_dir in sorted(to_check, key=str):
+        try:
+            if _sync_link_dir(
+                logger,
+                link_dir,
+                desired.get(link_dir, set()),
+                existing.get(link_dir),
+                counts,
+            ):
+                modified.add(link_dir)
+        except OSError as e:
+            logger.error(
+                "Failed to relink %s/%s: %s", link_dir[0].value, link_dir[1], e
+            )
+            failed.add(link_dir)
 
-    movies = crud.get_all_movies(db)
+    # record the fingerprints and wanted links of the directories that were
+    # synced; unmodified ones can reuse the stat taken before they were listed
+    for path_type, name in changes.removed:
+        manifest.forget(link_key(path_type, name))
 
-    for movie in movies:
-        logger.info("Processing %s", movie.filename)
+    for link_dir, stat in stats.items():
+        if link_dir not in modified | failed:
+            manifest.record(
+                link_key(*link_dir),
+                stat,
+                existing[link_dir],
+                wanted.get(link_dir, nothing),
+            )
 
-        actor: models.Actor
-        for actor in movie.actors:
-            logger.info("Adding %s actor link", actor.name)
-            util.update_actor_link(movie.filename, actor.name, True)
+    for link_dir in modified | failed:
+        manifest.forget(link_key(*link_dir))
 
-        category: models.Category
-        for category in movie.categories:
-            logger.info("Adding %s category link", category.name)
-            util.update_category_link(movie.filename, category.name, True)
+    for path_type, name, stat, files in util.scan_link_dirs(modified):
+        link_dir = (path_type, name)
+        manifest.record(link_key(*link_dir), stat, files, wanted.get(link_dir, nothing))
 
-        if movie.series is not None:
-            logger.info("Adding %s series link", movie.series.name)
-            util.update_series_link(movie.filename, movie.series.name, True)
+    manifest.save()
+
+    # checking every link one at a time takes an isdir and lexists call each
+    counts["saved"] = max(
+        0, 2 * sum(len(files) for files in desired.values()) - counts["syscalls"]
+    )
+
+    logger.info(
+        "Relinked: %d created, %d removed, %d repaired, %d skipped; "
+        "%d syscalls made, %d saved",
+        counts["created"],
+        counts["removed"],
+        counts["repaired"],
+        counts["skipped"],
+        counts["syscalls"],
+        counts["saved"],
+    )
+
+    return counts
+
+
+def relink_property_files(full: bool = False) -> Dict[str, int]:
+    """Sets up logging and the database, and recreates property link files.
+
+    Args:
+        full: True to ignore the manifest and check every directory.
+
+    Returns:
+        counts: The relink counts.
+    """
+
+    # setup logging
+    config.setup_logging()
+
+    # setup database connection
+    init_db()
+    db = next(get_db_session())
 
-        if movie.studio is not None:
-            logger.info("Adding %s studio link", movie.studio.name)
-            util.update_studio_link(movie.filename, movie.studio.name, True)
+    return relink(db, full)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,293 @@
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Type
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import crud, journal, models, util
+from .config import get_logger
+from .exceptions import DuplicateEntryException, InvalidIDException, PathException
+
+# (path_type, old name, new name) of a renamed property
+RenamedProperty = Tuple[util.PathType, str, str]
+
+PATH_TYPES: Dict[Type[models.TableBase], util.PathType] = {
+    models.Actor: util.PathType.ACTOR,
+    models.Category: util.PathType.CATEGORY,
+    models.Series: util.PathType.SERIES,
+    models.Studio: util.PathType.STUDIO,
+}
+
+PROPERTY_MOVIES: Dict[
+    Type[models.TableBase], Callable[[Session, int], List[models.Movie]]
+] = {
+    models.Actor: crud.get_actor_movies,
+    models.Category: crud.get_category_movies,
+    models.Series: crud.get_series_movies,
+    models.Studio: crud.get_studio_movies,
+}
+
+
+def _movie_links(movie: models.Movie) -> Iterable[Tuple[util.PathType, str]]:
+    """Yields the (path_type, name) property directories linking to a movie."""
+
+    for actor in movie.actors:
+        yield (util.PathType.ACTOR, actor.name)
+
+    for category in movie.categories:
+        yield (util.PathType.CATEGORY, category.name)
+
+    if movie.series is not None:
+        yield (util.PathType.SERIES, movie.series.name)
+
+    if movie.studio is not None:
+        yield (util.PathType.STUDIO, movie.studio.name)
+
+
+def _moves_directory(renamed: RenamedProperty) -> bool:
+    """Returns True if the link directory of a renamed property can move whole.
+
+    It cannot when the name is unchanged, the directory is missing, or the
+    new name is already taken by another directory.
+    """
+
+    path_type, name_current, name = renamed
+    path_base = util.get_movie_path(path_type)
+
+    return (
+        name_current != name
+        and os.path.isdir(f"{path_base}/{name_current}")
+        and not os.path.lexists(f"{path_base}/{name}")
+    )
+
+
+def plan_renames(
+    db: Session,
+    movies: List[models.Movie],
+    renamed: Optional[RenamedProperty] = None,
+) -> Tuple[Dict[int, str], List[journal.Operation]]:
+    """Plans renaming the files and links of movies to their generated names.
+
+    Every collision is checked before anything is changed: two movies may
+    not get the same filename, and a new filename may not belong to another
+    movie or an existing file.
+
+    The link directory of a renamed property is moved with a single rename,
+    after which only the links whose filenames change are touched. If it
+    cannot be moved, its links are moved one at a time.
+
+    Args:
+        db: The database session.
+        movies: The movies, with their properties loaded and any renamed
+            property already holding its new name.
+        renamed: The property being renamed, whose links are still in the
+            directory of its old name.
+
+    Returns:
+        filenames: Movie ID -> new filename for the movies whose filename
+            changes.
+        operations: The file system operations to apply in order.
+
+    Raises:
+        PathException: A new filename collides with another movie or file.
+    """
+
+    path_movies = util.get_movie_path(util.PathType.MOVIE)
+    path_targets = util.get_movie_path(util.PathType.MOVIE, False)
+
+    filenames: Dict[int, str] = {}
+    operations: List[journal.Operation] = []
+    directories: Set[str] = set()
+    batch = {movie.filename for movie in movies}
+    moved = renamed is not None and _moves_directory(renamed)
+
+    if moved:
+        path_links = util.get_movie_path(renamed[0])
+
+        directories.add(f"{path_links}/{renamed[2]}")
+        operations.append(
+            ("rename", f"{path_links}/{renamed[1]}", f"{path_links}/{renamed[2]}")
+        )
+
+    for movie in movies:
+        filename = util.generate_movie_filename(movie)
+
+        if filename != movie.filename:
+            if filename in batch or os.path.lexists(f"{path_movies}/{filename}"):
+                raise PathException(
+                    f"Renaming {movie.filename} -> {filename} conflicts with existing"
+                )
+
+            batch.add(filename)
+            filenames[movie.id] = filename
+            operations.append(
+                (
+                    "rename",
+                    f"{path_movies}/{movie.filename}",
+                    f"{path_movies}/{filename}",
+                )
+            )
+
+        for path_type, name in _movie_links(movie):
+            name_current = name
+
+            if (
+                renamed is not None
+                and not moved
+                and (path_type, name) == (renamed[0], renamed[2])
+            ):
+                name_current = renamed[1]
+
+            if (name_current, movie.filename) == (name, filename):
+                continue
+
+            path_base = f"{util.get_movie_path(path_type)}/{name}"
+
+            if path_base not in directories:
+                directories.add(path_base)
+
+                if not os.path.isdir(path_base):
+                    operations.append(("mkdir", path_base, ""))
+
+            operations.append(
+                (
+                    "unlink",
+                    f"{util.get_movie_path(path_type)}/{name_current}/"
+                    f"{movie.filename}",
+                    f"{path_targets}/{movie.filename}",
+                )
+            )
+            operations.append(
+                ("link", f"{path_base}/{filename}", f"{path_targets}/{filename}")
+            )
+
+    # another movie may hold a new filename in the database without a file
+    taken = crud.get_movie_ids(db, filenames.values())
+
+    if taken:
+        filename = next(iter(taken))
+        raise PathException(f"Renaming to {filename} conflicts with existing")
+
+    if renamed is not None and not moved and renamed[1] != renamed[2]:
+        path_type, name_current, _ = renamed
+        operations.append(
+            ("rmdir", f"{util.get_movie_path(path_type)}/{name_current}", "")
+        )
+
+    return filenames, operations
+
+
+def rename_property(
+    db: Session,
+    model: Type[models.TableBase],
+    id: int,
+    name: str,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[models.TableBase, int]:
+    """Renames a property, and the files and links of all of its movies.
+
+    The movies are loaded with their properties in one eager query, and every
+    new filename is planned and checked before anything changes. The file
+    operations are then applied as a batch, and the property and movie
+    filenames are committed together. If any step fails, the applied file
+    operations are undone and nothing is committed. The operations are
+    journaled until the commit, so a crash part way is rolled back by
+    journal.recover on the next start.
+
+    Args:
+        db: The database session.
+        model: The Actor, Category, Series, or Studio model.
+        id: The property ID.
+        name: The new property name.
+        progress: Called with the number of file operations applied so far
+            and the total. An exception raised by it undoes the applied
+            operations and is raised again.
+
+    Returns:
+        property: The renamed property.
+        renamed: The number of movie files renamed.
+
+    Raises:
+        InvalidIDException: The property does not exist.
+        DuplicateEntryException: Another property already has the name.
+        PathException: A new filename collides, or a file operation failed.
+    """
+
+    prop = db.query(model).filter(model.id == id).first()
+    kind = model.__name__.lower()
+
+    if prop is None:
+        raise InvalidIDException(f"{model.__name__} ID {id} does not exist")
+
+    name_current = prop.name
+    duplicate = crud.get_property_ids(db, model).get(name)
+
+    if duplicate is not None and duplicate != id:
+        raise DuplicateEntryException(
+            f"Renaming {kind} {name_current} -> {name} conflicts with existing"
+        )
+
+    renamed = (PATH_TYPES[model], name_current, name)
+
+    # category names are not part of filenames, so once the link directory
+    # has moved there is nothing left to change for the movies
+    if model is models.Category and _moves_directory(renamed):
+        movies = []
+    else:
+        movies = PROPERTY_MOVIES[model](db, id)
+
+    prop.name = name
+    prop.sort_key = util.generate_sort_key(name)
+
+    if hasattr(model, "sort_name"):
+        prop.sort_name = util.generate_sort_name(name)
+
+    try:
+        filenames, operations = plan_renames(db, movies, renamed)
+    except Exception:
+        db.rollback()
+
+        raise
+
+    batch = journal.begin(db, operations)
+
+    try:
+        applied = journal.apply_operations(operations, progress)
+    except Exception:
+        db.rollback()
+        journal.discard(db, batch)
+
+        raise
+
+    for movie in movies:
+        if movie.id in filenames:
+            movie.filename = filenames[movie.id]
+
+    try:
+        journal.finish(db, batch)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        journal.undo_operations(applied)
+        journal.discard(db, batch)
+
+        raise DuplicateEntryException(
+            f"Renaming {kind} {name_current} -> {name} conflicts with existing"
+        )
+    except Exception:
+        db.rollback()
+        journal.undo_operations(applied)
+        journal.discard(db, batch)
+
+        raise
+
+    get_logger().info(
+        "Renamed %s %s -> %s, %d files and %d file operations",
+        kind,
+        name_current,
+        name,
+        len(filenames),
+        len(applied),
+    )
+
+    return prop, len(filenames)
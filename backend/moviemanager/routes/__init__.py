@@ -1,10 +1,13 @@
 from . import (
     actors,
     categories,
+    jobs,
     movie_actor,
     movie_category,
     movies,
     root,
+    search,
     series,
+    stats,
     studios,
 )
@@ -1,10 +1,11 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import HTTPException
 from sqlalchemy.orm import Session
 
-from .. import crud, util
+from .. import crud, models, pagination, renames, util, versions
 from ..config import get_logger
 from ..database import get_db_session
 from ..exceptions import (
@@ -98,8 +99,51 @@ def actors_delete(
     summary="Get all actors",
     tags=["actors"],
 )
-def actors_get_all(db: Session = Depends(get_db_session)):
-    return crud.get_all_actors(db)
+async def actors_get_all(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = pagination.LimitQuery,
+    after: Optional[str] = pagination.AfterQuery,
+    stream: bool = pagination.StreamQuery,
+    db: Session = Depends(get_db_session),
+):
+    etag = await run_in_threadpool(versions.etag, "actors", "movie_actors")
+    not_modified = versions.not_modified(request, etag)
+
+    if not_modified is not None:
+        return not_modified
+
+    headers = {"ETag": etag}
+    response.headers.update(headers)
+
+    if stream:
+        return pagination.stream_response(
+            (
+                {"id": id, "name": name, "movie_count": movie_count}
+                for id, name, movie_count in crud.iter_properties(db, models.Actor)
+            ),
+            headers,
+        )
+
+    if limit is None and after is None:
+        return await run_in_threadpool(crud.get_all_actors, db)
+
+    actors, next_key = await run_in_threadpool(
+        crud.get_property_page,
+        db,
+        models.Actor,
+        limit or pagination.DEFAULT_PAGE_SIZE,
+        pagination.decode_cursor(after),
+    )
+
+    return pagination.page_response(
+        [
+            {"id": id, "name": name, "movie_count": movie_count}
+            for id, name, movie_count in actors
+        ],
+        next_key,
+        headers,
+    )
 
 
 @router.put(
@@ -123,22 +167,17 @@ def actors_get_all(db: Session = Depends(get_db_session)):
     summary="Rename actor",
     tags=["actors"],
 )
+@util.on_fs_executor(ActorSchema)
 def actors_update(
     id: int,
     body: MoviePropertySchema,
     db: Session = Depends(get_db_session),
 ):
     try:
-        actor_name = crud.get_actor(db, id).name
-
         name = body.name.strip()
-        actor = crud.update_actor(db, id, name)
-
-        for movie in actor.movies:
-            util.rename_movie_file(movie, actor_current=actor_name)
-            db.commit()
+        actor, _ = renames.rename_property(db, models.Actor, id, name)
 
-        logger.debug("Renamed actor %s -> %s", actor_name, name)
+        logger.debug("Renamed actor ID %d -> %s", id, name)
     except DuplicateEntryException as e:
         logger.warn(str(e))
 
@@ -1,10 +1,11 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import HTTPException
 from sqlalchemy.orm import Session
 
-from .. import crud, models, util
+from .. import crud, models, pagination, renames, util, versions
 from ..config import get_logger
 from ..database import get_db_session
 from ..exceptions import (
@@ -98,8 +99,51 @@ def categories_delete(
     summary="Get all categories",
     tags=["categories"],
 )
-def categories_get_all(db: Session = Depends(get_db_session)):
-    return crud.get_all_categories(db)
+async def categories_get_all(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = pagination.LimitQuery,
+    after: Optional[str] = pagination.AfterQuery,
+    stream: bool = pagination.StreamQuery,
+    db: Session = Depends(get_db_session),
+):
+    etag = await run_in_threadpool(versions.etag, "categories", "movie_categories")
+    not_modified = versions.not_modified(request, etag)
+
+    if not_modified is not None:
+        return not_modified
+
+    headers = {"ETag": etag}
+    response.headers.update(headers)
+
+    if stream:
+        return pagination.stream_response(
+            (
+                {"id": id, "name": name, "movie_count": movie_count}
+                for id, name, movie_count in crud.iter_properties(db, models.Category)
+            ),
+            headers,
+        )
+
+    if limit is None and after is None:
+        return await run_in_threadpool(crud.get_all_categories, db)
+
+    categories, next_key = await run_in_threadpool(
+        crud.get_property_page,
+        db,
+        models.Category,
+        limit or pagination.DEFAULT_PAGE_SIZE,
+        pagination.decode_cursor(after),
+    )
+
+    return pagination.page_response(
+        [
+            {"id": id, "name": name, "movie_count": movie_count}
+            for id, name, movie_count in categories
+        ],
+        next_key,
+        headers,
+    )
 
 
 @router.put(
@@ -120,23 +164,17 @@ def categories_get_all(db: Session = Depends(get_db_session)):
     summary="Rename category",
     tags=["categories"],
 )
+@util.on_fs_executor(CategorySchema)
 def categories_update(
     id: int,
     body: MoviePropertySchema,
     db: Session = Depends(get_db_session),
 ):
     try:
-        category_name = crud.get_category(db, id).name
-
         name = body.name.strip()
-        category = crud.update_category(db, id, name)
-
-        movie: models.Movie
-        for movie in category.movies:
-            util.update_category_link(movie.filename, category_name, False)
-            util.update_category_link(movie.filename, name, True)
+        category, _ = renames.rename_property(db, models.Category, id, name)
 
-        logger.debug("Renamed category %s -> %s", category_name, name)
+        logger.debug("Renamed category ID %d -> %s", id, name)
     except DuplicateEntryException as e:
         logger.warn(str(e))
 
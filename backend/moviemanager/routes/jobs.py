@@ -0,0 +1,119 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import HTTPException
+from sqlalchemy.orm import Session
+
+from .. import crud
+from ..config import get_logger
+from ..database import get_db_session
+from ..exceptions import InvalidIDException, InvalidJobException
+from ..jobs import get_job_queue
+from ..schemas import HTTPExceptionSchema, JobSchema, JobSubmitSchema
+
+logger = get_logger()
+router = APIRouter(prefix="/jobs")
+
+
+@router.post(
+    "",
+    response_model=JobSchema,
+    response_description="The queued job",
+    responses={
+        400: {
+            "model": HTTPExceptionSchema,
+            "description": "Invalid Job",
+        },
+        404: {
+            "model": HTTPExceptionSchema,
+            "description": "Invalid ID",
+        },
+    },
+    summary="Submit background job",
+    tags=["jobs"],
+)
+def jobs_add(
+    body: JobSubmitSchema,
+    db: Session = Depends(get_db_session),
+):
+    try:
+        job = get_job_queue().submit(db, body.kind, body.params)
+        logger.debug("Queued job %d (%s)", job.id, job.kind)
+    except InvalidJobException as e:
+        logger.warn(str(e))
+
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail={"message": str(e)})
+    except InvalidIDException as e:
+        logger.warn(str(e))
+
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail={"message": str(e)})
+
+    return job
+
+
+@router.post(
+    "/{id}/cancel",
+    response_model=JobSchema,
+    response_description="The cancelled job",
+    responses={
+        404: {
+            "model": HTTPExceptionSchema,
+            "description": "Invalid ID",
+        },
+    },
+    summary="Cancel background job",
+    tags=["jobs"],
+)
+def jobs_cancel(
+    id: int,
+    db: Session = Depends(get_db_session),
+):
+    try:
+        job = get_job_queue().cancel(db, id)
+        logger.debug("Cancelling job %d", id)
+    except InvalidIDException as e:
+        logger.warn(str(e))
+
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail={"message": str(e)})
+
+    return job
+
+
+@router.get(
+    "",
+    response_model=List[JobSchema],
+    response_description="A list of jobs, newest first",
+    summary="Get recent jobs",
+    tags=["jobs"],
+)
+async def jobs_get_all(
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db_session),
+):
+    return await run_in_threadpool(crud.get_jobs, db, limit=limit)
+
+
+@router.get(
+    "/{id}",
+    response_model=JobSchema,
+    response_description="The job status and progress",
+    responses={
+        404: {
+            "model": HTTPExceptionSchema,
+            "description": "Invalid ID",
+        },
+    },
+    summary="Get job",
+    tags=["jobs"],
+)
+async def jobs_get_one(id: int, db: Session = Depends(get_db_session)):
+    job = await run_in_threadpool(crud.get_job, db, id)
+
+    if job is None:
+        message = f"Job ID {id} does not exist"
+        logger.warn(message)
+
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail={"message": message})
+
+    return job
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, status
 from fastapi.exceptions import HTTPException
 from sqlalchemy.orm import Session
 
-from .. import crud
+from .. import crud, util
 from ..config import get_logger
 from ..database import get_db_session
 from ..exceptions import DuplicateEntryException, InvalidIDException, PathException
@@ -33,6 +33,7 @@ router = APIRouter(prefix="/movie_actor")
     summary="Add actor to movie",
     tags=["movie_actor"],
 )
+@util.on_fs_executor(MovieSchema)
 def movie_actor_add(
     movie_id: int,
     actor_id: int,
@@ -76,6 +77,7 @@ def movie_actor_add(
     summary="Delete actor from movie",
     tags=["movie_actor"],
 )
+@util.on_fs_executor(MovieSchema)
 def movie_actor_delete(
     movie_id: int,
     actor_id: int,
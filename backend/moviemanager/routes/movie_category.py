@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, status
 from fastapi.exceptions import HTTPException
 from sqlalchemy.orm import Session
 
-from .. import crud
+from .. import crud, util
 from ..config import get_logger
 from ..database import get_db_session
 from ..exceptions import DuplicateEntryException, InvalidIDException, PathException
@@ -33,6 +33,7 @@ router = APIRouter(prefix="/movie_category")
     summary="Add category to movie",
     tags=["movie_category"],
 )
+@util.on_fs_executor(MovieSchema)
 def movie_category_add(
     movie_id: int,
     category_id: int,
@@ -76,6 +77,7 @@ def movie_category_add(
     summary="Delete category from movie",
     tags=["movie_category"],
 )
+@util.on_fs_executor(MovieSchema)
 def movie_category_delete(
     movie_id: int,
     category_id: int,
@@ -1,10 +1,12 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import HTTPException
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
-from .. import crud, util
+from .. import crud, imports, pagination, util, versions
 from ..config import get_logger
 from ..database import get_db_session
 from ..exceptions import (
@@ -15,8 +17,10 @@ from ..exceptions import (
 )
 from ..schemas import (
     HTTPExceptionSchema,
+    ImportReportSchema,
     MessageSchema,
     MovieFileSchema,
+    MovieFilterSchema,
     MovieSchema,
     MovieUpdateSchema,
 )
@@ -41,6 +45,7 @@ router = APIRouter(prefix="/movies")
     summary="Delete movie and move file back to imports folder",
     tags=["movies"],
 )
+@util.on_fs_executor()
 def movies_delete(
     id: int,
     db: Session = Depends(get_db_session),
@@ -69,8 +74,104 @@ def movies_delete(
     summary="Get all movies",
     tags=["movies"],
 )
-def movies_get_all(db: Session = Depends(get_db_session)):
-    return crud.get_all_movies(db)
+async def movies_get_all(
+    request: Request,
+    limit: Optional[int] = pagination.LimitQuery,
+    after: Optional[str] = pagination.AfterQuery,
+    stream: bool = pagination.StreamQuery,
+    db: Session = Depends(get_db_session),
+):
+    etag = await run_in_threadpool(versions.etag, "movies", "series", "studios")
+    not_modified = versions.not_modified(request, etag)
+
+    if not_modified is not None:
+        return not_modified
+
+    headers = {"ETag": etag}
+
+    # serialize the (id, filename) rows directly; returning a response skips
+    # building a Movie object and a response model for every movie
+    if stream:
+        return pagination.stream_response(
+            (
+                {"id": id, "filename": filename}
+                for id, filename in crud.iter_movie_files(db)
+            ),
+            headers,
+        )
+
+    if limit is None and after is None:
+        movies = await run_in_threadpool(crud.get_all_movie_files, db)
+
+        return JSONResponse(
+            [{"id": id, "filename": filename} for id, filename in movies],
+            headers=headers,
+        )
+
+    movies, next_key = await run_in_threadpool(
+        crud.get_movie_files_page,
+        db,
+        limit or pagination.DEFAULT_PAGE_SIZE,
+        pagination.decode_cursor(after),
+    )
+
+    return pagination.page_response(
+        [{"id": id, "filename": filename} for id, filename in movies], next_key, headers
+    )
+
+
+@router.get(
+    "/filter",
+    response_model=MovieFilterSchema,
+    response_description="A page of the matching movies and the facet counts",
+    summary="Filter movies by their properties",
+    tags=["movies"],
+)
+async def movies_filter(
+    request: Request,
+    actor_id: List[int] = Query([], description="Actors the movies must all have"),
+    category_id: List[int] = Query(
+        [], description="Categories the movies must all have"
+    ),
+    series_id: Optional[int] = None,
+    studio_id: Optional[int] = None,
+    processed: Optional[bool] = None,
+    limit: Optional[int] = pagination.LimitQuery,
+    after: Optional[str] = pagination.AfterQuery,
+    facet_limit: int = Query(
+        50, ge=1, le=1000, description="Maximum values returned for each facet"
+    ),
+    db: Session = Depends(get_db_session),
+):
+    etag = await run_in_threadpool(
+        versions.etag,
+        "movies",
+        "movie_actors",
+        "movie_categories",
+        "actors",
+        "categories",
+        "series",
+        "studios",
+    )
+    not_modified = versions.not_modified(request, etag)
+
+    if not_modified is not None:
+        return not_modified
+
+    result, next_key = await run_in_threadpool(
+        crud.filter_movies,
+        db,
+        actor_id,
+        category_id,
+        series_id,
+        studio_id,
+        processed,
+        limit or pagination.DEFAULT_PAGE_SIZE,
+        pagination.decode_cursor(after),
+        facet_limit,
+    )
+
+    return pagination.page_response(result, next_key, {"ETag": etag})
 
 
 @router.get(
@@ -86,8 +187,10 @@ def movies_get_all(db: Session = Depends(get_db_session)):
     summary="Get movie information",
     tags=["movies"],
 )
-def movies_get_one(id: int, db: Session = Depends(get_db_session)):
-    movie = crud.get_movie(db, id)
+async def movies_get_one(id: int, db: Session = Depends(get_db_session)):
+    # the properties are eager loaded, so serializing the movie on the event
+    # loop does not query the database
+    movie = await run_in_threadpool(crud.get_movie, db, id, with_properties=True)
 
     if movie is None:
         message = f"Movie ID {id} does not exist"
@@ -115,6 +218,7 @@ def movies_get_one(id: int, db: Session = Depends(get_db_session)):
     summary="Add movies from imports folder",
     tags=["movies"],
 )
+@util.on_fs_executor(MovieFileSchema)
 def movies_import(db: Session = Depends(get_db_session)):
     try:
         files = util.list_files(util.get_movie_path(util.PathType.IMPORT))
@@ -127,15 +231,15 @@ def movies_import(db: Session = Depends(get_db_session)):
 
     movies = []
 
-    for file in files:
-        # skip the .keep files
-        if file == ".keep":
-            continue
+    # skip the .keep files
+    files = [file for file in files if file != ".keep"]
 
-        (name, studio_id, series_id, series_number, actors) = util.parse_file_info(
-            db, file
-        )
+    # resolve the properties of every file up front with a few queries
+    files_info = util.parse_files_info(db, files)
 
+    for file, (name, studio_id, series_id, series_number, actors) in zip(
+        files, files_info
+    ):
         try:
             # attempt to migrate the file before adding to the DB
             # if this fails, we don't want a DB entry
@@ -161,6 +265,31 @@ def movies_import(db: Session = Depends(get_db_session)):
     return movies
 
 
+@router.post(
+    "/batch",
+    response_model=ImportReportSchema,
+    response_description="The import result of each file",
+    responses={
+        500: {
+            "model": HTTPExceptionSchema,
+            "description": "Path Error",
+        },
+    },
+    summary="Add all movies from imports folder in one transaction",
+    tags=["movies"],
+)
+@util.on_fs_executor()
+def movies_import_batch(db: Session = Depends(get_db_session)):
+    try:
+        return imports.batch_import(db)
+    except ListFilesException as e:
+        logger.error(str(e))
+
+        raise HTTPException(
+            status.HTTP_500_INTERNAL_SERVER_ERROR, detail={"message": str(e)}
+        )
+
+
 @router.put(
     "/{id}",
     response_model=MovieSchema,
@@ -178,6 +307,7 @@ def movies_import(db: Session = Depends(get_db_session)):
     summary="Update movie information",
     tags=["movies"],
 )
+@util.on_fs_executor(MovieSchema)
 def movies_update(
     id: int,
     body: MovieUpdateSchema,
@@ -0,0 +1,39 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from .. import crud
+from ..database import get_db_session
+from ..schemas import SearchKind, SearchResultSchema
+
+router = APIRouter(prefix="/search")
+
+
+@router.get(
+    "",
+    response_model=List[SearchResultSchema],
+    response_description="The matching movies and properties, best match first",
+    summary="Search movies, actors, categories, series, and studios",
+    tags=["search"],
+)
+async def search_get(
+    q: str = Query(
+        ...,
+        min_length=1,
+        description="Words that must start a word of the name or filename",
+    ),
+    kind: Optional[List[SearchKind]] = Query(
+        None, description="Kinds of results to return; defaults to all"
+    ),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db_session),
+):
+    return await run_in_threadpool(
+        crud.search,
+        db,
+        q,
+        None if kind is None else [k.value for k in kind],
+        limit,
+    )
@@ -1,10 +1,11 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import HTTPException
 from sqlalchemy.orm import Session
 
-from .. import crud, util
+from .. import crud, models, pagination, renames, util, versions
 from ..config import get_logger
 from ..database import get_db_session
 from ..exceptions import (
@@ -98,8 +99,51 @@ def series_delete(
     summary="Get all series",
     tags=["series"],
 )
-def series_get_all(db: Session = Depends(get_db_session)):
-    return crud.get_all_series(db)
+async def series_get_all(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = pagination.LimitQuery,
+    after: Optional[str] = pagination.AfterQuery,
+    stream: bool = pagination.StreamQuery,
+    db: Session = Depends(get_db_session),
+):
+    etag = await run_in_threadpool(versions.etag, "series", "movies")
+    not_modified = versions.not_modified(request, etag)
+
+    if not_modified is not None:
+        return not_modified
+
+    headers = {"ETag": etag}
+    response.headers.update(headers)
+
+    if stream:
+        return pagination.stream_response(
+            (
+                {"id": id, "name": name, "movie_count": movie_count}
+                for id, name, movie_count in crud.iter_properties(db, models.Series)
+            ),
+            headers,
+        )
+
+    if limit is None and after is None:
+        return await run_in_threadpool(crud.get_all_series, db)
+
+    series, next_key = await run_in_threadpool(
+        crud.get_property_page,
+        db,
+        models.Series,
+        limit or pagination.DEFAULT_PAGE_SIZE,
+        pagination.decode_cursor(after),
+    )
+
+    return pagination.page_response(
+        [
+            {"id": id, "name": name, "movie_count": movie_count}
+            for id, name, movie_count in series
+        ],
+        next_key,
+        headers,
+    )
 
 
 @router.put(
@@ -123,22 +167,17 @@ def series_get_all(db: Session = Depends(get_db_session)):
     summary="Rename series",
     tags=["series"],
 )
+@util.on_fs_executor(SeriesSchema)
 def series_update(
     id: int,
     body: MoviePropertySchema,
     db: Session = Depends(get_db_session),
 ):
     try:
-        series_name = crud.get_series(db, id).name
-
         name = body.name.strip()
-        series = crud.update_series(db, id, name)
-
-        for movie in series.movies:
-            util.rename_movie_file(movie, series_current=series_name)
-            db.commit()
+        series, _ = renames.rename_property(db, models.Series, id, name)
 
-        logger.debug("Renamed series %s -> %s", series_name, name)
+        logger.debug("Renamed series ID %d -> %s", id, name)
     except DuplicateEntryException as e:
         logger.warn(str(e))
 
@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+
+from .. import crud, metrics, util
+from ..schemas import StatsSchema
+
+router = APIRouter(prefix="/stats")
+
+
+@router.get(
+    "",
+    response_model=StatsSchema,
+    response_description="The server statistics",
+    summary="Get server statistics",
+    tags=["stats"],
+)
+async def stats_get():
+    return {
+        "cache": crud.get_cache_stats(),
+        "fs_executor": util.get_fs_executor_stats(),
+        "latency": metrics.get_latency_stats(),
+    }
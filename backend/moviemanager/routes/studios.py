@@ -1,10 +1,11 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import HTTPException
 from sqlalchemy.orm import Session
 
-from .. import crud, util
+from .. import crud, models, pagination, renames, util, versions
 from ..config import get_logger
 from ..database import get_db_session
 from ..exceptions import (
@@ -92,8 +93,51 @@ def studios_delete(
     summary="Get all studios",
     tags=["studios"],
 )
-def studios_get_all(db: Session = Depends(get_db_session)):
-    return crud.get_all_studios(db)
+async def studios_get_all(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = pagination.LimitQuery,
+    after: Optional[str] = pagination.AfterQuery,
+    stream: bool = pagination.StreamQuery,
+    db: Session = Depends(get_db_session),
+):
+    etag = await run_in_threadpool(versions.etag, "studios", "movies")
+    not_modified = versions.not_modified(request, etag)
+
+    if not_modified is not None:
+        return not_modified
+
+    headers = {"ETag": etag}
+    response.headers.update(headers)
+
+    if stream:
+        return pagination.stream_response(
+            (
+                {"id": id, "name": name, "movie_count": movie_count}
+                for id, name, movie_count in crud.iter_properties(db, models.Studio)
+            ),
+            headers,
+        )
+
+    if limit is None and after is None:
+        return await run_in_threadpool(crud.get_all_studios, db)
+
+    studios, next_key = await run_in_threadpool(
+        crud.get_property_page,
+        db,
+        models.Studio,
+        limit or pagination.DEFAULT_PAGE_SIZE,
+        pagination.decode_cursor(after),
+    )
+
+    return pagination.page_response(
+        [
+            {"id": id, "name": name, "movie_count": movie_count}
+            for id, name, movie_count in studios
+        ],
+        next_key,
+        headers,
+    )
 
 
 @router.put(
@@ -117,22 +161,17 @@ def studios_get_all(db: Session = Depends(get_db_session)):
     summary="Rename studio",
     tags=["studios"],
 )
+@util.on_fs_executor(StudioSchema)
 def studios_update(
     id: int,
     body: MoviePropertySchema,
     db: Session = Depends(get_db_session),
 ):
     try:
-        studio_name = crud.get_studio(db, id).name
-
         name = body.name.strip()
-        studio = crud.update_studio(db, id, name)
-
-        for movie in studio.movies:
-            util.rename_movie_file(movie, studio_current=studio_name)
-            db.commit()
+        studio, _ = renames.rename_property(db, models.Studio, id, name)
 
-        logger.debug("Renamed studio %s -> %s", studio_name, name)
+        logger.debug("Renamed studio ID %d -> %s", id, name)
     except DuplicateEntryException as e:
         logger.warn(str(e))
 
@@ -1,4 +1,6 @@
-from typing import List, Optional
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -17,10 +19,14 @@ class BaseMovieSchema(BaseModel):
 
 
 class BasePropertySchema(BaseModel):
-    """Base model for schemas about movie properties."""
+    """Base model for schemas about movie properties.
+
+    movie_count is only filled in by the property listings.
+    """
 
     id: int
     name: str
+    movie_count: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -42,6 +48,23 @@ class CategorySchema(BasePropertySchema):
     pass
 
 
+class JobSchema(BaseModel):
+    """Schema describing a background job database object."""
+
+    id: int
+    kind: str
+    status: str
+    progress: int
+    params: Dict[str, Any]
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created: datetime
+    updated: datetime
+
+    class Config:
+        orm_mode = True
+
+
 class MovieFileSchema(BaseMovieSchema):
     """Limited movie schema with only the filename and ID."""
 
@@ -82,6 +105,13 @@ class MovieSchema(BaseMovieSchema):
 # JSON Schemas
 
 
+class JobSubmitSchema(BaseModel):
+    """JSON body schema for submitting a background job."""
+
+    kind: str
+    params: Dict[str, Any] = {}
+
+
 class MoviePropertySchema(BaseModel):
     """JSON body schema for a movie property."""
 
@@ -97,6 +127,100 @@ class MovieUpdateSchema(BaseModel):
     studio_id: Optional[int] = None
 
 
+class FacetValueSchema(BaseModel):
+    """JSON schema for the number of matching movies with a property."""
+
+    id: int
+    name: str
+    count: int
+
+
+class MovieFacetsSchema(BaseModel):
+    """JSON schema for the facet counts of a movie filter."""
+
+    actors: List[FacetValueSchema]
+    categories: List[FacetValueSchema]
+    series: List[FacetValueSchema]
+    studios: List[FacetValueSchema]
+    processed: int
+    unprocessed: int
+
+
+class MovieFilterSchema(BaseModel):
+    """JSON schema for a page of filtered movies and the facet counts."""
+
+    total: int
+    movies: List[MovieFileSchema]
+    facets: MovieFacetsSchema
+
+
+class ImportFileSchema(BaseModel):
+    """JSON schema for the import result of one file."""
+
+    filename: str
+    success: bool
+    id: Optional[int] = None
+    message: Optional[str] = None
+
+
+class ImportReportSchema(BaseModel):
+    """JSON schema for the result of a batch import."""
+
+    imported: int
+    failed: int
+    files: List[ImportFileSchema]
+
+
+class CacheStatsSchema(BaseModel):
+    """JSON schema for the read cache counters."""
+
+    entries: int
+    hits: int
+    misses: int
+
+
+class ExecutorStatsSchema(BaseModel):
+    """JSON schema for the file system executor counters."""
+
+    workers: int
+    pending: int
+
+
+class LatencyStatsSchema(BaseModel):
+    """JSON schema for the latency of one route."""
+
+    count: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class StatsSchema(BaseModel):
+    """JSON schema for the server statistics."""
+
+    cache: CacheStatsSchema
+    fs_executor: ExecutorStatsSchema
+    latency: Dict[str, LatencyStatsSchema]
+
+
+class SearchKind(str, Enum):
+    MOVIE = "movie"
+    ACTOR = "actor"
+    CATEGORY = "category"
+    SERIES = "series"
+    STUDIO = "studio"
+
+
+class SearchResultSchema(BaseModel):
+    """JSON schema for a movie or property matching a search."""
+
+    kind: SearchKind
+    id: int
+    name: Optional[str] = None
+    filename: Optional[str] = None
+
+
 ################################################################################
 # Exception Models
 
@@ -0,0 +1,94 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from .. import util
+from ..database import get_db_session, init_db
+from ..rebuild import rebuild_db
+from ..relink import relink_property_files
+
+LOG_CONFIG_PATH = Path(__file__).parents[2] / "db" / "logging.yaml"
+
+
+@pytest.fixture(scope="module")
+def setup_database(module_mocker: MockerFixture, request):
+    # shared memory database connection URI, named after the test module so
+    # each module starts from a freshly seeded database
+    sqlite3_url = f"file:{request.module.__name__}?mode=memory&cache=shared"
+
+    # patch return value of get_sqlite_path() function call in init_db
+    module_mocker.patch(
+        "moviemanager.database.get_sqlite_path",
+        return_value=f"sqlite:///{sqlite3_url}&uri=true",
+    )
+
+    # seed database with initial values
+    connection = sqlite3.connect(sqlite3_url, uri=True)
+    filename = Path(request.fspath).parent / "data" / "init.sql"
+
+    with open(filename, "r") as f:
+        connection.executescript(f.read())
+
+    # setup sqlalchemy session factory
+    init_db()
+
+    # yield the connection to keep the in-memory database until testing is over
+    yield connection
+
+
+@pytest.fixture()
+def db():
+    yield from get_db_session()
+
+
+@pytest.fixture()
+def library(request, tmp_path, monkeypatch):
+    """Points the config at a movie library under tmp_path.
+
+    The library is empty unless the fixture is parametrized indirectly with
+    a dict of these options:
+
+        movies: Filenames of the movie files to create.
+        categories: (filename, category) pairs of category links to create.
+        database: "rebuild" to build the database from the files, "seed" to
+            seed it from data/init.sql, or None to leave it to the test.
+        relink: True to create the property links after the rebuild.
+
+    Tests that run jobs need a seeded database file, as tables in a shared
+    memory database are locked without waiting for the busy timeout.
+    """
+
+    options = getattr(request, "param", {})
+
+    monkeypatch.setenv("MM_DB_PATH", str(tmp_path))
+    monkeypatch.setenv("MM_SQLITE_PATH", str(tmp_path / "sqlite.db"))
+    monkeypatch.setenv("MM_LOG_CONFIG_PATH", str(LOG_CONFIG_PATH))
+
+    for path_type in util.PathType:
+        (tmp_path / path_type.value).mkdir()
+
+    for filename in options.get("movies", ()):
+        (tmp_path / "movies" / filename).touch()
+
+    for filename, category in options.get("categories", ()):
+        util.update_category_link(filename, category, True)
+
+    database = options.get("database")
+
+    if database == "rebuild":
+        rebuild_db()
+    elif database == "seed":
+        connection = sqlite3.connect(tmp_path / "sqlite.db")
+
+        with open(Path(__file__).parent / "data" / "init.sql", "r") as f:
+            connection.executescript(f.read())
+
+        connection.close()
+        init_db()
+
+    if options.get("relink", False):
+        relink_property_files()
+
+    yield tmp_path
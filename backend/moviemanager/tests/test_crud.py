@@ -1,42 +1,12 @@
-import sqlite3
-from pathlib import Path
-
 import pytest
-from pytest_mock import MockerFixture
+from sqlalchemy import event
 
-from .. import crud
-from ..database import get_db_session, init_db
+from .. import crud, models, versions
 from ..exceptions import DuplicateEntryException
+from ..schemas import MovieUpdateSchema
 
 
-@pytest.fixture(scope="module", autouse=True)
-def setup_database(module_mocker: MockerFixture, request):
-    # shared memory database connection URI
-    sqlite3_url = "file::memory:?cache=shared"
-
-    # patch return value of get_sqlite_path() function call in init_db
-    module_mocker.patch(
-        "moviemanager.database.get_sqlite_path",
-        return_value=f"sqlite:///{sqlite3_url}&uri=true",
-    )
-
-    # setup sqlalchemy session factory
-    init_db()
-
-    # seed database with initial values
-    connection = sqlite3.connect(sqlite3_url)
-    filename = Path(request.fspath).parent / "data" / "init.sql"
-
-    with open(filename, "r") as f:
-        connection.executescript(f.read())
-
-    # yield the connection to keep the in-memory database until testing is over
-    yield connection
-
-
-@pytest.fixture()
-def db():
-    yield from get_db_session()
+pytestmark = pytest.mark.usefixtures("setup_database")
 
 
 def test_add_actor(db):
@@ -70,3 +40,241 @@ def test_get_actor_by_name_not_found(db):
     actor = crud.get_actor_by_name(db, "xxxxxxxxxxxxxxxx")
 
     assert actor is None
+
+
+def test_bulk_add_properties(db):
+    ids = crud.bulk_add_properties(db, models.Category, ["drama", "horror"])
+
+    assert ids["drama"] == crud.get_category_by_name(db, "drama").id
+    assert ids["horror"] == crud.get_category_by_name(db, "horror").id
+
+
+def test_bulk_add_properties_duplicate(db):
+    with pytest.raises(DuplicateEntryException):
+        crud.bulk_add_properties(db, models.Studio, ["Disney"])
+
+
+def test_natural_sort_order(db):
+    ids = crud.bulk_add_properties(
+        db, models.Series, ["Part 10", "part 2", "The Part 1"]
+    )
+
+    def names():
+        return [
+            series.name
+            for series in crud.get_all_series(db)
+            if series.id in ids.values()
+        ]
+
+    # numbers sort by value, ignoring case and articles like the sort names
+    assert names() == ["The Part 1", "part 2", "Part 10"]
+
+    # a rename updates the stored key
+    crud.update_series(db, ids["Part 10"], "Part 03")
+    assert names() == ["The Part 1", "part 2", "Part 03"]
+
+    for id in ids.values():
+        crud.delete_series(db, id)
+
+
+def count_queries(db, func):
+    """Returns the number of SQL statements run by func."""
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+
+    try:
+        func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return len(statements)
+
+
+def test_get_all_movies_query_count(db):
+    def load_movies():
+        for movie in crud.get_all_movies(db, with_properties=True):
+            [actor.name for actor in movie.actors]
+            [category.name for category in movie.categories]
+            movie.series and movie.series.name
+            movie.studio and movie.studio.name
+
+    queries = count_queries(db, load_movies)
+    actors = [crud.get_actor(db, 1), crud.get_actor(db, 2)]
+
+    for i in range(10):
+        crud.add_movie(db, f"Query Count {i}.mp4", f"Query Count {i}", 1, 2, i, actors)
+
+    db.expire_all()
+
+    assert count_queries(db, load_movies) == queries
+
+
+def test_get_all_movie_files(db):
+    movies = crud.get_all_movies(db)
+
+    assert crud.get_all_movie_files(db) == [
+        (movie.id, movie.filename) for movie in movies
+    ]
+
+
+def test_search(db):
+    results = crud.search(db, "lord ring")
+
+    assert results[0] == {
+        "kind": "series",
+        "id": 1,
+        "name": "Lord of the Rings",
+        "filename": None,
+    }
+    assert {result["id"] for result in results[1:]} == {6, 7, 8}
+
+    # prefixes of words in the filename match movies too
+    assert [result["id"] for result in crud.search(db, "hank", ["movie"])] == [9]
+    assert [result["kind"] for result in crud.search(db, "hank")] == [
+        "actor",
+        "movie",
+    ]
+
+
+def test_search_follows_changes(db):
+    actor = crud.add_actor(db, "Zendaya Coleman")
+    assert crud.search(db, "zend")[0]["id"] == actor.id
+
+    crud.update_actor(db, actor.id, "Zoe Saldana")
+    assert crud.search(db, "zend") == []
+    assert crud.search(db, "saldan")[0]["id"] == actor.id
+
+    crud.delete_actor(db, actor.id)
+    assert crud.search(db, "saldan") == []
+    assert crud.search(db, "  ") == []
+
+
+def test_search_ranks_every_match(db):
+    crud.bulk_add_properties(
+        db, models.Actor, [f"Starling Episode {number}" for number in range(50)]
+    )
+    actor = crud.add_actor(db, "Starling")
+
+    # the best match is found after many worse ones in search index order
+    results = crud.search(db, "starling", ["actor"], limit=5)
+
+    assert len(results) == 5
+    assert results[0]["id"] == actor.id
+
+
+def test_filter_movies(db):
+    result, next_key = crud.filter_movies(db, actor_ids=[4], studio_id=5)
+
+    assert next_key is None
+    assert result["total"] == 3
+    assert [movie["id"] for movie in result["movies"]] == [6, 7, 8]
+    assert result["facets"]["series"] == [
+        {"id": 1, "name": "Lord of the Rings", "count": 3}
+    ]
+    assert {actor["id"] for actor in result["facets"]["actors"]} == {4, 5, 13, 14}
+
+    # movies must have every actor
+    result, _ = crud.filter_movies(db, actor_ids=[4, 9])
+    assert [movie["id"] for movie in result["movies"]] == [10, 11]
+
+    result, _ = crud.filter_movies(db, processed=False, facet_limit=1)
+    assert result["facets"]["processed"] == 0
+    assert result["facets"]["unprocessed"] == result["total"]
+    assert len(result["facets"]["actors"]) <= 1
+
+    # the unfiltered facets count every movie
+    movies = crud.get_all_movies(db, with_properties=True)
+    result, _ = crud.filter_movies(db, limit=1000, facet_limit=1000)
+
+    assert result["total"] == len(movies)
+    assert sum(actor["count"] for actor in result["facets"]["actors"]) == sum(
+        len(movie.actors) for movie in movies
+    )
+
+
+def test_filter_movies_cached_facets(db):
+    result, _ = crud.filter_movies(db, processed=True)
+    movie = crud.filter_movies(db, processed=False)[0]["movies"][0]
+
+    # the facets are read from the cache until the movies change
+    assert count_queries(db, lambda: crud.filter_movies(db, processed=True)) == 1
+
+    crud.bulk_update_movies(db, [{"id": movie["id"], "processed": True}])
+    after, _ = crud.filter_movies(db, processed=True)
+
+    assert after["total"] == result["total"] + 1
+    assert after["facets"]["processed"] == result["facets"]["processed"] + 1
+
+    crud.bulk_update_movies(db, [{"id": movie["id"], "processed": False}])
+
+
+@pytest.mark.parametrize(
+    "get_all, model",
+    [
+        (crud.get_all_actors, models.Actor),
+        (crud.get_all_categories, models.Category),
+        (crud.get_all_series, models.Series),
+        (crud.get_all_studios, models.Studio),
+    ],
+)
+def test_property_movie_counts(db, get_all, model):
+    counts = {row.id: row.movie_count for row in get_all(db)}
+
+    assert counts == {property.id: len(property.movies) for property in db.query(model)}
+
+    # the counts are one grouped query, not one per property
+    db.expire_all()
+    assert count_queries(db, lambda: crud.get_property_page(db, model, 100)) == 2
+    assert crud.get_property_page(db, model, 100)[0] == [
+        (row.id, row.name, row.movie_count) for row in get_all(db)[:100]
+    ]
+
+    # streaming joins the counts in, in a single query
+    assert count_queries(db, lambda: list(crud.iter_properties(db, model))) == 1
+    assert list(crud.iter_properties(db, model)) == [
+        (row.id, row.name, row.movie_count) for row in get_all(db)
+    ]
+
+
+def test_property_movie_counts_follow_changes(db):
+    movie = crud.filter_movies(db, studio_id=1)[0]["movies"][0]
+    studio = crud.get_studio_by_name(db, "Fox")
+    before = {studio.id: studio.movie_count for studio in crud.get_all_studios(db)}
+
+    crud.bulk_update_movies(db, [{"id": movie["id"], "studio_id": studio.id}])
+    after = {studio.id: studio.movie_count for studio in crud.get_all_studios(db)}
+
+    assert after[1] == before[1] - 1
+    assert after[studio.id] == before[studio.id] + 1
+
+    crud.bulk_update_movies(db, [{"id": movie["id"], "studio_id": 1}])
+    assert {
+        studio.id: studio.movie_count for studio in crud.get_all_studios(db)
+    } == before
+
+
+def test_update_movie_processed_changes_version(db):
+    movie = crud.filter_movies(db, processed=False)[0]["movies"][0]
+    movie = crud.get_movie(db, movie["id"])
+    before = versions.get("movies")
+
+    # only the processed flag changes, so no file is renamed
+    crud.update_movie(
+        db,
+        movie.id,
+        MovieUpdateSchema(
+            name=movie.name,
+            series_id=movie.series_id,
+            series_number=movie.series_number,
+            studio_id=movie.studio_id,
+        ),
+    )
+
+    assert crud.get_movie(db, movie.id).processed
+    assert versions.get("movies") != before
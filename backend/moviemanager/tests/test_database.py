@@ -0,0 +1,240 @@
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+from .. import crud, database, models, versions
+from ..config import get_sqlite_pragmas
+from ..database import get_db_session, init_db, optimize_db
+
+
+@pytest.fixture()
+def sqlite_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("MM_SQLITE_PATH", str(tmp_path / "sqlite.db"))
+
+    yield tmp_path / "sqlite.db"
+
+
+@pytest.fixture()
+def old_db(sqlite_file):
+    """Seeds a database file in the format of the first release."""
+
+    connection = sqlite3.connect(sqlite_file)
+
+    with open(Path(__file__).parent / "data" / "init.sql", "r") as f:
+        connection.executescript(f.read())
+
+    connection.close()
+    init_db()
+
+    yield from get_db_session()
+
+
+def pragma(db, name):
+    return db.execute(f"pragma {name}").scalar()
+
+
+def query_plans(db, run):
+    """Returns the query plan of each statement executed by run."""
+
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", listener)
+
+    try:
+        run()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    return [
+        [
+            row[3]
+            for row in db.connection().exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+        ]
+        for statement, parameters in statements
+    ]
+
+
+def join_order(db):
+    """Returns movie IDs in the get_all_movies order, sorted with joins."""
+
+    return [
+        id
+        for id, in db.execute(
+            """
+            SELECT movies.id FROM movies
+            LEFT JOIN studios ON studios.id = movies.studio_id
+            LEFT JOIN series ON series.id = movies.series_id
+            ORDER BY movies.processed, coalesce(studios.sort_key, ''),
+                coalesce(series.sort_key, ''), coalesce(movies.series_number, -1),
+                movies.sort_key, movies.id
+            """
+        )
+    ]
+
+
+def test_sqlite_profile_performance(sqlite_file, monkeypatch):
+    monkeypatch.setenv("MM_SQLITE_PROFILE", "performance")
+    monkeypatch.setenv("MM_SQLITE_CACHE_SIZE", "-1024")
+    init_db()
+
+    db = next(get_db_session())
+
+    assert pragma(db, "journal_mode") == "wal"
+    assert pragma(db, "synchronous") == 1
+    assert pragma(db, "cache_size") == -1024
+    assert pragma(db, "temp_store") == 2
+    assert pragma(db, "foreign_keys") == 1
+
+
+def test_sqlite_profile_default(sqlite_file, monkeypatch):
+    monkeypatch.delenv("MM_SQLITE_PROFILE", raising=False)
+    init_db()
+
+    db = next(get_db_session())
+
+    assert pragma(db, "journal_mode") == "delete"
+    assert pragma(db, "synchronous") == 2
+
+
+@pytest.mark.parametrize(
+    "name, value",
+    [
+        ("MM_SQLITE_PROFILE", "fast"),
+        ("MM_SQLITE_SYNCHRONOUS", "sometimes"),
+        ("MM_SQLITE_MMAP_SIZE", "1; drop table movies"),
+    ],
+)
+def test_sqlite_pragmas_invalid(monkeypatch, name, value):
+    monkeypatch.setenv(name, value)
+
+    with pytest.raises(ValueError):
+        get_sqlite_pragmas()
+
+
+def test_optimize_db(sqlite_file, monkeypatch):
+    monkeypatch.setenv("MM_SQLITE_OPTIMIZE_INTERVAL", "3600")
+    init_db()
+
+    assert not optimize_db()
+    assert optimize_db(force=True)
+
+    optimized = time.monotonic() - 3600
+    monkeypatch.setattr(database, "__optimized", optimized)
+
+    # closing a session runs it once the interval has passed
+    for _ in get_db_session():
+        pass
+
+    assert database.__optimized > optimized
+    assert not optimize_db()
+
+
+def test_versions_follow_other_processes(old_db, sqlite_file):
+    actors = crud.get_all_actors(old_db)
+    before = (versions.get("actors"), versions.get("categories"))
+
+    # a write from another process, like run.py --reconcile
+    connection = sqlite3.connect(sqlite_file)
+
+    with connection:
+        connection.execute("INSERT INTO actors (name) VALUES ('Other Process')")
+
+    connection.close()
+
+    assert versions.get("actors") != before[0]
+    assert versions.get("categories") == before[1]
+    assert len(crud.get_all_actors(old_db)) == len(actors) + 1
+
+
+def test_versions_epoch(sqlite_file, monkeypatch):
+    init_db()
+    etag = versions.etag("actors")
+
+    # the epoch is stored in the database, so ETags survive a restart
+    init_db()
+    assert versions.etag("actors") == etag
+
+    # a new database starts its counters from zero under a new epoch
+    monkeypatch.setenv("MM_SQLITE_PATH", str(sqlite_file.parent / "new.db"))
+    init_db()
+    assert versions.etag("actors") != etag
+
+
+def test_upgrade_db(old_db):
+    movies = crud.get_all_movies(old_db)
+
+    assert all(movie.list_key is not None for movie in movies)
+    assert [movie.id for movie in movies] == join_order(old_db)
+
+    # the triggers keep the key in step with the movie and its studio
+    studio = crud.get_studio_by_name(old_db, "Disney")
+    crud.update_studio(old_db, studio.id, "Zeta Pictures")
+    crud.bulk_update_movies(old_db, [{"id": movies[0].id, "processed": True}])
+
+    assert [movie.id for movie in crud.get_all_movies(old_db)] == join_order(old_db)
+
+    # upgrading again changes nothing
+    init_db()
+    assert [movie.id for movie in crud.get_all_movies(old_db)] == join_order(old_db)
+
+
+def test_query_plans(old_db):
+    old_db.execute("ANALYZE")
+
+    actor = crud.get_actor_by_name(old_db, "Tom Hanks")
+    studio = crud.get_studio_by_name(old_db, "Disney")
+    _, after = crud.get_movie_files_page(old_db, 2)
+
+    # the first statement is the listing, the rest load the movie collections
+    listings = [
+        query_plans(old_db, lambda: crud.get_all_movies(old_db))[0],
+        query_plans(old_db, lambda: crud.get_all_movies(old_db, True))[0],
+        query_plans(old_db, lambda: crud.get_movie_files_page(old_db, 2, after))[0],
+    ]
+
+    for plan in listings:
+        assert plan[0].split(" (")[0] in (
+            "SCAN movies USING INDEX ix_movies_list_key",
+            "SEARCH movies USING INDEX ix_movies_list_key",
+        )
+        assert all(step.startswith("SEARCH") for step in plan[1:])
+
+    # only the movies of the property are sorted, after index searches
+    lookups = [
+        query_plans(old_db, lambda: actor.movies)[0],
+        query_plans(old_db, lambda: crud.get_category_movies(old_db, 1))[0],
+    ]
+
+    for plan in lookups:
+        assert all(step.startswith("SEARCH") for step in plan[:-1])
+        assert plan[-1] == "USE TEMP B-TREE FOR ORDER BY"
+
+    assert query_plans(old_db, lambda: studio.movies)[0] == [
+        "SEARCH movies USING INDEX ix_movies_studio_id_sort_key (studio_id=?)"
+    ]
+
+    # the property listings scan their sort key index, from the page key on
+    for model in (models.Actor, models.Category, models.Series, models.Studio):
+        table = model.__tablename__
+        _, after = crud.get_property_page(old_db, model, 1)
+
+        for plan in (
+            query_plans(old_db, lambda: crud.get_property_page(old_db, model, 2))[0],
+            query_plans(
+                old_db, lambda: crud.get_property_page(old_db, model, 2, after)
+            )[0],
+        ):
+            assert plan[0].split(" (")[0] in (
+                f"SCAN {table} USING INDEX ix_{table}_sort_key",
+                f"SEARCH {table} USING INDEX ix_{table}_sort_key",
+            )
+            assert len(plan) == 1
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from .. import create_app, jobs
+from ..database import get_db_session
+from ..jobs import JobQueue, JobStatus
+
+
+pytestmark = pytest.mark.parametrize("library", [{"database": "seed"}], indirect=True)
+
+
+@pytest.fixture()
+def db(library):
+    yield from get_db_session()
+
+
+@pytest.fixture()
+def gate(monkeypatch):
+    """Adds a job kind that reports progress until the gate is opened."""
+
+    event = threading.Event()
+
+    def run(db, context, params):
+        for i in range(10):
+            context.progress(i, 10)
+            event.wait(5)
+
+        return {"steps": 10}
+
+    monkeypatch.setitem(jobs.JOB_KINDS, "gate", run)
+
+    yield event
+
+    event.set()
+
+
+def wait_for(db, id, statuses):
+    for _ in range(500):
+        db.expire_all()
+        job = jobs.crud.get_job(db, id)
+
+        if job.status in statuses:
+            return job
+
+        time.sleep(0.01)
+
+    raise AssertionError(f"Job {id} is still {job.status}")
+
+
+def test_job_queue(db, gate):
+    queue = JobQueue(1)
+
+    running = queue.submit(db, "gate", {})
+    queued = queue.submit(db, "gate", {})
+
+    wait_for(db, running.id, [JobStatus.RUNNING.value])
+    assert queue.cancel(db, queued.id).status == JobStatus.CANCELLED.value
+
+    gate.set()
+
+    job = wait_for(db, running.id, [JobStatus.SUCCEEDED.value])
+    assert (job.progress, job.result) == (100, {"steps": 10})
+
+    queue.shutdown()
+
+
+def test_job_queue_cancel_running(db, gate):
+    queue = JobQueue(1)
+
+    job = queue.submit(db, "gate", {})
+    wait_for(db, job.id, [JobStatus.RUNNING.value])
+    queue.cancel(db, job.id)
+    gate.set()
+
+    assert wait_for(db, job.id, [JobStatus.CANCELLED.value]).progress < 100
+
+    queue.shutdown()
+
+
+def test_job_queue_resume(db, gate):
+    job = jobs.crud.add_job(db, "gate", {})
+    jobs.crud.update_job(db, job.id, status=JobStatus.RUNNING.value, progress=50)
+
+    queue = JobQueue(1)
+    gate.set()
+
+    assert queue.resume(db) == 1
+    assert wait_for(db, job.id, [JobStatus.SUCCEEDED.value]).progress == 100
+
+    queue.shutdown()
+
+
+def test_jobs_import(db, library):
+    filename = "[Disney] {Toy Story 3} Toy Story 3 (Tim Allen, Tom Hanks).mp4"
+    (library / "imports" / filename).touch()
+
+    client = TestClient(create_app())
+
+    response = client.post("/jobs", json={"kind": "import"})
+    assert response.status_code == 200
+
+    job = wait_for(db, response.json()["id"], [JobStatus.SUCCEEDED.value])
+    assert job.result["imported"] == 1
+    assert (library / "movies" / filename).exists()
+
+    response = client.get(f"/jobs/{job.id}")
+    assert response.json()["status"] == JobStatus.SUCCEEDED.value
+
+    assert client.post("/jobs", json={"kind": "unknown"}).status_code == 400
+    assert (
+        client.post(
+            "/jobs", json={"kind": "rename_actor", "params": {"id": 0, "name": "x"}}
+        ).status_code
+        == 404
+    )
@@ -0,0 +1,138 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+from .. import migrations, models, util
+from ..exceptions import SchemaVersionException
+
+
+def connect(path):
+    return create_engine(f"sqlite:///{path}")
+
+
+def schema(engine):
+    """Returns the tables, indexes and triggers, and the columns of movies."""
+
+    with engine.connect() as conn:
+        objects = set(
+            conn.exec_driver_sql(
+                "SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"
+            )
+        )
+        columns = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(movies)")]
+
+    return objects, columns
+
+
+@pytest.fixture()
+def new_engine(tmp_path):
+    engine = connect(tmp_path / "new.db")
+    migrations.migrate(engine)
+
+    yield engine
+
+
+@pytest.fixture()
+def old_engine(tmp_path):
+    """Returns an engine for a database in the format of the first release."""
+
+    connection = sqlite3.connect(tmp_path / "old.db")
+
+    with open(Path(__file__).parent / "data" / "init.sql", "r") as f:
+        connection.executescript(f.read())
+
+    connection.close()
+
+    yield connect(tmp_path / "old.db")
+
+
+def test_migrate_new(new_engine):
+    assert migrations.get_version(new_engine) == migrations.LATEST_VERSION
+    assert migrations.migrate(new_engine) == 0
+
+
+def test_migrate_old(old_engine, new_engine, monkeypatch):
+    monkeypatch.setattr(migrations, "BACKFILL_BATCH_SIZE", 2)
+
+    assert migrations.get_version(old_engine) == 0
+    assert migrations.migrate(old_engine) == migrations.LATEST_VERSION
+    assert migrations.get_version(old_engine) == migrations.LATEST_VERSION
+    assert schema(old_engine) == schema(new_engine)
+
+    with old_engine.connect() as conn:
+        assert (
+            conn.exec_driver_sql(
+                "SELECT count(*) FROM movies WHERE list_key IS NULL"
+            ).scalar()
+            == 0
+        )
+
+        for table in models.SORT_KEY_TABLES:
+            assert (
+                conn.exec_driver_sql(
+                    f"SELECT count(*) FROM {table} WHERE sort_key IS NULL"
+                ).scalar()
+                == 0
+            )
+
+    assert migrations.migrate(old_engine) == 0
+
+
+def test_migrate_partial(old_engine, new_engine):
+    for migration in migrations.MIGRATIONS[:2]:
+        migration(old_engine)
+
+    with old_engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA user_version = 2")
+
+    assert migrations.migrate(old_engine) == migrations.LATEST_VERSION - 2
+    assert schema(old_engine) == schema(new_engine)
+
+
+def test_migrate_interrupted(old_engine, new_engine):
+    # the migrations ran, but the version was never recorded
+    for migration in migrations.MIGRATIONS:
+        migration(old_engine)
+
+    assert migrations.migrate(old_engine) == migrations.LATEST_VERSION
+    assert schema(old_engine) == schema(new_engine)
+
+
+def test_migrate_refused(old_engine):
+    with pytest.raises(SchemaVersionException):
+        migrations.migrate(old_engine, upgrade=False)
+
+    assert migrations.get_version(old_engine) == 0
+
+    with old_engine.begin() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version = {migrations.LATEST_VERSION + 1}")
+
+    with pytest.raises(SchemaVersionException):
+        migrations.migrate(old_engine)
+
+
+def test_written_elsewhere(new_engine, tmp_path):
+    # other tools write the sort keys along with the names, and the
+    # triggers they run need no application functions
+    connection = sqlite3.connect(tmp_path / "new.db")
+
+    with connection:
+        connection.execute(
+            "INSERT INTO studios (name, sort_name, sort_key) VALUES (?, ?, ?)",
+            ("Pixar 2", "pixar 2", util.generate_sort_key("Pixar 2")),
+        )
+        connection.execute(
+            "INSERT INTO movies (filename, name, studio_id, processed, sort_key) "
+            "VALUES (?, ?, 1, 1, ?)",
+            ("Cars.mp4", "Cars", util.generate_sort_key("Cars")),
+        )
+
+    connection.close()
+
+    with new_engine.connect() as conn:
+        assert (
+            conn.exec_driver_sql("SELECT list_key FROM movies").scalar()
+            == "1\x01pixar 0000000002\x01\x01\x01cars"
+        )
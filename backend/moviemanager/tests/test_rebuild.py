@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from .. import crud, util
+from ..database import get_db_session
+from ..rebuild import rebuild_db, reconcile_db
+
+MOVIES = (
+    "[Disney] Aladdin (Robin Williams).mp4",
+    "[Disney] Toy Story (Tim Allen, Tom Hanks).mp4",
+    "[Fox] {X-Men 1} X-Men (Hugh Jackman, Patrick Stewart).mp4",
+)
+
+
+pytestmark = pytest.mark.parametrize(
+    "library",
+    [
+        {
+            "movies": MOVIES,
+            "categories": [(MOVIES[0], "animated"), (MOVIES[1], "animated")],
+        }
+    ],
+    indirect=True,
+)
+
+
+def test_rebuild_db(library):
+    rebuild_db(batch_size=2, workers=2)
+    db = next(get_db_session())
+
+    movies = crud.get_all_movies(db, with_properties=True)
+
+    assert [movie.filename for movie in movies] == sorted(MOVIES)
+    assert [actor.name for actor in movies[1].actors] == ["Tim Allen", "Tom Hanks"]
+    assert [category.name for category in movies[1].categories] == ["animated"]
+    assert movies[2].series.name == "X-Men"
+    assert movies[2].series_number == 1
+
+
+def test_reconcile_db(library):
+    rebuild_db()
+
+    assert sum(reconcile_db(dry_run=True).values()) == 0
+
+    (library / "movies" / MOVIES[0]).unlink()
+    (library / "movies" / "[Fox] Ice Age (Ray Romano).mp4").touch()
+    util.update_category_link(MOVIES[1], "animated", False)
+    util.update_category_link(MOVIES[2], "action", True)
+
+    expected = {
+        "properties_added": 2,
+        "movies_added": 1,
+        "movies_removed": 1,
+        "movies_updated": 0,
+        "actors_added": 0,
+        "actors_removed": 0,
+        "categories_added": 1,
+        "categories_removed": 1,
+    }
+
+    assert reconcile_db(dry_run=True) == expected
+    assert reconcile_db() == expected
+    assert sum(reconcile_db(dry_run=True).values()) == 0
+
+    db = next(get_db_session())
+    movies = {movie.filename: movie for movie in crud.get_all_movies(db)}
+
+    assert MOVIES[0] not in movies
+    assert movies["[Fox] Ice Age (Ray Romano).mp4"].actors[0].name == "Ray Romano"
+    assert movies[MOVIES[1]].categories == []
+    assert [category.name for category in movies[MOVIES[2]].categories] == ["action"]
+
+
+def test_reconcile_db_manifest(library, mocker):
+    # age the directories so the manifest trusts their timestamps
+    for path in [library, *library.rglob("*")]:
+        if path.is_dir():
+            os.utime(path, (0, 0))
+
+    rebuild_db()
+
+    util.update_category_link(MOVIES[2], "animated", True)
+    util.update_actor_link(MOVIES[0], "Scott Weinger", True)
+
+    scan = mocker.patch("moviemanager.rebuild._scan_library")
+
+    assert reconcile_db() == {
+        "properties_added": 1,
+        "movies_added": 0,
+        "movies_removed": 0,
+        "movies_updated": 0,
+        "actors_added": 1,
+        "actors_removed": 0,
+        "categories_added": 1,
+        "categories_removed": 0,
+    }
+
+    scan.assert_not_called()
+
+    db = next(get_db_session())
+    movie = crud.get_movie_ids(db, [MOVIES[0]])[MOVIES[0]]
+
+    assert [actor.name for actor in crud.get_movie(db, movie).actors] == [
+        "Robin Williams",
+        "Scott Weinger",
+    ]
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from .. import manifest, util
+from ..rebuild import rebuild_db
+from ..relink import relink_property_files
+
+MOVIES = (
+    "[Disney] Aladdin (Robin Williams).mp4",
+    "[Disney] Toy Story (Tim Allen, Tom Hanks).mp4",
+)
+
+
+pytestmark = pytest.mark.parametrize(
+    "library",
+    [
+        {
+            "movies": MOVIES,
+            "categories": [(MOVIES[0], "animated")],
+            "database": "rebuild",
+        }
+    ],
+    indirect=True,
+)
+
+
+def test_relink_property_files(library):
+    counts = relink_property_files()
+
+    assert (counts["created"], counts["removed"], counts["repaired"]) == (5, 0, 0)
+    assert os.path.exists(library / "actors" / "Tom Hanks" / MOVIES[1])
+    assert os.path.exists(library / "studios" / "Disney" / MOVIES[0])
+
+    # a stale link left by a rename, and a link pointing at the wrong file
+    os.symlink("../../movies/old.mp4", library / "studios" / "Disney" / "old.mp4")
+    os.remove(library / "actors" / "Tom Hanks" / MOVIES[1])
+    os.symlink("../../movies/old.mp4", library / "actors" / "Tom Hanks" / MOVIES[1])
+
+    counts = relink_property_files(full=True)
+
+    assert (counts["created"], counts["removed"], counts["repaired"]) == (0, 1, 1)
+    assert not os.path.lexists(library / "studios" / "Disney" / "old.mp4")
+    assert os.path.exists(library / "actors" / "Tom Hanks" / MOVIES[1])
+
+    counts = relink_property_files(full=True)
+
+    assert (counts["created"], counts["removed"], counts["repaired"]) == (0, 0, 0)
+
+
+def test_relink_after_rebuild(library, monkeypatch):
+    # directories modified within RACY_SECONDS are always checked again
+    monkeypatch.setattr(manifest, "RACY_SECONDS", 0)
+
+    # a directory rebuild read keeps its fingerprint, but lacks a wanted link
+    hook = "[Disney] Hook (Robin Williams).mp4"
+    (library / "movies" / hook).touch()
+    util.update_actor_link(MOVIES[0], "Robin Williams", True)
+
+    (library / "sqlite.db").unlink()
+    rebuild_db()
+
+    counts = relink_property_files()
+
+    assert os.path.exists(library / "actors" / "Robin Williams" / hook)
+    assert counts["created"] == 6
+
+    # synced directories are skipped until the links they want change
+    counts = relink_property_files()
+
+    assert (counts["created"], counts["skipped"]) == (0, 8)
@@ -0,0 +1,225 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from .. import crud, journal, models, renames
+from ..database import get_db_session
+from ..exceptions import DuplicateEntryException, PathException
+from ..relink import relink_property_files
+
+MOVIES = (
+    "[Disney] Aladdin (Robin Williams).mp4",
+    "[Disney] Toy Story (Tim Allen, Tom Hanks).mp4",
+    "[Pixar] {Cars 1} Cars (Owen Wilson, Tom Hanks).mp4",
+)
+
+
+pytestmark = pytest.mark.parametrize(
+    "library",
+    [
+        {
+            "movies": MOVIES,
+            "categories": [(MOVIES[1], "animated")],
+            "database": "rebuild",
+            "relink": True,
+        }
+    ],
+    indirect=True,
+)
+
+
+@pytest.fixture()
+def db(library):
+    yield from get_db_session()
+
+
+def files(path: Path):
+    """Returns every file and link under path, relative to it."""
+
+    return sorted(
+        str(Path(root, name).relative_to(path))
+        for root, _, names in os.walk(path)
+        for name in names
+        if not name.startswith("sqlite.db")
+    )
+
+
+def count_calls(monkeypatch, *names):
+    """Counts the calls of os functions, returning the live counters."""
+
+    calls = dict.fromkeys(names, 0)
+
+    def counted(name, func):
+        def call(*args, **kwargs):
+            calls[name] += 1
+
+            return func(*args, **kwargs)
+
+        return call
+
+    for name in names:
+        monkeypatch.setattr(os, name, counted(name, getattr(os, name)))
+
+    return calls
+
+
+def test_rename_property(library, db, monkeypatch):
+    actor = crud.get_actor_by_name(db, "Tom Hanks")
+    actor, renamed = renames.rename_property(db, models.Actor, actor.id, "Tommy Hanks")
+
+    assert renamed == 2
+    assert actor.name == "Tommy Hanks"
+    assert sorted(movie.filename for movie in actor.movies) == [
+        "[Disney] Toy Story (Tim Allen, Tommy Hanks).mp4",
+        "[Pixar] {Cars 1} Cars (Owen Wilson, Tommy Hanks).mp4",
+    ]
+
+    # the result is the library a rebuild of the renamed files would give
+    assert not os.path.exists(library / "actors" / "Tom Hanks")
+    counts = relink_property_files(full=True)
+    assert (counts["created"], counts["removed"], counts["repaired"]) == (0, 0, 0)
+    assert os.path.exists(
+        library
+        / "categories"
+        / "animated"
+        / "[Disney] Toy Story (Tim Allen, Tommy Hanks).mp4"
+    )
+
+    # a category rename moves its link directory and touches no links
+    calls = count_calls(monkeypatch, "rename", "symlink", "remove")
+    category = crud.get_category_by_name(db, "animated")
+    _, renamed = renames.rename_property(db, models.Category, category.id, "cartoon")
+
+    assert renamed == 0
+    assert calls == {"rename": 1, "symlink": 0, "remove": 0}
+    assert os.listdir(library / "categories") == ["cartoon"]
+
+
+def test_rename_property_taken_directory(library, db):
+    # a stale directory with the new name holds the links moved one by one
+    (library / "studios" / "Walt Disney").mkdir()
+
+    studio = crud.get_studio_by_name(db, "Disney")
+    _, renamed = renames.rename_property(db, models.Studio, studio.id, "Walt Disney")
+
+    assert renamed == 2
+    assert not os.path.exists(library / "studios" / "Disney")
+    assert len(os.listdir(library / "studios" / "Walt Disney")) == 2
+
+    counts = relink_property_files(full=True)
+    assert (counts["created"], counts["removed"], counts["repaired"]) == (0, 0, 0)
+
+
+def test_rename_property_collision(library, db):
+    (library / "movies" / "[Pixar] {Cars 1} Cars (Owen Wilson, Tom).mp4").touch()
+    before = files(library)
+
+    actor = crud.get_actor_by_name(db, "Tom Hanks")
+
+    with pytest.raises(PathException):
+        renames.rename_property(db, models.Actor, actor.id, "Tom")
+
+    with pytest.raises(DuplicateEntryException):
+        renames.rename_property(db, models.Actor, actor.id, "Owen Wilson")
+
+    assert files(library) == before
+    assert crud.get_actor(db, actor.id).name == "Tom Hanks"
+
+
+def test_rename_property_undo(library, db, monkeypatch):
+    before = files(library)
+    symlink = os.symlink
+    calls = []
+
+    def failing_symlink(*args):
+        calls.append(args)
+
+        if len(calls) == 4:
+            raise OSError("disk full")
+
+        symlink(*args)
+
+    monkeypatch.setattr(os, "symlink", failing_symlink)
+
+    studio = crud.get_studio_by_name(db, "Disney")
+
+    with pytest.raises(PathException):
+        renames.rename_property(db, models.Studio, studio.id, "Walt Disney")
+
+    monkeypatch.setattr(os, "symlink", symlink)
+
+    assert files(library) == before
+    assert db.query(models.FileOperation).count() == 0
+    assert crud.get_studio(db, studio.id).name == "Disney"
+    assert crud.get_movie_ids(db, MOVIES) == {
+        movie.filename: movie.id for movie in crud.get_all_movies(db)
+    }
+
+
+def test_rename_property_progress(library, db):
+    before = files(library)
+    studio = crud.get_studio_by_name(db, "Disney")
+    calls = []
+
+    def failing_progress(done, total):
+        calls.append((done, total))
+
+        if done == 3:
+            raise ValueError("cancelled")
+
+    # an exception raised by the callback undoes the batch
+    with pytest.raises(ValueError):
+        renames.rename_property(
+            db, models.Studio, studio.id, "Walt Disney", failing_progress
+        )
+
+    assert files(library) == before
+    assert crud.get_studio(db, studio.id).name == "Disney"
+
+    calls.clear()
+    renames.rename_property(
+        db, models.Studio, studio.id, "Walt Disney", lambda *args: calls.append(args)
+    )
+
+    total = calls[0][1]
+    assert calls == [(done, total) for done in range(1, total + 1)]
+
+
+def test_rename_property_crash(library, db, monkeypatch):
+    before = files(library)
+    symlink = os.symlink
+    calls = []
+
+    def crashing_symlink(*args):
+        calls.append(args)
+
+        if len(calls) == 4:
+            raise SystemExit("killed")
+
+        symlink(*args)
+
+    monkeypatch.setattr(os, "symlink", crashing_symlink)
+
+    studio = crud.get_studio_by_name(db, "Disney")
+
+    # nothing catches the crash, leaving the first links moved
+    with pytest.raises(SystemExit):
+        renames.rename_property(db, models.Studio, studio.id, "Walt Disney")
+
+    monkeypatch.setattr(os, "symlink", symlink)
+    db.rollback()
+
+    assert files(library) != before
+    assert journal.recover(db) == 1
+    assert journal.recover(db) == 0
+
+    assert files(library) == before
+    assert db.query(models.FileOperation).count() == 0
+    assert crud.get_studio(db, studio.id).name == "Disney"
+
+    # committed batches leave nothing to recover
+    renames.rename_property(db, models.Studio, studio.id, "Walt Disney")
+
+    assert journal.recover(db) == 0
+    assert len(os.listdir(library / "studios" / "Walt Disney")) == 2
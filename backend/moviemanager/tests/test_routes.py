@@ -0,0 +1,247 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+from sqlalchemy.orm import Session
+
+from .. import create_app, journal, models, util
+from ..pagination import NEXT_CURSOR_HEADER
+
+pytestmark = pytest.mark.usefixtures("setup_database")
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(create_app())
+
+
+def get_pages(client: TestClient, url: str, limit: int):
+    pages = []
+    params = {"limit": limit}
+
+    while True:
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+
+        pages.append(response.json())
+
+        if NEXT_CURSOR_HEADER not in response.headers:
+            return pages
+
+        params["after"] = response.headers[NEXT_CURSOR_HEADER]
+
+
+@pytest.mark.parametrize(
+    "url", ["/actors", "/categories", "/movies", "/series", "/studios"]
+)
+def test_get_all_pages(client: TestClient, url: str):
+    rows = client.get(url).json()
+    pages = get_pages(client, url, 3)
+
+    assert len(pages) == (len(rows) + 2) // 3
+    assert all(len(page) == 3 for page in pages[:-1])
+    assert [row for page in pages for row in page] == rows
+
+
+@pytest.mark.parametrize(
+    "url", ["/actors", "/categories", "/movies", "/series", "/studios"]
+)
+def test_get_all_stream(client: TestClient, url: str):
+    rows = client.get(url).json()
+    response = client.get(url, params={"stream": True})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == rows
+
+
+def test_get_all_invalid_cursor(client: TestClient):
+    response = client.get("/actors", params={"limit": 2, "after": "bad"})
+
+    assert response.status_code == 400
+
+
+def test_get_all_etag(client: TestClient):
+    response = client.get("/actors")
+    etag = response.headers["etag"]
+
+    response = client.get("/actors", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    # other tables do not change the actors ETag
+    client.post("/categories", json={"name": "ETag Category"})
+    assert client.get("/actors").headers["etag"] == etag
+
+    client.post("/actors", json={"name": "ETag Actor"})
+
+    response = client.get("/actors", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert "ETag Actor" in [actor["name"] for actor in response.json()]
+
+
+def test_get_all_cached(client: TestClient):
+    actors = client.get("/actors").json()
+    before = client.get("/stats").json()["cache"]
+
+    assert client.get("/actors").json() == actors
+
+    after = client.get("/stats").json()["cache"]
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"]
+
+    client.post("/actors", json={"name": "Cached Actor"})
+
+    assert "Cached Actor" in [actor["name"] for actor in client.get("/actors").json()]
+    assert client.get("/stats").json()["cache"]["misses"] == after["misses"] + 1
+
+
+def test_get_all_cached_movie_update(client: TestClient, db: Session):
+    movie = client.get("/movies/1").json()
+    db.query(models.Movie).filter(models.Movie.id == 1).update({"processed": False})
+    db.commit()
+
+    etag = client.get("/actors").headers["etag"]
+    before = client.get("/stats").json()["cache"]
+
+    # only the processed flag changes, which no actor count depends on
+    response = client.put(
+        "/movies/1",
+        json={
+            "name": movie["name"],
+            "series_id": movie["series"] and movie["series"]["id"],
+            "series_number": movie["series_number"],
+            "studio_id": movie["studio"]["id"],
+        },
+    )
+    assert response.status_code == 200
+    assert db.query(models.Movie.processed).filter(models.Movie.id == 1).scalar()
+
+    assert client.get("/actors").headers["etag"] == etag
+
+    after = client.get("/stats").json()["cache"]
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"]
+
+
+def test_movies_import_batch(client: TestClient, tmp_path, monkeypatch):
+    monkeypatch.setenv("MM_DB_PATH", str(tmp_path))
+
+    for path_type in util.PathType:
+        (tmp_path / path_type.value).mkdir()
+
+    new = "[Disney] {Toy Story 2} Toy Story 2 (Tim Allen, Tom Hanks).mp4"
+    duplicate = "[Disney] Aladdin (Robin Williams).mp4"
+    conflict = "Conflict.mp4"
+
+    for filename in (".keep", new, duplicate, conflict):
+        (tmp_path / "imports" / filename).touch()
+
+    (tmp_path / "movies" / conflict).touch()
+
+    response = client.post("/movies/batch")
+    assert response.status_code == 200
+
+    report = response.json()
+    files = {file["filename"]: file for file in report["files"]}
+
+    assert (report["imported"], report["failed"]) == (1, 2)
+    assert files[new]["success"] and files[new]["message"] is None
+    assert not files[duplicate]["success"] and "exists" in files[duplicate]["message"]
+    assert not files[conflict]["success"] and "conflicts" in files[conflict]["message"]
+
+    assert (tmp_path / "movies" / new).exists()
+    assert (tmp_path / "imports" / duplicate).exists()
+    assert (tmp_path / "imports" / conflict).exists()
+
+    movie = client.get(f"/movies/{files[new]['id']}").json()
+    assert movie["studio"]["name"] == "Disney"
+    assert [actor["name"] for actor in movie["actors"]] == ["Tim Allen", "Tom Hanks"]
+
+
+def test_movies_import_batch_failure(
+    client: TestClient, db, tmp_path, mocker: MockerFixture, monkeypatch
+):
+    monkeypatch.setenv("MM_DB_PATH", str(tmp_path))
+
+    for path_type in util.PathType:
+        (tmp_path / path_type.value).mkdir()
+
+    new = "[Disney] Hercules.mp4"
+    (tmp_path / "imports" / new).touch()
+
+    bulk_add_movies = mocker.patch(
+        "moviemanager.crud.bulk_add_movies", side_effect=RuntimeError("disk full")
+    )
+
+    # any failure of the insert moves the files back
+    with pytest.raises(RuntimeError):
+        client.post("/movies/batch")
+
+    assert (tmp_path / "imports" / new).exists()
+    assert not (tmp_path / "movies" / new).exists()
+    assert db.query(models.FileOperation).count() == 0
+
+    # a crash before the commit is rolled back by the journal on the next start
+    mocker.patch("moviemanager.imports._move_back")
+    mocker.patch("moviemanager.journal.discard")
+
+    with pytest.raises(RuntimeError):
+        client.post("/movies/batch")
+
+    assert (tmp_path / "movies" / new).exists()
+
+    mocker.stopall()
+    assert journal.recover(db) == 1
+    assert (tmp_path / "imports" / new).exists()
+    assert bulk_add_movies.call_count == 2
+
+
+def test_stats_latency(client: TestClient):
+    client.get("/movies/1")
+    client.get("/movies/2")
+
+    stats = client.get("/stats").json()
+
+    assert stats["latency"]["GET /movies/{id}"]["count"] >= 2
+    assert stats["fs_executor"]["pending"] == 0
+
+
+def test_search(client: TestClient):
+    response = client.get("/search", params={"q": "dark kni", "kind": ["movie"]})
+    assert response.status_code == 200
+    # the name match ranks above the series name in a filename
+    assert [result["id"] for result in response.json()] == [4, 2]
+
+    response = client.get("/search", params={"q": "dark", "kind": ["studio"]})
+    assert response.json() == []
+
+    assert client.get("/search", params={"q": "x", "kind": "bad"}).status_code == 422
+    assert client.get("/search").status_code == 422
+
+
+def test_movies_filter(client: TestClient):
+    params = {"actor_id": [4], "limit": 2}
+    response = client.get("/movies/filter", params=params)
+    assert response.status_code == 200
+
+    body = response.json()
+    assert body["total"] == 5
+    assert len(body["movies"]) == 2
+    assert body["facets"]["actors"][0] == {
+        "id": 4,
+        "name": "Ian McKellen",
+        "count": 5,
+    }
+
+    params["after"] = response.headers[NEXT_CURSOR_HEADER]
+    page = client.get("/movies/filter", params=params).json()
+    assert not {movie["id"] for movie in page["movies"]} & {
+        movie["id"] for movie in body["movies"]
+    }
+
+    response = client.get("/movies/filter", params={"studio_id": 0})
+    assert response.json()["total"] == 0
+    assert client.get("/movies/filter", params={"actor_id": "x"}).status_code == 422
@@ -0,0 +1,180 @@
+import os
+import random
+import re
+import string
+
+from .. import models, parsing, util
+from .test_crud import count_queries
+
+
+def test_scan_link_files(library):
+    movie = "[Disney] Aladdin (Robin Williams).mp4"
+    (library / "movies" / movie).touch()
+
+    for path_type, name in (
+        (util.PathType.ACTOR, "Robin Williams"),
+        (util.PathType.CATEGORY, "animated"),
+        (util.PathType.CATEGORY, "family"),
+    ):
+        util.update_link(movie, util.get_movie_path(path_type), name, True)
+
+    (library / "categories" / "empty").mkdir()
+
+    dirs = [
+        (path_type, name)
+        for path_type in (util.PathType.ACTOR, util.PathType.CATEGORY)
+        for name in util.list_link_dirs(path_type)
+    ]
+
+    links = sorted(util.scan_link_files(dirs, workers=2), key=str)
+
+    assert len(dirs) == 4
+    assert links == [
+        (util.PathType.ACTOR, "Robin Williams", movie),
+        (util.PathType.CATEGORY, "animated", movie),
+        (util.PathType.CATEGORY, "family", movie),
+    ]
+
+
+def test_scan_link_files_error(library):
+    errors = []
+
+    links = list(
+        util.scan_link_files(
+            [(util.PathType.ACTOR, "missing")], workers=1, on_error=errors.append
+        )
+    )
+
+    assert links == []
+    assert errors == [f"{library}/actors/missing"]
+
+
+def test_generate_sort_key():
+    assert util.generate_sort_key("The Part 2: Return") == "part 0000000002 return"
+    assert util.generate_sort_key(None) == ""
+    assert sorted(
+        ["Part 10", "part 2", "The Part 1", "Part 1b"], key=util.generate_sort_key
+    ) == [
+        "The Part 1",
+        "Part 1b",
+        "part 2",
+        "Part 10",
+    ]
+
+
+def random_name(rng: random.Random, words: int = 3, chars: str = ":.'-") -> str:
+    """Returns a name the filename grammar can hold.
+
+    Words start with a letter, so a series name cannot end in what looks like
+    its number.
+    """
+
+    chars = string.ascii_letters + string.digits + chars
+
+    return " ".join(
+        rng.choice(string.ascii_letters)
+        + "".join(rng.choice(chars) for _ in range(rng.randint(0, 8)))
+        for _ in range(rng.randint(1, words))
+    )
+
+
+def test_parse_filename_round_trip():
+    rng = random.Random(0)
+    movies = []
+
+    for _ in range(2000):
+        movie = models.Movie(filename="movie.mp4", name=random_name(rng))
+
+        if rng.random() < 0.7:
+            movie.studio = models.Studio(name=random_name(rng, 2))
+
+        if rng.random() < 0.5:
+            movie.series = models.Series(name=random_name(rng, 2))
+            movie.series_number = rng.choice([None, rng.randint(0, 99)])
+
+        movie.actors = [
+            # the grammar does not allow colons in actor names
+            models.Actor(name=random_name(rng, 2, ".'-"))
+            for _ in range(rng.randint(0, 3))
+        ]
+        movies.append(movie)
+
+    filenames = [util.generate_movie_filename(movie) for movie in movies]
+    parsed = parsing.get_filename_parser().parse_many(filenames)
+
+    for movie, filename, result in zip(movies, filenames, parsed):
+        assert result == (
+            movie.name,
+            movie.studio.name if movie.studio else None,
+            movie.series.name if movie.series else None,
+            None if movie.series_number is None else str(movie.series_number),
+            ", ".join(actor.name for actor in movie.actors) or None,
+        ), filename
+        assert result == util.parse_filename(filename)
+
+
+def test_parse_filename_lazy_grammar():
+    # the grammar as first written, with lazy series and movie names
+    lazy = re.compile(
+        r"^(?:\[([A-Za-z0-9 :.,\'-]+)\])? ?"
+        r"(?:{([A-Za-z0-9 :.,\'-]+?)(?: ([0-9]+))?})? ?"
+        r"([A-Za-z0-9 :.,\'-]+?)? ?"
+        r"(?:\(([A-Za-z0-9 .,\'-]+)\))?$"
+    )
+    rng = random.Random(0)
+
+    # few characters, so brackets, spaces, and numbers meet often
+    for chars in ("ab 1[]{}(),.:'-", "a 1{}()", "ab  1 2{}()"):
+        for _ in range(20000):
+            filename = "".join(rng.choice(chars) for _ in range(rng.randint(0, 24)))
+            name, _ = os.path.splitext(filename)
+            matches = lazy.match(name)
+
+            if matches is not None:
+                studio, series, number, name, actors = matches.groups()
+                expected = (name, studio, series, number, actors)
+            else:
+                expected = (name, None, None, None, None)
+
+            assert util.parse_filename(filename) == expected, filename
+
+
+def test_parse_many_workers(monkeypatch):
+    rng = random.Random(0)
+    filenames = [
+        "".join(rng.choice(string.printable) for _ in range(rng.randint(0, 40)))
+        for _ in range(500)
+    ]
+    parser = parsing.get_filename_parser()
+
+    monkeypatch.setattr(parsing, "PARSE_CHUNK_SIZE", 100)
+
+    assert parser.parse_many(filenames, workers=2) == [
+        util.parse_filename(filename) for filename in filenames
+    ]
+
+
+def test_parse_files_info(setup_database, db):
+    filenames = [
+        "[Disney] Aladdin (Robin Williams).mp4",
+        "[Fox] {X-Men 3} The Last Stand (Hugh Jackman, Unknown Actor).mp4",
+        "[Unknown Studio] Untitled.mp4",
+    ]
+
+    info = util.parse_files_info(db, filenames)
+
+    assert [
+        (name, studio, series, number) for name, studio, series, number, _ in info
+    ] == [
+        ("Aladdin", 1, None, None),
+        ("The Last Stand", 2, 2, "3"),
+        ("Untitled", None, None, None),
+    ]
+    assert [actor.name for actor in info[0][4]] == ["Robin Williams"]
+    assert [actor.name for actor in info[1][4]] == ["Hugh Jackman"]
+    assert info[2][4] is None
+    assert info[0] == util.parse_file_info(db, filenames[0])
+
+    # the name maps are cached now, so only the actors are queried
+    many = [f"[Fox] Movie {i} (Hugh Jackman, Ian McKellen).mp4" for i in range(1000)]
+    assert count_queries(db, lambda: util.parse_files_info(db, many)) == 1
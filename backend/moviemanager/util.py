@@ -1,15 +1,33 @@
+import asyncio
+import functools
 import os
 import os.path
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
 from pathlib import Path
-from typing import List, Optional, Tuple
-
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from . import crud, models
-from .config import get_db_path
+from .config import get_db_path, get_fs_workers, get_scan_workers
 from .exceptions import ListFilesException, PathException
+from .parsing import ParsedFilename, get_filename_parser
 
 
 class PathType(Enum):
@@ -21,6 +39,21 @@ class PathType(Enum):
     STUDIO = "studios"
 
 
+# name, studio_id, series_id, series_number, actors parsed from a filename
+FileInfo = Tuple[str, Optional[int], Optional[int], Optional[int], List[models.Actor]]
+
+# digits that runs of numbers are zero padded to in sort keys
+SORT_KEY_DIGITS = 10
+
+T = TypeVar("T")
+
+# requests that move, rename, or link files run on their own bounded pool, so
+# slow file systems cannot take every thread from the requests that only read
+__fs_executor: Optional[ThreadPoolExecutor] = None
+__fs_lock = threading.Lock()
+__fs_pending = 0
+
+
 def generate_movie_filename(movie: models.Movie) -> str:
     """Generates a filename based on the movie information.
 
@@ -83,6 +116,27 @@ def generate_movie_filename(movie: models.Movie) -> str:
     return filename
 
 
+def generate_sort_key(name: Optional[str]) -> str:
+    """Generate a key that sorts names naturally.
+
+    The key is the sort name with every run of digits zero padded to
+    SORT_KEY_DIGITS, so "Part 2" sorts before "Part 10". It is stored with
+    the name, see models.SORT_KEY_TABLES.
+
+    Args:
+        name: The name to convert.
+
+    Returns:
+        sort_key: The sort key, empty if there is no name.
+    """
+
+    return re.sub(
+        r"[0-9]+",
+        lambda digits: digits.group().zfill(SORT_KEY_DIGITS),
+        generate_sort_name(name) or "",
+    )
+
+
 def generate_sort_name(name: Optional[str]) -> Optional[str]:
     """Generate a name ignoring articles, case, and special characters.
 
@@ -107,6 +161,26 @@ def generate_sort_name(name: Optional[str]) -> Optional[str]:
     )
 
 
+def get_fs_executor() -> ThreadPoolExecutor:
+    """Returns the file system executor, starting it on first use."""
+
+    global __fs_executor
+
+    with __fs_lock:
+        if __fs_executor is None:
+            __fs_executor = ThreadPoolExecutor(
+                max_workers=max(1, get_fs_workers()), thread_name_prefix="fs"
+            )
+
+        return __fs_executor
+
+
+def get_fs_executor_stats() -> Dict[str, int]:
+    """Returns the file system executor size and the calls not yet finished."""
+
+    return {"workers": max(1, get_fs_workers()), "pending": __fs_pending}
+
+
 def get_movie_path(path_type: PathType, full: bool = True) -> str:
     """Gets the a relative or full path to the movie files.
 
@@ -123,11 +197,12 @@ def get_movie_path(path_type: PathType, full: bool = True) -> str:
     return f"{path}/{path_type.value}"
 
 
-def list_files(path: str) -> List[str]:
+def list_files(path: str, sort: bool = True) -> List[str]:
     """List all files in a directory in alphabetical order.
 
     Args:
         path: Path to list.
+        sort: False to skip sorting when the order does not matter.
 
     Returns:
         files: List of files in the path.
@@ -137,11 +212,33 @@ def list_files(path: str) -> List[str]:
     """
 
     try:
-        files = sorted(os.listdir(path))
+        files = os.listdir(path)
     except OSError:
         raise ListFilesException(f"Failed to read path {path}")
 
-    return files
+    return sorted(files) if sort else files
+
+
+def list_link_dirs(path_type: PathType) -> List[str]:
+    """List the property directories within a link directory.
+
+    Args:
+        path_type: The link directory type.
+
+    Returns:
+        names: The property names, in no particular order.
+
+    Raises:
+        ListFilesException: If the link directory cannot be read.
+    """
+
+    path = get_movie_path(path_type)
+
+    try:
+        with os.scandir(path) as entries:
+            return [entry.name for entry in entries if entry.is_dir()]
+    except OSError:
+        raise ListFilesException(f"Failed to read path {path}")
 
 
 def migrate_file(filename: str, adding: bool = True) -> None:
@@ -170,9 +267,69 @@ def migrate_file(filename: str, adding: bool = True) -> None:
         raise PathException(f"Failed to move {path_current} -> {path_new}")
 
 
-def parse_filename(
-    filename: str,
-) -> Tuple[str, Optional[str], Optional[str], Optional[str], Optional[str]]:
+def migrate_files(filenames: Iterable[str], adding: bool = True) -> Dict[str, str]:
+    """Migrates many files between the imports and movies directory.
+
+    Every file is attempted even if some fail.
+
+    Args:
+        filenames: The filenames to migrate.
+        adding: True when moving to movies folder; False for the imports.
+
+    Returns:
+        errors: Filename -> error message for the files that were not moved.
+    """
+
+    errors = {}
+
+    for filename in filenames:
+        try:
+            migrate_file(filename, adding)
+        except PathException as e:
+            errors[filename] = str(e)
+
+    return errors
+
+
+def on_fs_executor(
+    schema: Optional[Type[BaseModel]] = None,
+) -> Callable[[Callable[..., Any]], Callable[..., Awaitable[Any]]]:
+    """Decorates a sync route handler to run on the file system executor.
+
+    The wrapper is a coroutine function with the signature of the handler, so
+    FastAPI awaits it instead of running it on its default thread pool.
+
+    FastAPI serializes the result of a coroutine on the event loop, where
+    loading expired attributes of database objects would block every other
+    request. A result of database objects is converted to the schema on the
+    executor instead.
+
+    Args:
+        schema: The response schema for handlers that return database objects.
+    """
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+        def call(*args: Any, **kwargs: Any) -> Any:
+            result = func(*args, **kwargs)
+
+            if schema is None:
+                return result
+
+            if isinstance(result, list):
+                return [schema.from_orm(item) for item in result]
+
+            return schema.from_orm(result)
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return await run_in_fs_executor(call, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def parse_filename(filename: str) -> ParsedFilename:
     """Parses a filename for movie properties.
 
     Args:
@@ -186,46 +343,10 @@ def parse_filename(
         actors: Comma delimited actor names, or None if not found.
     """
 
-    name, _ = os.path.splitext(filename)
-
-    # [Studio] {Series Series#} MovieName (Actor1, Actor2, ..., ActorN)
-    regex = (
-        # Start of line
-        r"^"
-        # Optional studio
-        r"(?:\[([A-Za-z0-9 :.,\'-]+)\])?"
-        # Optional space
-        r" ?"
-        # Optional series name/number
-        r"(?:{([A-Za-z0-9 :.,\'-]+?)(?: ([0-9]+))?})?"
-        # Optional space
-        r" ?"
-        # Optional movie Name
-        r"([A-Za-z0-9 :.,\'-]+?)?"
-        # Optional space
-        r" ?"
-        # Optional actor list
-        r"(?:\(([A-Za-z0-9 .,\'-]+)\))?"
-        # End of line
-        r"$"
-    )
-
-    studio_name = None
-    series_name = None
-    series_number = None
-    actor_names = None
-
-    matches = re.search(regex, name)
+    return get_filename_parser().parse(filename)
 
-    if matches is not None:
-        (studio_name, series_name, series_number, name, actor_names) = matches.groups()
 
-    return (name, studio_name, series_name, series_number, actor_names)
-
-
-def parse_file_info(
-    db: Session, filename: str
-) -> Tuple[str, Optional[int], Optional[int], Optional[int], List[models.Actor]]:
+def parse_file_info(db: Session, filename: str) -> FileInfo:
     """Parses file information from a filename.
 
     Args:
@@ -240,38 +361,59 @@ def parse_file_info(
         actors: List of actors on the movie, or None if not found.
     """
 
-    studio_id = None
-    series_id = None
-    series_number = None
-    actors = None
+    return parse_files_info(db, [filename])[0]
 
-    (name, studio_name, series_name, series_number, actor_names) = parse_filename(
-        filename
-    )
 
-    if studio_name is not None:
-        studio = crud.get_studio_by_name(db, studio_name)
+def parse_files_info(db: Session, filenames: Iterable[str]) -> List[FileInfo]:
+    """Parses file information from many filenames at once.
+
+    All filenames are parsed before any name is looked up. Studio, series,
+    and actor names are resolved with the cached name to ID maps, and the
+    actors of every file are loaded together with a few IN queries, so the
+    number of queries does not grow with the number of files.
 
-        if studio is not None:
-            studio_id = studio.id
+    Args:
+        db: The database session.
+        filenames: The filenames to parse.
 
-    if series_name is not None:
-        series = crud.get_series_by_name(db, series_name)
+    Returns:
+        info: The parse_file_info result for each filename, in order.
+    """
 
-        if series is not None:
-            series_id = series.id
+    parsed = get_filename_parser().parse_many(filenames)
 
-    if actor_names is not None:
-        actors = [
-            actor
-            for actor in (
-                crud.get_actor_by_name(db, actor_name)
+    actor_ids = {
+        actor_name: crud.get_property_id(db, models.Actor, actor_name)
+        for _, _, _, _, actor_names in parsed
+        if actor_names is not None
+        for actor_name in actor_names.split(", ")
+    }
+
+    actors = crud.get_actors(db, (id for id in actor_ids.values() if id is not None))
+
+    info = []
+
+    for name, studio_name, series_name, series_number, actor_names in parsed:
+        studio_id = None
+        series_id = None
+        movie_actors = None
+
+        if studio_name is not None:
+            studio_id = crud.get_property_id(db, models.Studio, studio_name)
+
+        if series_name is not None:
+            series_id = crud.get_property_id(db, models.Series, series_name)
+
+        if actor_names is not None:
+            movie_actors = [
+                actors[actor_ids[actor_name]]
                 for actor_name in actor_names.split(", ")
-            )
-            if actor is not None
-        ]
+                if actor_ids[actor_name] in actors
+            ]
+
+        info.append((name, studio_id, series_id, series_number, movie_actors))
 
-    return (name, studio_id, series_id, series_number, actors)
+    return info
 
 
 def remove_movie(movie: models.Movie) -> None:
@@ -368,6 +510,114 @@ def rename_movie_file(
             update_studio_link(filename_new, movie.studio.name, True)
 
 
+async def run_in_fs_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs a function on the file system executor and waits for its result.
+
+    Args:
+        func: The function to run.
+        args: Positional arguments for the function.
+        kwargs: Keyword arguments for the function.
+
+    Returns:
+        result: The return value of the function.
+    """
+
+    global __fs_pending
+
+    with __fs_lock:
+        __fs_pending += 1
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            get_fs_executor(), functools.partial(func, *args, **kwargs)
+        )
+    finally:
+        with __fs_lock:
+            __fs_pending -= 1
+
+
+def _scan_link_dir(path: str) -> Tuple[os.stat_result, List[str]]:
+    """Returns the stat and entry names of a property directory.
+
+    The stat is taken first so it never describes a newer state than the
+    entries listed after it.
+    """
+
+    stat = os.stat(path)
+
+    with os.scandir(path) as entries:
+        return (stat, [entry.name for entry in entries])
+
+
+def scan_link_dirs(
+    dirs: Iterable[Tuple[PathType, str]],
+    workers: Optional[int] = None,
+    on_error: Optional[Callable[[str], None]] = None,
+) -> Iterator[Tuple[PathType, str, os.stat_result, List[str]]]:
+    """Scans property directories in parallel.
+
+    Each directory is read with os.scandir on a thread pool, and is yielded
+    as soon as it has been read. Entries are not sorted.
+
+    Args:
+        dirs: The (path_type, name) property directories to scan.
+        workers: Number of scanning threads; defaults to MM_SCAN_WORKERS.
+        on_error: Called with the path of any directory that cannot be read.
+
+    Yields:
+        path_type: The link directory type.
+        name: The property name.
+        stat: The stat of the property directory.
+        filenames: The movie filenames of the links in the directory.
+    """
+
+    if workers is None:
+        workers = get_scan_workers()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(_scan_link_dir, f"{get_movie_path(path_type)}/{name}"): (
+                path_type,
+                name,
+            )
+            for path_type, name in dirs
+        }
+
+        for future in as_completed(futures):
+            path_type, name = futures[future]
+
+            try:
+                stat, filenames = future.result()
+            except OSError:
+                if on_error is not None:
+                    on_error(f"{get_movie_path(path_type)}/{name}")
+
+                continue
+
+            yield (path_type, name, stat, filenames)
+
+
+def scan_link_files(
+    dirs: Iterable[Tuple[PathType, str]],
+    workers: Optional[int] = None,
+    on_error: Optional[Callable[[str], None]] = None,
+) -> Iterator[Tuple[PathType, str, str]]:
+    """Scans property directories in parallel for their link files.
+
+    Link files are streamed as each directory is read; scan_link_dirs has
+    more info.
+
+    Yields:
+        path_type: The link directory type.
+        name: The property name.
+        filename: The movie filename of the link.
+    """
+
+    for path_type, name, _, filenames in scan_link_dirs(dirs, workers, on_error):
+        for filename in filenames:
+            yield (path_type, name, filename)
+
+
 def update_link(filename: str, path_link_base: str, name: str, selected: bool) -> None:
     """Updates a property link to a movie file.
 
@@ -0,0 +1,124 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request, Response, status
+from sqlalchemy.engine import Engine
+
+from .models import VERSION_EPOCH
+
+__lock = threading.Lock()
+
+# a connection kept open to read the counters of models.VERSION_TRIGGERS, and
+# its data_version when they were last read
+__connection: Any = None
+__data_version: Optional[int] = None
+__stored: Dict[str, int] = {}
+
+
+def _stored_counters() -> Dict[str, int]:
+    """Returns the change counters stored in the database.
+
+    PRAGMA data_version changes when another connection commits, whether in
+    this process or another one, so the counters are only read again after a
+    commit. Must be called with the lock held.
+    """
+
+    global __data_version, __stored
+
+    if __connection is None:
+        return __stored
+
+    cursor = __connection.cursor()
+
+    try:
+        data_version = cursor.execute("PRAGMA data_version").fetchone()[0]
+
+        if data_version != __data_version:
+            __stored = dict(
+                cursor.execute("SELECT name, version FROM table_versions").fetchall()
+            )
+            __data_version = data_version
+    finally:
+        cursor.close()
+
+    return __stored
+
+
+def get(*tables: str) -> Tuple[int, ...]:
+    """Returns the epoch and the change counters of the given tables.
+
+    The counters are stored in the database, so they also count changes made
+    by other processes such as run.py --reconcile. The epoch is picked when
+    the database is created, so a new database with counters starting again
+    from zero gives different results. The result compares equal for as long
+    as none of the tables changed.
+    """
+
+    with __lock:
+        stored = _stored_counters()
+
+        return tuple(stored.get(name, 0) for name in (VERSION_EPOCH,) + tables)
+
+
+def etag(*tables: str) -> str:
+    """Returns an ETag for a response built from the given tables.
+
+    Args:
+        tables: Names of the tables the response is read from.
+    """
+
+    epoch, *counters = get(*tables)
+
+    return f'"{epoch:x}-{"-".join(str(counter) for counter in counters)}"'
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Returns a 304 response if the request If-None-Match matches the ETag.
+
+    Args:
+        request: The request.
+        etag: The current ETag of the requested resource.
+
+    Returns:
+        response: A 304 Not Modified response, or None if the client copy is
+            out of date and the full response must be sent.
+    """
+
+    header = request.headers.get("if-none-match")
+
+    if header is None:
+        return None
+
+    for value in header.split(","):
+        value = value.strip()
+
+        if value.startswith("W/"):
+            value = value[2:]
+
+        if value in (etag, "*"):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+
+    return None
+
+
+def reset(engine: Optional[Engine] = None) -> None:
+    """Forgets the counters read so far, for when the database changes.
+
+    Args:
+        engine: The database to read the change counters from, or None to
+            stop reading them.
+    """
+
+    global __connection, __data_version, __stored
+
+    with __lock:
+        if __connection is not None:
+            __connection.close()
+
+        # data_version only tracks commits made by other connections, so
+        # this one is kept open and never writes
+        __connection = None if engine is None else engine.raw_connection()
+        __data_version = None
+        __stored = {}
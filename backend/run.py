@@ -3,7 +3,8 @@ import argparse
 import uvicorn
 
 from moviemanager.config import get_log_config
-from moviemanager.rebuild import rebuild_db
+from moviemanager.database import migrate_db
+from moviemanager.rebuild import rebuild_db, reconcile_db
 from moviemanager.relink import relink_property_files
 
 
@@ -18,16 +19,48 @@ def main():
         "--relink", action="store_true", required=False, help="Relink files"
     )
 
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        required=False,
+        help="Migrate the DB to the latest schema version",
+    )
+
     parser.add_argument(
         "--rebuild", action="store_true", required=False, help="Rebuild DB from files"
     )
 
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        required=False,
+        help="Update existing DB to match files",
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        required=False,
+        help="Report reconcile changes without applying them",
+    )
+
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        required=False,
+        help="Ignore the manifest and check every file on relink or reconcile",
+    )
+
     args = parser.parse_args()
 
-    if args.relink:
-        relink_property_files()
+    if args.migrate:
+        migrate_db()
+    elif args.relink:
+        relink_property_files(args.full)
     elif args.rebuild:
         rebuild_db()
+    elif args.reconcile:
+        reconcile_db(args.dry_run, full=args.full)
     else:
         uvicorn.run("moviemanager.main:app", reload=True, log_config=get_log_config())
 